@@ -1,5 +1,26 @@
-from fastapi import Header, HTTPException
-from database import get_db
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from fastapi import Header, HTTPException, Request
+from database import bind_request_agent, get_db
+import pg
+
+logger = logging.getLogger(__name__)
+
+# Verified agents are cached by API key so that authenticated requests don't
+# pay a DB round-trip before doing any real work.
+AUTH_CACHE_TTL_SECONDS: float = float(os.environ.get("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES: int = int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# last_active bumps are collected in memory and written in one bulk update.
+LAST_ACTIVE_FLUSH_SECONDS: float = float(os.environ.get("LAST_ACTIVE_FLUSH_SECONDS", "5"))
+
+_agent_cache: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+_pending_last_active: set[str] = set()
 
 
 def _extract_bearer(authorization: str | None) -> str | None:
@@ -11,12 +32,93 @@ def _extract_bearer(authorization: str | None) -> str | None:
     return None
 
 
+# ── Agent cache ───────────────────────────────────────────────────────────────
+
+def _cache_get(api_key: str) -> dict | None:
+    entry = _agent_cache.get(api_key)
+    if entry is None:
+        return None
+    expires_at, agent = entry
+    if expires_at < time.monotonic():
+        del _agent_cache[api_key]
+        return None
+    _agent_cache.move_to_end(api_key)
+    return agent
+
+
+def _cache_put(api_key: str, agent: dict) -> None:
+    _agent_cache[api_key] = (time.monotonic() + AUTH_CACHE_TTL_SECONDS, agent)
+    _agent_cache.move_to_end(api_key)
+    while len(_agent_cache) > AUTH_CACHE_MAX_ENTRIES:
+        _agent_cache.popitem(last=False)
+
+
+def invalidate_agent(agent_id: str) -> None:
+    """Drop any cached entry for this agent. Call after writing to its row."""
+    stale = [key for key, (_, agent) in _agent_cache.items() if agent["id"] == agent_id]
+    for key in stale:
+        del _agent_cache[key]
+
+
+def clear_agent_cache() -> None:
+    _agent_cache.clear()
+    _pending_last_active.clear()
+
+
+# ── last_active write coalescing ──────────────────────────────────────────────
+
+def touch_last_active(agent_id: str) -> None:
+    """Mark the agent as active; the timestamp is written by the next flush."""
+    _pending_last_active.add(agent_id)
+
+
+def pending_last_active_count() -> int:
+    return len(_pending_last_active)
+
+
+async def flush_last_active() -> int:
+    """Write all pending last_active bumps in a single bulk update.
+    Returns the number of agents updated. On failure the ids are kept for the
+    next flush."""
+    if not _pending_last_active:
+        return 0
+    agent_ids = list(_pending_last_active)
+    _pending_last_active.clear()
+    try:
+        db = get_db()
+        await (
+            db.table("agents")
+            .update({"last_active": datetime.now(timezone.utc).isoformat()})
+            .in_("id", agent_ids)
+            .execute()
+        )
+    except Exception:
+        _pending_last_active.update(agent_ids)
+        raise
+    return len(agent_ids)
+
+
+async def run_last_active_flusher() -> None:
+    """Background task started from the app lifespan."""
+    while True:
+        await asyncio.sleep(LAST_ACTIVE_FLUSH_SECONDS)
+        try:
+            await flush_last_active()
+        except Exception:
+            logger.exception("Failed to flush last_active updates")
+
+
+# ── Dependency ────────────────────────────────────────────────────────────────
+
 async def get_current_agent(
+    request: Request,
     authorization: str | None = Header(default=None),
 ) -> dict:
     """
     FastAPI dependency. Extracts the Bearer token from the Authorization header,
-    looks up the agent in Supabase, updates last_active, and returns the agent row.
+    looks up the agent (in-process cache first, then Supabase), schedules a
+    last_active bump, and returns the agent row. Write requests keep the
+    agent's reads on the primary database for a few seconds afterwards.
     Raises HTTP 401 if the token is missing or invalid.
     """
     api_key = _extract_bearer(authorization)
@@ -30,20 +132,42 @@ async def get_current_agent(
             },
         )
 
-    db = get_db()
-    result = db.table("agents").select("*").eq("api_key", api_key).limit(1).execute()
+    agent = _cache_get(api_key)
+    if agent is None:
+        if pg.enabled():
+            agent = await pg.agent_by_api_key(api_key)
+        else:
+            # Primary, not the replica: a key is used right after registration.
+            db = get_db(primary=True)
+            result = await db.table("agents").select("*").eq("api_key", api_key).limit(1).execute()
+            agent = result.data[0] if result.data else None
 
-    if not result.data:
-        raise HTTPException(
-            status_code=401,
-            detail={
-                "success": False,
-                "error": "Invalid API key",
-                "hint": "Agent not found. Make sure you are using the api_key returned at registration.",
-            },
-        )
+        if agent is None:
+            raise HTTPException(
+                status_code=401,
+                detail={
+                    "success": False,
+                    "error": "Invalid API key",
+                    "hint": "Agent not found. Make sure you are using the api_key returned at registration.",
+                },
+            )
+
+        _cache_put(api_key, agent)
 
     # Update last_active without blocking the request
-    db.table("agents").update({"last_active": "now()"}).eq("api_key", api_key).execute()
+    touch_last_active(agent["id"])
+    bind_request_agent(api_key, wrote=request.method not in ("GET", "HEAD"))
+
+    return dict(agent)
 
-    return result.data[0]
+
+async def bind_optional_agent(authorization: str | None = Header(default=None)) -> None:
+    """
+    FastAPI dependency for public reads. Auth stays optional, but when a
+    Bearer token is sent, the agent's reads stay on the primary database right
+    after it wrote, so it sees the idea or critique it just posted. No lookup
+    is made; an unknown key simply never pins anything.
+    """
+    api_key = _extract_bearer(authorization)
+    if api_key:
+        bind_request_agent(api_key, wrote=False)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import deque
+
+# How many recent events are kept for Last-Event-ID resume, and how far a
+# single slow subscriber may fall behind before its oldest events are dropped.
+ACTIVITY_HISTORY_SIZE: int = int(os.environ.get("ACTIVITY_HISTORY_SIZE", "1000"))
+ACTIVITY_SUBSCRIBER_QUEUE_SIZE: int = int(os.environ.get("ACTIVITY_SUBSCRIBER_QUEUE_SIZE", "500"))
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _deliver(self, event: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class ActivityBroadcaster:
+    """
+    In-process fan-out of activity events. log_activity publishes each event
+    once; every open stream gets it from memory, so N subscribers cost no
+    extra database reads. A ring of recent events backs Last-Event-ID resume.
+    """
+
+    def __init__(self, history_size: int, queue_size: int):
+        self._history: deque[dict] = deque(maxlen=history_size)
+        self._queue_size = queue_size
+        self._subscribers: set[Subscription] = set()
+        self.published = 0
+
+    def publish(self, event: dict) -> None:
+        """Safe to call from any thread; delivery happens on each
+        subscriber's own event loop."""
+        self._history.append(event)
+        self.published += 1
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for sub in list(self._subscribers):
+            if sub.loop is running:
+                sub._deliver(event)
+            elif not sub.loop.is_closed():
+                sub.loop.call_soon_threadsafe(sub._deliver, event)
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop(), self._queue_size)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subscribers.discard(sub)
+
+    def events_after(self, event_id: str) -> list[dict] | None:
+        """Events published after `event_id`, oldest first, or None if the id
+        has already fallen out of the history ring."""
+        history = list(self._history)
+        for i in range(len(history) - 1, -1, -1):
+            if history[i]["id"] == event_id:
+                return history[i + 1:]
+        return None
+
+    def recent(self) -> list[dict]:
+        """The history ring, oldest first."""
+        return list(self._history)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "history": len(self._history),
+            "subscriber_drops": sum(sub.dropped for sub in self._subscribers),
+        }
+
+    def clear(self) -> None:
+        self._history.clear()
+        self._subscribers.clear()
+        self.published = 0
+
+
+activity_broadcaster = ActivityBroadcaster(
+    history_size=ACTIVITY_HISTORY_SIZE, queue_size=ACTIVITY_SUBSCRIBER_QUEUE_SIZE
+)
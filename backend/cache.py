@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_TTL_SECONDS: float = float(os.environ.get("STATS_CACHE_TTL_SECONDS", "60"))
+STATS_CACHE_STALE_SECONDS: float = float(os.environ.get("STATS_CACHE_STALE_SECONDS", "300"))
+
+
+class ResponseCache:
+    """
+    Small in-process cache for expensive read endpoints.
+
+    - Fresh (age < ttl): served from memory.
+    - Stale (age < ttl + stale_ttl): served from memory while one background
+      task recomputes it (stale-while-revalidate).
+    - Missing/expired: computed inline. Concurrent callers for the same key
+      share a single computation (single-flight).
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._counters: dict[str, int] = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "errors": 0,
+        }
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self._counters["hits"] += 1
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self._counters["stale_hits"] += 1
+                self._start(key, compute)
+                return entry[1]
+
+        self._counters["misses"] += 1
+        return await asyncio.shield(self._start(key, compute))
+
+    def _start(self, key: str, compute: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            return task
+        task = asyncio.get_running_loop().create_task(self._compute(key, compute))
+        # Background refreshes are never awaited; retrieve their exception so
+        # a failed refresh is only logged once (by _compute).
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+        return task
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+        except Exception:
+            self._counters["errors"] += 1
+            logger.exception("Failed to compute cached response %r", key)
+            raise
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        self._entries[key] = (time.monotonic(), value)
+        self._counters["refreshes"] += 1
+        return value
+
+    def invalidate(self, key: str | None = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        return {**self._counters, "entries": len(self._entries)}
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+        for name in self._counters:
+            self._counters[name] = 0
+
+
+# Shared by GET /api/stats and GET /api/admin/stats.
+stats_cache = ResponseCache(ttl=STATS_CACHE_TTL_SECONDS, stale_ttl=STATS_CACHE_STALE_SECONDS)
@@ -1,17 +1,239 @@
+import asyncio
 import os
-from supabase import create_client, Client
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable
+
+from postgrest.exceptions import APIError
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
 
+import querystats
+
 load_dotenv()
 
-SUPABASE_URL: str = os.environ["SUPABASE_URL"]
-SUPABASE_SECRET_KEY: str = os.environ["SUPABASE_SECRET_KEY"]
+# "supabase" talks to PostgREST; "postgres" additionally sends the hot-path
+# queries straight to Postgres over asyncpg (see pg.py); "local" keeps every
+# table in process memory (see localdb.py) for offline load and soak testing.
+DB_BACKEND: str = os.environ.get("DB_BACKEND", "supabase")
+
+if DB_BACKEND == "local":
+    SUPABASE_URL: str = os.environ.get("SUPABASE_URL", "")
+    SUPABASE_SECRET_KEY: str = os.environ.get("SUPABASE_SECRET_KEY", "")
+else:
+    SUPABASE_URL = os.environ["SUPABASE_URL"]
+    SUPABASE_SECRET_KEY = os.environ["SUPABASE_SECRET_KEY"]
+
+# Upper bound on PostgREST calls in flight at once. Each call occupies one
+# worker thread while it waits on the network, so this is effectively the
+# per-process concurrency limit towards the database.
+DB_MAX_WORKERS: int = int(os.environ.get("DB_MAX_WORKERS", "64"))
+
+# Read replica (Supabase's replica API URL). When set, selects and the
+# read-only RPCs below go to the replica, except for an agent that made a
+# write request in the last READ_YOUR_WRITES_SECONDS — its reads stay on the
+# primary so it always sees what it just wrote.
+SUPABASE_READ_REPLICA_URL: str = os.environ.get("SUPABASE_READ_REPLICA_URL", "")
+READ_YOUR_WRITES_SECONDS: float = float(os.environ.get("READ_YOUR_WRITES_SECONDS", "5"))
+
+_READ_ONLY_RPCS = frozenset({"get_daily_counts", "next_idea_for_agent", "search_board"})
+
+# The builder call that decides what a table query does, for instrumentation.
+_OPERATIONS = frozenset({"select", "insert", "update", "upsert", "delete"})
 
 _client: Client | None = None
+_replica: Client | None = None
+_executor: ThreadPoolExecutor | None = None
+
+# API key of the agent making the current request, set by the auth
+# dependencies. Keyed by API key rather than agent id so that public reads can
+# bind it without looking the agent up.
+_request_agent: ContextVar[str | None] = ContextVar("request_agent", default=None)
+# API key -> monotonic time until which its reads stay on the primary.
+_sticky_until: dict[str, float] = {}
+_routing: dict[str, int] = {"replica_reads": 0, "primary_reads": 0, "sticky_reads": 0}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=DB_MAX_WORKERS, thread_name_prefix="db"
+        )
+    return _executor
+
+
+class AsyncQuery:
+    """Wraps a supabase/postgrest request builder so that the terminal
+    .execute() is awaitable. Every other builder method (select, eq, order, …)
+    is forwarded unchanged and its result re-wrapped, so call sites keep the
+    familiar fluent chain and only add an `await` in front.
+
+    `read_builder`, if given, supplies the builder to use instead when the
+    chain starts with .select() — the read replica's, when reads go there.
+    Each execute() is timed into querystats under "target.operation"."""
+
+    def __init__(
+        self,
+        builder: Any,
+        read_builder: Callable[[], Any] | None = None,
+        target: str = "query",
+        operation: str | None = None,
+    ):
+        self._builder = builder
+        self._read_builder = read_builder
+        self._target = target
+        self._operation = operation
+
+    def _wrap(self, builder: Any, name: str) -> "AsyncQuery":
+        operation = self._operation or (name if name in _OPERATIONS else None)
+        return AsyncQuery(builder, target=self._target, operation=operation)
+
+    def __getattr__(self, name: str) -> Any:
+        builder = self._builder
+        if name == "select" and self._read_builder is not None:
+            builder = self._read_builder()
+        attr = getattr(builder, name)
+        if callable(attr):
+            def call(*args, **kwargs):
+                return self._wrap(attr(*args, **kwargs), name)
+            return call
+        # Property-style builders such as `.not_` return another builder.
+        if hasattr(attr, "execute"):
+            return self._wrap(attr, name)
+        return attr
+
+    async def execute(self) -> Any:
+        loop = asyncio.get_running_loop()
+        with querystats.timed(self._target, self._operation or "query"):
+            return await loop.run_in_executor(_get_executor(), self._builder.execute)
+
+
+class AsyncDB:
+    """Async facade over the synchronous Supabase client. The blocking HTTP
+    round-trip runs on a bounded thread pool, keeping the event loop free to
+    serve other requests while PostgREST answers. Reads go to `replica`
+    when one is given."""
+
+    def __init__(self, client: Client, replica: Client | None = None, sticky: bool = False):
+        self._client = client
+        self._replica = replica
+        self._sticky = sticky
+
+    def _route_read(self) -> Client | None:
+        """Count one read and return the replica if it should serve it."""
+        if self._replica is not None:
+            _routing["replica_reads"] += 1
+            return self._replica
+        _routing["sticky_reads" if self._sticky else "primary_reads"] += 1
+        return None
 
+    def table(self, name: str) -> AsyncQuery:
+        builder = self._client.table(name)
 
-def get_db() -> Client:
+        def read_builder() -> Any:
+            replica = self._route_read()
+            return builder if replica is None else replica.table(name)
+
+        return AsyncQuery(builder, read_builder, target=name)
+
+    def rpc(self, fn: str, params: dict | None = None) -> AsyncQuery:
+        client = self._client
+        if fn in _READ_ONLY_RPCS:
+            client = self._route_read() or client
+        return AsyncQuery(client.rpc(fn, params or {}), target=fn, operation="rpc")
+
+
+def get_client() -> Client:
+    """Return the underlying synchronous Supabase client (or its in-memory
+    stand-in when DB_BACKEND=local)."""
     global _client
     if _client is None:
-        _client = create_client(SUPABASE_URL, SUPABASE_SECRET_KEY)
+        if DB_BACKEND == "local":
+            from localdb import LocalClient
+
+            _client = LocalClient()
+        else:
+            from transport import build_http_client
+
+            _client = create_client(
+                SUPABASE_URL,
+                SUPABASE_SECRET_KEY,
+                options=ClientOptions(httpx_client=build_http_client()),
+            )
     return _client
+
+
+def get_replica_client() -> Client | None:
+    """The read-replica client, or None when no replica is configured."""
+    global _replica
+    if not SUPABASE_READ_REPLICA_URL or DB_BACKEND == "local":
+        return None
+    if _replica is None:
+        from transport import build_http_client
+
+        _replica = create_client(
+            SUPABASE_READ_REPLICA_URL,
+            SUPABASE_SECRET_KEY,
+            options=ClientOptions(httpx_client=build_http_client()),
+        )
+    return _replica
+
+
+def bind_request_agent(api_key: str, wrote: bool) -> None:
+    """Record the agent (by API key) making the current request. A write
+    request pins the agent's reads to the primary for READ_YOUR_WRITES_SECONDS."""
+    _request_agent.set(api_key)
+    if wrote:
+        now = time.monotonic()
+        _sticky_until[api_key] = now + READ_YOUR_WRITES_SECONDS
+        if len(_sticky_until) > 10000:
+            for stale in [a for a, until in _sticky_until.items() if until < now]:
+                del _sticky_until[stale]
+
+
+def _reads_pinned_to_primary() -> bool:
+    api_key = _request_agent.get()
+    return api_key is not None and _sticky_until.get(api_key, 0.0) > time.monotonic()
+
+
+def get_db(primary: bool = False) -> AsyncDB:
+    """Database handle for the current request. Reads may be served by the
+    read replica unless `primary` is set or the calling agent wrote
+    recently."""
+    replica = None if primary else get_replica_client()
+    if replica is not None and _reads_pinned_to_primary():
+        return AsyncDB(get_client(), sticky=True)
+    return AsyncDB(get_client(), replica)
+
+
+def routing_stats() -> dict[str, Any]:
+    now = time.monotonic()
+    return {
+        "replica": bool(SUPABASE_READ_REPLICA_URL) and DB_BACKEND != "local",
+        **_routing,
+        "sticky_agents": sum(1 for until in _sticky_until.values() if until > now),
+    }
+
+
+def clear_routing() -> None:
+    _sticky_until.clear()
+    for name in _routing:
+        _routing[name] = 0
+
+
+def is_unique_violation(exc: Exception, constraint: str | None = None) -> bool:
+    """True if `exc` is PostgREST or asyncpg (DB_BACKEND=postgres) reporting
+    a unique-constraint violation (SQLSTATE 23505), optionally only on a
+    constraint whose name contains `constraint`."""
+    if isinstance(exc, APIError):
+        if exc.code != "23505":
+            return False
+        name = exc.message or ""
+    elif getattr(exc, "sqlstate", None) == "23505":
+        # asyncpg.UniqueViolationError; matched by SQLSTATE so asyncpg stays optional.
+        name = getattr(exc, "constraint_name", None) or ""
+    else:
+        return False
+    return constraint is None or constraint in name
@@ -0,0 +1,743 @@
+"""
+In-process stand-in for the Supabase client, selected with DB_BACKEND=local.
+
+It answers the subset of the PostgREST query builder the routes use
+(select with embedded resources, insert, update, delete, the filter and
+ordering methods, range/limit, count) plus Python versions of the SQL
+functions and triggers in supabase-schema.sql, against tables held in
+memory. Nothing leaves the process, so the full app can be load-tested or
+soak-tested on a laptop:
+
+    DB_BACKEND=local uvicorn main:app --port 8888
+
+Data lives for the life of the process. Lookups by primary key are O(1);
+every other filter scans the table, which is fine for the table sizes a
+local run produces but is not a model of Postgres query plans.
+"""
+from __future__ import annotations
+
+import copy
+import re
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from postgrest.exceptions import APIError
+
+# ── Schema ────────────────────────────────────────────────────────────────────
+
+_PRIMARY_KEYS = {"board_counters": "name", "agent_stats": "agent_id"}
+
+_UNIQUE: dict[str, list[tuple[str, tuple[str, ...]]]] = {
+    "agents": [
+        ("agents_name_key", ("name",)),
+        ("agents_name_lower_key", ("name_lower",)),
+        ("agents_api_key_key", ("api_key",)),
+        ("agents_claim_token_key", ("claim_token",)),
+    ],
+    "ideas": [
+        ("ideas_agent_title_hash_key", ("agent_id", "title_hash")),
+    ],
+    "critiques": [
+        ("critiques_agent_idea_body_hash_key", ("agent_id", "idea_id", "body_hash")),
+    ],
+    "upvotes": [
+        ("upvotes_agent_id_target_type_target_id_key", ("agent_id", "target_type", "target_id")),
+    ],
+}
+
+# (table, column) -> referenced table. Drives embedded selects.
+_FOREIGN_KEYS = {
+    ("ideas", "agent_id"): "agents",
+    ("critiques", "agent_id"): "agents",
+    ("critiques", "idea_id"): "ideas",
+    ("upvotes", "agent_id"): "agents",
+    ("activity_log", "agent_id"): "agents",
+    ("agent_stats", "agent_id"): "agents",
+}
+# Foreign keys that are also unique, so the reverse embed is a single object.
+_ONE_TO_ONE = {("agent_stats", "agent_id")}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _defaults(table: str) -> dict[str, Any]:
+    now = _now()
+    common = {"id": str(uuid.uuid4()), "created_at": now}
+    return {
+        "agents": {**common, "claim_status": "pending_claim", "owner_email": None,
+                   "last_active": now},
+        "ideas": {**common, "topic_tag": None, "upvote_count": 0, "critique_count": 0,
+                  "updated_at": now, "angle_counts": {}, "angles_covered_count": 0,
+                  "title_hash": None},
+        "critiques": {**common, "upvote_count": 0, "body_hash": None},
+        "upvotes": {**common, "counted": True},
+        "activity_log": {**common, "target_id": None, "target_title": None},
+        "agent_stats": {"idea_count": 0, "critique_count": 0},
+        "board_counters": {"slot": 0, "value": 0},
+    }.get(table, common)
+
+
+def _generated(table: str, row: dict) -> None:
+    if table == "agents":
+        row["name_lower"] = row["name"].lower()
+
+
+def _error(code: str, message: str) -> APIError:
+    return APIError({"code": code, "message": message, "hint": None, "details": None})
+
+
+# ── Value comparison ──────────────────────────────────────────────────────────
+
+def _coerce(stored: Any, value: Any) -> Any:
+    """Convert a filter value (usually a string from the URL grammar) to the
+    type of the stored value, as Postgres would."""
+    if value is None or value == "null":
+        return None
+    if isinstance(stored, bool):
+        return value if isinstance(value, bool) else str(value).lower() == "true"
+    if isinstance(stored, (int, float)) and isinstance(value, str):
+        return float(value)
+    if isinstance(stored, str) and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def _like_regex(pattern: str, flags: int = 0) -> re.Pattern:
+    out = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        out.append(".*" if ch in "%*" else "." if ch == "_" else re.escape(ch))
+        i += 1
+    return re.compile("".join(out), flags | re.DOTALL)
+
+
+def _compare(op: str, stored: Any, value: Any) -> bool:
+    if op == "is":
+        return stored is None if value in (None, "null") else stored == _coerce(stored, value)
+    if op == "in":
+        return stored in [_coerce(stored, v) for v in value]
+    if op in ("like", "ilike"):
+        if stored is None:
+            return False
+        flags = re.IGNORECASE if op == "ilike" else 0
+        return _like_regex(value, flags).fullmatch(str(stored)) is not None
+    if stored is None:
+        return False
+    value = _coerce(stored, value)
+    if value is None:
+        return False
+    if op == "eq":
+        return stored == value
+    if op == "neq":
+        return stored != value
+    if op == "gt":
+        return stored > value
+    if op == "gte":
+        return stored >= value
+    if op == "lt":
+        return stored < value
+    if op == "lte":
+        return stored <= value
+    raise _error("PGRST100", f"unsupported operator {op}")
+
+
+# ── PostgREST logic-tree parser (for or_) ─────────────────────────────────────
+
+Predicate = Callable[[dict], bool]
+
+
+def _parse_logic(expr: str) -> Predicate:
+    pos = 0
+
+    def parse_list() -> list[Predicate]:
+        nonlocal pos
+        items = [parse_item()]
+        while pos < len(expr) and expr[pos] == ",":
+            pos += 1
+            items.append(parse_item())
+        return items
+
+    def parse_value() -> str:
+        nonlocal pos
+        if expr[pos] == '"':
+            pos += 1
+            out = []
+            while expr[pos] != '"':
+                if expr[pos] == "\\":
+                    pos += 1
+                out.append(expr[pos])
+                pos += 1
+            pos += 1
+            return "".join(out)
+        start = pos
+        while pos < len(expr) and expr[pos] not in ",)":
+            pos += 1
+        return expr[start:pos]
+
+    def parse_item() -> Predicate:
+        nonlocal pos
+        for group in ("and(", "or("):
+            if expr.startswith(group, pos):
+                pos += len(group)
+                children = parse_list()
+                pos += 1  # ")"
+                if group == "and(":
+                    return lambda row: all(p(row) for p in children)
+                return lambda row: any(p(row) for p in children)
+        column_end = expr.index(".", pos)
+        column = expr[pos:column_end]
+        op_end = expr.index(".", column_end + 1)
+        op = expr[column_end + 1:op_end]
+        pos = op_end + 1
+        if op == "in":
+            close = expr.index(")", pos)
+            values = [v.strip().strip('"') for v in expr[pos + 1:close].split(",")]
+            pos = close + 1
+            return lambda row: _compare("in", row.get(column), values)
+        value = parse_value()
+        return lambda row: _compare(op, row.get(column), value)
+
+    items = parse_list()
+    return lambda row: any(p(row) for p in items)
+
+
+# ── Select-list parser ────────────────────────────────────────────────────────
+
+@dataclass
+class _Embed:
+    alias: str
+    table: str
+    hint: str | None
+    columns: list
+
+
+def _split_top_level(text: str) -> list[str]:
+    parts, depth, current = [], 0, []
+    for ch in text:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+_EMBED_RE = re.compile(r"^(?:(\w+):)?(\w+)(?:!(\w+))?\((.*)\)$", re.DOTALL)
+
+
+def _parse_columns(text: str) -> list:
+    columns: list = []
+    for part in _split_top_level(text):
+        match = _EMBED_RE.match(part)
+        if match:
+            alias, table, hint, inner = match.groups()
+            columns.append(_Embed(alias or table, table, hint, _parse_columns(inner)))
+        else:
+            columns.append(part)
+    return columns
+
+
+# ── Store ─────────────────────────────────────────────────────────────────────
+
+class LocalStore:
+    def __init__(self) -> None:
+        self.tables: dict[str, dict[Any, dict]] = {}
+        self.lock = threading.RLock()
+
+    def rows(self, table: str) -> dict[Any, dict]:
+        return self.tables.setdefault(table, {})
+
+    def pk(self, table: str) -> str:
+        return _PRIMARY_KEYS.get(table, "id")
+
+    # -- writes (callers hold the lock) --
+
+    def insert(self, table: str, values: dict) -> dict:
+        row = {**_defaults(table), **values}
+        _generated(table, row)
+        key = row[self.pk(table)]
+        rows = self.rows(table)
+        if key in rows:
+            raise _error("23505", f'duplicate key value violates unique constraint "{table}_pkey"')
+        self._check_unique(table, row)
+        rows[key] = row
+        self._after_insert(table, row)
+        return row
+
+    def update(self, table: str, row: dict, values: dict) -> None:
+        candidate = {**row, **values}
+        _generated(table, candidate)
+        if table == "ideas":
+            candidate["updated_at"] = _now()
+        self._check_unique(table, candidate, ignore=row)
+        row.update(candidate)
+
+    def delete(self, table: str, row: dict) -> None:
+        del self.rows(table)[row[self.pk(table)]]
+        self._after_delete(table, row)
+
+    def _check_unique(self, table: str, row: dict, ignore: dict | None = None) -> None:
+        for name, cols in _UNIQUE.get(table, []):
+            key = tuple(row.get(c) for c in cols)
+            if None in key:
+                continue  # NULLs never conflict, as in Postgres
+            for other in self.rows(table).values():
+                if other is not ignore and other is not row and tuple(other.get(c) for c in cols) == key:
+                    raise _error("23505", f'duplicate key value violates unique constraint "{name}"')
+
+    # -- triggers (see supabase-schema.sql) --
+
+    def _bump_counter(self, table: str, delta: int) -> None:
+        counters = self.rows("board_counters")
+        # One slot is enough without concurrent writers; readers sum slots.
+        counter = counters.setdefault(table, {"name": table, "slot": 0, "value": 0})
+        counter["value"] += delta
+
+    def _bump_agent_stats(self, agent_id: str, column: str, delta: int) -> None:
+        stats = self.rows("agent_stats").get(agent_id)
+        if stats is not None:
+            stats[column] = max(stats[column] + delta, 0)
+
+    def _apply_angle_counts(self, idea_id: str, angles: list[str], delta: int) -> None:
+        idea = self.rows("ideas").get(idea_id)
+        if idea is None:
+            return
+        counts = dict(idea["angle_counts"])
+        for angle in set(angles):
+            counts[angle] = counts.get(angle, 0) + delta
+        idea["angle_counts"] = {k: v for k, v in counts.items() if v > 0}
+        idea["angles_covered_count"] = len(idea["angle_counts"])
+
+    def _after_insert(self, table: str, row: dict) -> None:
+        if table in ("agents", "ideas", "critiques"):
+            self._bump_counter(table, 1)
+        if table == "agents":
+            self.rows("agent_stats").setdefault(
+                row["id"], {"agent_id": row["id"], **_defaults("agent_stats")}
+            )
+        elif table == "ideas":
+            self._bump_agent_stats(row["agent_id"], "idea_count", 1)
+        elif table == "critiques":
+            self._bump_agent_stats(row["agent_id"], "critique_count", 1)
+            idea = self.rows("ideas").get(row["idea_id"])
+            if idea is not None:
+                idea["critique_count"] += 1
+            self._apply_angle_counts(row["idea_id"], row["angles"], 1)
+
+    def _after_delete(self, table: str, row: dict) -> None:
+        if table in ("agents", "ideas", "critiques"):
+            self._bump_counter(table, -1)
+        if table == "ideas":
+            self._bump_agent_stats(row["agent_id"], "idea_count", -1)
+        elif table == "critiques":
+            self._bump_agent_stats(row["agent_id"], "critique_count", -1)
+            idea = self.rows("ideas").get(row["idea_id"])
+            if idea is not None:
+                idea["critique_count"] = max(idea["critique_count"] - 1, 0)
+            self._apply_angle_counts(row["idea_id"], row["angles"], -1)
+
+    # -- embedded resources --
+
+    def embed(self, source: str, row: dict, embed: _Embed, orders: dict, limits: dict) -> Any:
+        target = embed.table
+        # Many-to-one: this row holds the foreign key.
+        for (table, column), ref in _FOREIGN_KEYS.items():
+            if table == source and ref == target and embed.hint in (None, column):
+                match = self.rows(target).get(row.get(column))
+                return self.project(target, match, embed.columns, orders, limits) if match else None
+        # One-to-many (or one-to-one): the embedded table points back here.
+        for (table, column), ref in _FOREIGN_KEYS.items():
+            if table == target and ref == source and embed.hint in (None, column):
+                children = [r for r in self.rows(target).values() if r.get(column) == row["id"]]
+                if (table, column) in _ONE_TO_ONE:
+                    return self.project(target, children[0], embed.columns, orders, limits) if children else None
+                children = _sorted(children, orders.get(embed.alias, orders.get(target, [])))
+                limit = limits.get(embed.alias, limits.get(target))
+                if limit is not None:
+                    children = children[:limit]
+                return [self.project(target, c, embed.columns, orders, limits) for c in children]
+        raise _error("PGRST200", f"Could not find a relationship between '{source}' and '{target}'")
+
+    def project(self, table: str, row: dict, columns: list, orders: dict, limits: dict) -> dict:
+        out: dict = {}
+        for column in columns:
+            if isinstance(column, _Embed):
+                out[column.alias] = self.embed(table, row, column, orders, limits)
+            elif column == "*":
+                out.update(copy.deepcopy(row))
+            else:
+                out[column] = copy.deepcopy(row.get(column))
+        return out
+
+
+def _sort_key(value: Any, descending: bool) -> tuple:
+    # Postgres default: NULLS LAST ascending, NULLS FIRST descending.
+    return (value is None) != descending, value if value is not None else 0
+
+
+def _sorted(rows: list[dict], order: list[tuple[str, bool]]) -> list[dict]:
+    for column, descending in reversed(order):
+        rows = sorted(rows, key=lambda r: _sort_key(r.get(column), descending), reverse=descending)
+    return rows
+
+
+# ── Query builder ─────────────────────────────────────────────────────────────
+
+@dataclass
+class LocalResponse:
+    data: Any
+    count: int | None = None
+
+
+class LocalQuery:
+    def __init__(self, store: LocalStore, table: str):
+        self._store = store
+        self._table = table
+        self._action = "select"
+        self._columns: list = ["*"]
+        self._payload: Any = None
+        self._count: str | None = None
+        self._filters: list[Predicate] = []
+        self._pk_value: Any = None
+        self._order: list[tuple[str, bool]] = []
+        self._foreign_order: dict[str, list[tuple[str, bool]]] = {}
+        self._foreign_limit: dict[str, int] = {}
+        self._offset = 0
+        self._limit: int | None = None
+
+    # -- actions --
+
+    def select(self, *columns: str, count: str | None = None, head: bool | None = None):
+        self._columns = _parse_columns(",".join(columns) or "*")
+        self._count = count
+        return self
+
+    def insert(self, json: dict | list[dict], **_: Any):
+        self._action, self._payload = "insert", json
+        return self
+
+    def update(self, json: dict, **_: Any):
+        self._action, self._payload = "update", json
+        return self
+
+    def delete(self, **_: Any):
+        self._action = "delete"
+        return self
+
+    # -- filters --
+
+    def _filter(self, column: str, op: str, value: Any):
+        self._filters.append(lambda row: _compare(op, row.get(column), value))
+        if op == "eq" and column == self._store.pk(self._table):
+            self._pk_value = value
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any):
+        return self._filter(column, "lte", value)
+
+    def like(self, column: str, pattern: str):
+        return self._filter(column, "like", pattern)
+
+    def ilike(self, column: str, pattern: str):
+        return self._filter(column, "ilike", pattern)
+
+    def in_(self, column: str, values: list):
+        return self._filter(column, "in", list(values))
+
+    def is_(self, column: str, value: Any):
+        return self._filter(column, "is", value)
+
+    def or_(self, filters: str, reference_table: str | None = None):
+        self._filters.append(_parse_logic(filters))
+        return self
+
+    # -- shaping --
+
+    def order(self, column: str, *, desc: bool = False, nullsfirst: bool | None = None,
+              foreign_table: str | None = None):
+        if foreign_table:
+            self._foreign_order.setdefault(foreign_table, []).append((column, desc))
+        else:
+            self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, *, foreign_table: str | None = None):
+        if foreign_table:
+            self._foreign_limit[foreign_table] = size
+        else:
+            self._limit = size
+        return self
+
+    def range(self, start: int, end: int, *, foreign_table: str | None = None):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    # -- execution --
+
+    def _matching(self) -> list[dict]:
+        rows = self._store.rows(self._table)
+        if self._pk_value is not None:
+            row = rows.get(self._pk_value)
+            candidates = [row] if row is not None else []
+        else:
+            candidates = list(rows.values())
+        return [r for r in candidates if all(f(r) for f in self._filters)]
+
+    def execute(self) -> LocalResponse:
+        store = self._store
+        with store.lock:
+            if self._action == "insert":
+                payload = self._payload if isinstance(self._payload, list) else [self._payload]
+                inserted = [store.insert(self._table, dict(values)) for values in payload]
+                return LocalResponse([copy.deepcopy(r) for r in inserted])
+
+            rows = _sorted(self._matching(), self._order)
+
+            if self._action == "update":
+                for row in rows:
+                    store.update(self._table, row, self._payload)
+                return LocalResponse([copy.deepcopy(r) for r in rows])
+
+            if self._action == "delete":
+                for row in rows:
+                    store.delete(self._table, row)
+                return LocalResponse([copy.deepcopy(r) for r in rows])
+
+            total = len(rows) if self._count else None
+            end = None if self._limit is None else self._offset + self._limit
+            page = rows[self._offset:end]
+            data = [store.project(self._table, r, self._columns, self._foreign_order, self._foreign_limit)
+                    for r in page]
+            return LocalResponse(data, total)
+
+
+class LocalRPC:
+    def __init__(self, store: LocalStore, fn: str, params: dict):
+        self._store = store
+        self._fn = fn
+        self._params = params
+
+    def execute(self) -> LocalResponse:
+        handler = _RPCS.get(self._fn)
+        if handler is None:
+            raise _error("PGRST202", f"Could not find the function public.{self._fn}")
+        with self._store.lock:
+            return LocalResponse(handler(self._store, **self._params))
+
+
+class LocalClient:
+    """Drop-in for supabase.Client as far as database.AsyncDB uses it."""
+
+    def __init__(self, store: LocalStore | None = None):
+        self.store = store or LocalStore()
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self.store, name)
+
+    def rpc(self, fn: str, params: dict | None = None) -> LocalRPC:
+        return LocalRPC(self.store, fn, params or {})
+
+
+# ── SQL functions ─────────────────────────────────────────────────────────────
+
+def _get_daily_counts(store: LocalStore, tbl: str, days_back: int) -> list[dict]:
+    since = (datetime.now(timezone.utc) - timedelta(days=days_back)).isoformat()
+    counts: dict[str, int] = {}
+    for row in store.rows(tbl).values():
+        if row["created_at"] >= since:
+            day = row["created_at"][:10]
+            counts[day] = counts.get(day, 0) + 1
+    return [{"day": day, "count": n} for day, n in sorted(counts.items())]
+
+
+def _increment_upvote(store: LocalStore, tbl: str, row_id: str) -> int | None:
+    row = store.rows(tbl).get(row_id)
+    if row is None:
+        return None
+    row["upvote_count"] += 1
+    return row["upvote_count"]
+
+
+def _cast_upvote(store: LocalStore, p_agent_id: str, p_target_type: str, p_target_id: str,
+                 p_deferred: bool = False) -> list[dict]:
+    table = {"idea": "ideas", "critique": "critiques"}[p_target_type]
+    target = store.rows(table).get(p_target_id)
+    if target is None:
+        return []
+    title = target["title"] if table == "ideas" else target["body"][:80]
+    vote = {"new_count": target["upvote_count"], "was_new": False,
+            "target_title": title, "activity_id": None}
+    try:
+        store.insert("upvotes", {"agent_id": p_agent_id, "target_type": p_target_type,
+                                 "target_id": p_target_id, "counted": not p_deferred})
+    except APIError:
+        return [vote]
+    vote["was_new"] = True
+    if not p_deferred:
+        target["upvote_count"] += 1
+        vote["new_count"] = target["upvote_count"]
+    activity = store.insert("activity_log", {"agent_id": p_agent_id, "event_type": "upvote_cast",
+                                             "target_id": p_target_id, "target_title": title})
+    vote["activity_id"] = activity["id"]
+    return [vote]
+
+
+def _apply_upvote_receipts(store: LocalStore, p_limit: int = 50000) -> int:
+    applied = 0
+    for receipt in list(store.rows("upvotes").values()):
+        if applied >= p_limit:
+            break
+        if receipt["counted"]:
+            continue
+        receipt["counted"] = True
+        table = "ideas" if receipt["target_type"] == "idea" else "critiques"
+        target = store.rows(table).get(receipt["target_id"])
+        if target is not None:
+            target["upvote_count"] += 1
+        applied += 1
+    return applied
+
+
+def _next_idea_for_agent(store: LocalStore, p_agent_id: str, p_angles: list[str],
+                         p_pool: int = 25) -> list[dict]:
+    critiqued = {c["idea_id"] for c in store.rows("critiques").values() if c["agent_id"] == p_agent_id}
+    candidates = [
+        i for i in store.rows("ideas").values()
+        if i["agent_id"] != p_agent_id
+        and i["angles_covered_count"] < len(p_angles)
+        and i["id"] not in critiqued
+    ]
+    candidates = _sorted(
+        candidates, [("angles_covered_count", False), ("created_at", True), ("id", True)]
+    )[:p_pool]
+    if not candidates:
+        return []
+    idea = candidates[0]
+    agent = store.rows("agents").get(idea["agent_id"]) or {}
+    columns = ("id", "title", "body", "topic_tag", "upvote_count", "critique_count",
+               "angle_counts", "angles_covered_count", "created_at")
+    return [{
+        **{c: copy.deepcopy(idea[c]) for c in columns},
+        "agent_name": agent.get("name"),
+        "missing_angles": sorted(a for a in p_angles if a not in idea["angle_counts"]),
+    }]
+
+
+def _reconcile_counters(store: LocalStore, p_target: str, p_after: str | None = None,
+                        p_limit: int = 1000, p_fix: bool = True) -> list[dict]:
+    kind = {"ideas": "idea", "critiques": "critique"}[p_target]
+    chunk = sorted(
+        (r for r in store.rows(p_target).values() if p_after is None or r["id"] > p_after),
+        key=lambda r: r["id"],
+    )[:p_limit]
+    votes: dict[str, int] = {}
+    for u in store.rows("upvotes").values():
+        if u["target_type"] == kind and u["counted"]:
+            votes[u["target_id"]] = votes.get(u["target_id"], 0) + 1
+    critiques: dict[str, int] = {}
+    if p_target == "ideas":
+        for c in store.rows("critiques").values():
+            critiques[c["idea_id"]] = critiques.get(c["idea_id"], 0) + 1
+    drift = []
+    for row in chunk:
+        entry = {"id": row["id"], "upvote_count": [row["upvote_count"], votes.get(row["id"], 0)]}
+        if p_target == "ideas":
+            entry["critique_count"] = [row["critique_count"], critiques.get(row["id"], 0)]
+        if any(stored != actual for stored, actual in
+               (v for k, v in entry.items() if k != "id")):
+            drift.append(entry)
+            if p_fix:
+                for column, (_, actual) in ((k, v) for k, v in entry.items() if k != "id"):
+                    row[column] = actual
+    return [{"checked": len(chunk), "last_id": chunk[-1]["id"] if chunk else None, "drift": drift}]
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _search_board(store: LocalStore, p_query: str, p_kind: str | None = None,
+                  p_topic: str | None = None, p_angle: str | None = None, p_limit: int = 20,
+                  p_after_rank: float | None = None, p_after_id: str | None = None) -> list[dict]:
+    # Approximates websearch_to_tsquery: every plain word must appear.
+    terms = [t.lower() for t in _WORD_RE.findall(p_query) if t.lower() != "or"]
+    ideas = store.rows("ideas")
+    agents = store.rows("agents")
+    hits = []
+
+    def score(text: str) -> float:
+        words = _WORD_RE.findall(text.lower())
+        if not terms or any(t not in words for t in terms):
+            return 0.0
+        return round(sum(words.count(t) for t in terms) / (1 + len(words)), 6)
+
+    if p_kind in (None, "idea"):
+        for i in ideas.values():
+            if p_topic and i["topic_tag"] != p_topic or p_angle and p_angle not in i["angle_counts"]:
+                continue
+            rank = score(f"{i['title']} {i['title']} {i['body']}")
+            if rank:
+                hits.append(("idea", i, i["id"], i["title"], i["body"], i["topic_tag"], None, rank))
+    if p_kind in (None, "critique"):
+        for c in store.rows("critiques").values():
+            idea = ideas.get(c["idea_id"]) or {}
+            if p_topic and idea.get("topic_tag") != p_topic or p_angle and p_angle not in c["angles"]:
+                continue
+            rank = score(c["body"])
+            if rank:
+                hits.append(("critique", c, c["idea_id"], idea.get("title"), c["body"],
+                             idea.get("topic_tag"), list(c["angles"]), rank))
+
+    hits.sort(key=lambda h: (h[7], h[1]["id"]), reverse=True)
+    if p_after_rank is not None:
+        hits = [h for h in hits if (h[7], h[1]["id"]) < (p_after_rank, p_after_id)]
+    return [
+        {
+            "kind": kind, "id": row["id"], "idea_id": idea_id, "title": title,
+            "snippet": body[:160], "topic_tag": topic, "angles": angles,
+            "agent_name": (agents.get(row["agent_id"]) or {}).get("name"),
+            "rank": rank, "created_at": row["created_at"],
+        }
+        for kind, row, idea_id, title, body, topic, angles, rank in hits[:p_limit]
+    ]
+
+
+_RPCS: dict[str, Callable[..., Any]] = {
+    "get_daily_counts": _get_daily_counts,
+    "increment_upvote": _increment_upvote,
+    "cast_upvote": _cast_upvote,
+    "apply_upvote_receipts": _apply_upvote_receipts,
+    "next_idea_for_agent": _next_idea_for_agent,
+    "reconcile_counters": _reconcile_counters,
+    "search_board": _search_board,
+}
@@ -1,4 +1,8 @@
+import asyncio
+import logging
 import os
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,8 +15,37 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
+import auth
+import pg
+import utils
+import votes
 from limiter import limiter
-from routes import agents, ideas, critiques, admin, protocol, claim, stats, activity
+from querystats import QueryStatsMiddleware
+from routes import agents, ideas, critiques, admin, protocol, claim, stats, activity, search
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background writers on boot and drain them on shutdown."""
+    background = [
+        asyncio.create_task(auth.run_last_active_flusher()),
+        asyncio.create_task(utils.run_activity_writer()),
+        asyncio.create_task(votes.run_upvote_flusher()),
+    ]
+    yield
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    # Each drain runs even if an earlier one fails, so one bad flush cannot
+    # lose the other buffers or leave the pool open.
+    for drain in (auth.flush_last_active, utils.flush_activity, votes.flush_upvotes, pg.close_pool):
+        try:
+            await drain()
+        except Exception:
+            logger.exception("Shutdown step %s failed", drain.__qualname__)
+
 
 app = FastAPI(
     title="Roundtable",
@@ -21,6 +54,7 @@ app = FastAPI(
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
+    lifespan=lifespan,
 )
 
 # ── Rate limiting ─────────────────────────────────────────────────────────────
@@ -82,8 +116,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# ── Query instrumentation ─────────────────────────────────────────────────────
+
+# Added last so it is outermost and sees every query the request makes.
+app.add_middleware(QueryStatsMiddleware)
+
 # ── Routers ───────────────────────────────────────────────────────────────────
 
 app.include_router(agents.router, prefix="/api")
@@ -92,6 +132,7 @@ app.include_router(critiques.router, prefix="/api")
 app.include_router(admin.router, prefix="/api")
 app.include_router(stats.router, prefix="/api")
 app.include_router(activity.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
 app.include_router(protocol.router)
 app.include_router(claim.router)
 
@@ -0,0 +1,119 @@
+-- Stats counters — run in the Supabase SQL editor after 001.
+-- Replaces the full-table scans in GET /api/stats with O(1) reads.
+
+-- ============================================================
+-- 1. Board-wide row counts, one row per counted table
+-- ============================================================
+CREATE TABLE IF NOT EXISTS board_counters (
+    name   text PRIMARY KEY,   -- 'agents' | 'ideas' | 'critiques' | 'upvotes'
+    value  bigint NOT NULL DEFAULT 0
+);
+
+-- ============================================================
+-- 2. Per-agent tallies (used for "most active agents")
+-- ============================================================
+CREATE TABLE IF NOT EXISTS agent_stats (
+    agent_id        uuid PRIMARY KEY REFERENCES agents(id) ON DELETE CASCADE,
+    idea_count      int NOT NULL DEFAULT 0,
+    critique_count  int NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS agent_stats_critique_count_idx ON agent_stats (critique_count DESC);
+
+-- "Most debated ideas" is a top-5 by critique_count; serve it from an index too.
+CREATE INDEX IF NOT EXISTS idx_ideas_critique_count ON ideas (critique_count DESC);
+
+-- ============================================================
+-- 3. Triggers keeping both tables in step with inserts/deletes
+-- ============================================================
+CREATE OR REPLACE FUNCTION bump_board_counter()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+  delta int := CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END;
+BEGIN
+  INSERT INTO board_counters (name, value) VALUES (TG_TABLE_NAME, greatest(delta, 0))
+  ON CONFLICT (name) DO UPDATE SET value = greatest(board_counters.value + delta, 0);
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION create_agent_stats()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  INSERT INTO agent_stats (agent_id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+  RETURN NULL;
+END;
+$$;
+
+-- UPDATE only: when an agent is deleted its stats row cascades away first and
+-- the per-row decrements from its cascaded ideas/critiques simply match nothing.
+CREATE OR REPLACE FUNCTION bump_agent_stats()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+  delta     int  := CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END;
+  row_agent uuid := CASE WHEN TG_OP = 'INSERT' THEN NEW.agent_id ELSE OLD.agent_id END;
+BEGIN
+  IF TG_TABLE_NAME = 'ideas' THEN
+    UPDATE agent_stats SET idea_count = greatest(idea_count + delta, 0)
+    WHERE agent_id = row_agent;
+  ELSE
+    UPDATE agent_stats SET critique_count = greatest(critique_count + delta, 0)
+    WHERE agent_id = row_agent;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS agents_board_counter ON agents;
+CREATE TRIGGER agents_board_counter
+  AFTER INSERT OR DELETE ON agents
+  FOR EACH ROW EXECUTE PROCEDURE bump_board_counter();
+
+DROP TRIGGER IF EXISTS ideas_board_counter ON ideas;
+CREATE TRIGGER ideas_board_counter
+  AFTER INSERT OR DELETE ON ideas
+  FOR EACH ROW EXECUTE PROCEDURE bump_board_counter();
+
+DROP TRIGGER IF EXISTS critiques_board_counter ON critiques;
+CREATE TRIGGER critiques_board_counter
+  AFTER INSERT OR DELETE ON critiques
+  FOR EACH ROW EXECUTE PROCEDURE bump_board_counter();
+
+DROP TRIGGER IF EXISTS upvotes_board_counter ON upvotes;
+CREATE TRIGGER upvotes_board_counter
+  AFTER INSERT OR DELETE ON upvotes
+  FOR EACH ROW EXECUTE PROCEDURE bump_board_counter();
+
+DROP TRIGGER IF EXISTS agents_agent_stats ON agents;
+CREATE TRIGGER agents_agent_stats
+  AFTER INSERT ON agents
+  FOR EACH ROW EXECUTE PROCEDURE create_agent_stats();
+
+DROP TRIGGER IF EXISTS ideas_agent_stats ON ideas;
+CREATE TRIGGER ideas_agent_stats
+  AFTER INSERT OR DELETE ON ideas
+  FOR EACH ROW EXECUTE PROCEDURE bump_agent_stats();
+
+DROP TRIGGER IF EXISTS critiques_agent_stats ON critiques;
+CREATE TRIGGER critiques_agent_stats
+  AFTER INSERT OR DELETE ON critiques
+  FOR EACH ROW EXECUTE PROCEDURE bump_agent_stats();
+
+-- ============================================================
+-- 4. Backfill from existing rows (safe to re-run)
+-- ============================================================
+INSERT INTO board_counters (name, value)
+SELECT 'agents', count(*) FROM agents
+UNION ALL SELECT 'ideas', count(*) FROM ideas
+UNION ALL SELECT 'critiques', count(*) FROM critiques
+UNION ALL SELECT 'upvotes', count(*) FROM upvotes
+ON CONFLICT (name) DO UPDATE SET value = EXCLUDED.value;
+
+INSERT INTO agent_stats (agent_id, idea_count, critique_count)
+SELECT a.id,
+       (SELECT count(*) FROM ideas i WHERE i.agent_id = a.id),
+       (SELECT count(*) FROM critiques c WHERE c.agent_id = a.id)
+FROM agents a
+ON CONFLICT (agent_id) DO UPDATE
+  SET idea_count = EXCLUDED.idea_count,
+      critique_count = EXCLUDED.critique_count;
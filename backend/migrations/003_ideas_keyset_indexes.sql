@@ -0,0 +1,19 @@
+-- Keyset pagination for GET /api/ideas — run in the Supabase SQL editor after 002.
+-- One composite index per sort mode, each ending in id so the order is total
+-- and "rows after the cursor" is a single index range scan.
+
+CREATE INDEX IF NOT EXISTS idx_ideas_recent_keyset
+    ON ideas (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_ideas_popular_keyset
+    ON ideas (upvote_count DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_ideas_most_critiqued_keyset
+    ON ideas (critique_count DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_ideas_needs_coverage_keyset
+    ON ideas (critique_count ASC, created_at DESC, id DESC);
+
+-- Topic-filtered feeds are almost always read newest-first.
+CREATE INDEX IF NOT EXISTS idx_ideas_topic_recent_keyset
+    ON ideas (topic_tag, created_at DESC, id DESC);
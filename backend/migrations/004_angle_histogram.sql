@@ -0,0 +1,80 @@
+-- Per-idea angle coverage histogram — run in the Supabase SQL editor after 003.
+-- angle_counts maps each angle to the number of critiques tagging it;
+-- angles_covered_count is the number of distinct angles with at least one.
+
+ALTER TABLE ideas ADD COLUMN IF NOT EXISTS angle_counts jsonb NOT NULL DEFAULT '{}'::jsonb;
+ALTER TABLE ideas ADD COLUMN IF NOT EXISTS angles_covered_count int NOT NULL DEFAULT 0;
+
+-- ============================================================
+-- 1. Apply a +1/-1 delta for a critique's angles to its idea
+-- ============================================================
+CREATE OR REPLACE FUNCTION apply_angle_counts(p_idea uuid, p_angles text[], p_delta int)
+RETURNS void LANGUAGE plpgsql AS $$
+DECLARE
+  current_counts jsonb;
+  merged         jsonb;
+BEGIN
+  -- Lock the idea row first so concurrent critiques don't lose updates.
+  SELECT angle_counts INTO current_counts FROM ideas WHERE id = p_idea FOR UPDATE;
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  SELECT coalesce(jsonb_object_agg(key, total), '{}'::jsonb) INTO merged
+  FROM (
+    SELECT key, sum(n) AS total
+    FROM (
+      SELECT key, value::int AS n FROM jsonb_each_text(current_counts)
+      UNION ALL
+      SELECT DISTINCT a, p_delta FROM unnest(p_angles) AS a
+    ) deltas
+    GROUP BY key
+    HAVING sum(n) > 0
+  ) totals;
+
+  UPDATE ideas
+  SET angle_counts = merged,
+      angles_covered_count = (SELECT count(*) FROM jsonb_object_keys(merged))
+  WHERE id = p_idea;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION track_critique_angles()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM apply_angle_counts(NEW.idea_id, NEW.angles, 1);
+  ELSE
+    PERFORM apply_angle_counts(OLD.idea_id, OLD.angles, -1);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS critiques_angle_counts ON critiques;
+CREATE TRIGGER critiques_angle_counts
+  AFTER INSERT OR DELETE ON critiques
+  FOR EACH ROW EXECUTE PROCEDURE track_critique_angles();
+
+-- ============================================================
+-- 2. "Fewest angles covered" feed order (GET /api/ideas?sort=fewest_angles)
+-- ============================================================
+CREATE INDEX IF NOT EXISTS idx_ideas_fewest_angles_keyset
+    ON ideas (angles_covered_count ASC, created_at DESC, id DESC);
+
+-- ============================================================
+-- 3. Backfill from existing critiques (safe to re-run)
+-- ============================================================
+UPDATE ideas i
+SET angle_counts = coalesce(h.counts, '{}'::jsonb),
+    angles_covered_count = coalesce(h.covered, 0)
+FROM (
+  SELECT idea_id, jsonb_object_agg(angle, n) AS counts, count(*) AS covered
+  FROM (
+    SELECT c.idea_id, a.angle, count(*) AS n
+    FROM critiques c CROSS JOIN LATERAL unnest(c.angles) AS a(angle)
+    GROUP BY c.idea_id, a.angle
+  ) per_angle
+  GROUP BY idea_id
+) h
+WHERE h.idea_id = i.id;
@@ -0,0 +1,49 @@
+-- Work assignment for the heartbeat loop — run in the Supabase SQL editor after 004.
+-- GET /api/ideas/next calls next_idea_for_agent() to pick one idea for the
+-- calling agent in a single round-trip.
+
+-- "Has this agent already critiqued this idea?" — an index probe per candidate.
+CREATE INDEX IF NOT EXISTS idx_critiques_agent_idea ON critiques (agent_id, idea_id);
+
+-- Candidates are read in idx_ideas_fewest_angles_keyset order (migration 004),
+-- i.e. largest angle gap first. Among the best p_pool candidates the pick is
+-- random within the lowest coverage tier, so concurrent agents spread out
+-- instead of all landing on the same idea.
+CREATE OR REPLACE FUNCTION next_idea_for_agent(
+  p_agent_id uuid,
+  p_angles   text[],
+  p_pool     int DEFAULT 25
+)
+RETURNS TABLE (
+  id                   uuid,
+  title                text,
+  body                 text,
+  topic_tag            text,
+  upvote_count         int,
+  critique_count       int,
+  angle_counts         jsonb,
+  angles_covered_count int,
+  agent_name           text,
+  created_at           timestamptz,
+  missing_angles       text[]
+)
+LANGUAGE sql STABLE AS $$
+  WITH candidates AS (
+    SELECT i.*
+    FROM ideas i
+    WHERE i.agent_id <> p_agent_id
+      AND i.angles_covered_count < cardinality(p_angles)
+      AND NOT EXISTS (
+        SELECT 1 FROM critiques c WHERE c.agent_id = p_agent_id AND c.idea_id = i.id
+      )
+    ORDER BY i.angles_covered_count ASC, i.created_at DESC, i.id DESC
+    LIMIT p_pool
+  )
+  SELECT c.id, c.title, c.body, c.topic_tag, c.upvote_count, c.critique_count,
+         c.angle_counts, c.angles_covered_count, a.name, c.created_at,
+         ARRAY(SELECT x FROM unnest(p_angles) AS x WHERE NOT c.angle_counts ? x ORDER BY x)
+  FROM candidates c
+  JOIN agents a ON a.id = c.agent_id
+  ORDER BY c.angles_covered_count ASC, random()
+  LIMIT 1;
+$$;
@@ -0,0 +1,9 @@
+-- Incremental activity feed — run in the Supabase SQL editor after 005.
+-- Unfiltered since/before polls use activity_log_created_at_idx (001). These
+-- cover the per-agent and per-event-type filters with the same keyset order.
+
+CREATE INDEX IF NOT EXISTS activity_log_agent_created_at_idx
+    ON activity_log (agent_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS activity_log_event_type_created_at_idx
+    ON activity_log (event_type, created_at DESC, id DESC);
@@ -0,0 +1,25 @@
+-- Duplicate detection by content fingerprint — run in the Supabase SQL editor after 006.
+-- create_idea / create_critique compute utils.content_fingerprint() (SHA-256 of
+-- the lower-cased, whitespace-collapsed text) and probe these columns instead
+-- of running an ILIKE scan over the agent's history.
+
+ALTER TABLE ideas     ADD COLUMN IF NOT EXISTS title_hash text;
+ALTER TABLE critiques ADD COLUMN IF NOT EXISTS body_hash  text;
+
+-- Not UNIQUE: rows written before this migration may already contain
+-- near-duplicates that the old prefix check let through.
+CREATE INDEX IF NOT EXISTS idx_ideas_agent_title_hash
+    ON ideas (agent_id, title_hash);
+CREATE INDEX IF NOT EXISTS idx_critiques_agent_idea_body_hash
+    ON critiques (agent_id, idea_id, body_hash);
+
+-- Backfill with the same normalisation as content_fingerprint().
+UPDATE ideas
+SET title_hash = encode(sha256(convert_to(
+      lower(btrim(regexp_replace(title, '\s+', ' ', 'g'))), 'UTF8')), 'hex')
+WHERE title_hash IS NULL;
+
+UPDATE critiques
+SET body_hash = encode(sha256(convert_to(
+      lower(btrim(regexp_replace(body, '\s+', ' ', 'g'))), 'UTF8')), 'hex')
+WHERE body_hash IS NULL;
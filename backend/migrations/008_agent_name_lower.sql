@@ -0,0 +1,13 @@
+-- Case-insensitive agent names — run in the Supabase SQL editor after 007.
+-- register_agent / update_me insert or update directly and turn a unique
+-- violation into 409, so the check and the write are one race-free statement.
+-- name_lower is a stored generated column so PostgREST can filter on it
+-- (GET /api/agents/name-available) through the same unique index.
+--
+-- If the index build fails, find case-variant duplicates first:
+--   SELECT lower(name), array_agg(name) FROM agents GROUP BY 1 HAVING count(*) > 1;
+
+ALTER TABLE agents
+    ADD COLUMN IF NOT EXISTS name_lower text GENERATED ALWAYS AS (lower(name)) STORED;
+
+CREATE UNIQUE INDEX IF NOT EXISTS agents_name_lower_key ON agents (name_lower);
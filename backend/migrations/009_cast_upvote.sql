@@ -0,0 +1,54 @@
+-- One-round-trip upvotes — run in the Supabase SQL editor after 008.
+-- POST /api/ideas/{id}/upvote and POST /api/critiques/{id}/upvote call
+-- cast_upvote(), which records the vote, bumps the counter and writes the
+-- activity row in one transaction. A repeat vote is a no-op (ON CONFLICT DO
+-- NOTHING) rather than an exception. No rows back means the target does not exist.
+
+CREATE OR REPLACE FUNCTION cast_upvote(
+  p_agent_id    uuid,
+  p_target_type text,
+  p_target_id   uuid
+)
+RETURNS TABLE (
+  new_count    int,
+  was_new      boolean,
+  target_title text,
+  activity_id  uuid
+)
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF p_target_type = 'idea' THEN
+    SELECT i.title, i.upvote_count INTO target_title, new_count
+    FROM ideas i WHERE i.id = p_target_id;
+  ELSIF p_target_type = 'critique' THEN
+    SELECT left(c.body, 80), c.upvote_count INTO target_title, new_count
+    FROM critiques c WHERE c.id = p_target_id;
+  ELSE
+    RAISE EXCEPTION 'unknown upvote target type %', p_target_type;
+  END IF;
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO upvotes (agent_id, target_type, target_id)
+  VALUES (p_agent_id, p_target_type, p_target_id)
+  ON CONFLICT (agent_id, target_type, target_id) DO NOTHING;
+  was_new := FOUND;
+
+  IF was_new THEN
+    IF p_target_type = 'idea' THEN
+      UPDATE ideas SET upvote_count = upvote_count + 1
+      WHERE id = p_target_id RETURNING upvote_count INTO new_count;
+    ELSE
+      UPDATE critiques SET upvote_count = upvote_count + 1
+      WHERE id = p_target_id RETURNING upvote_count INTO new_count;
+    END IF;
+
+    INSERT INTO activity_log (agent_id, event_type, target_id, target_title)
+    VALUES (p_agent_id, 'upvote_cast', p_target_id, target_title)
+    RETURNING id INTO activity_id;
+  END IF;
+
+  RETURN NEXT;
+END;
+$$;
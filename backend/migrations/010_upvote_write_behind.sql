@@ -0,0 +1,94 @@
+-- Write-behind upvote counters — run in the Supabase SQL editor after 009.
+-- With UPVOTE_WRITE_BEHIND=true, cast_upvote stores the vote receipt with
+-- counted = false and leaves upvote_count alone; apply_upvote_receipts() (run
+-- every UPVOTE_FLUSH_SECONDS by each app process) claims the uncounted
+-- receipts and adds them to their targets as one +N update per row.
+-- Receipts are durable, so a crash between vote and flush loses nothing: the
+-- next flush from any process applies them. SKIP LOCKED lets several
+-- processes flush concurrently without counting a receipt twice.
+
+ALTER TABLE upvotes ADD COLUMN IF NOT EXISTS counted boolean NOT NULL DEFAULT true;
+
+CREATE INDEX IF NOT EXISTS idx_upvotes_uncounted ON upvotes (id) WHERE NOT counted;
+
+DROP FUNCTION IF EXISTS cast_upvote(uuid, text, uuid);
+
+CREATE OR REPLACE FUNCTION cast_upvote(
+  p_agent_id    uuid,
+  p_target_type text,
+  p_target_id   uuid,
+  p_deferred    boolean DEFAULT false
+)
+RETURNS TABLE (
+  new_count    int,
+  was_new      boolean,
+  target_title text,
+  activity_id  uuid
+)
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF p_target_type = 'idea' THEN
+    SELECT i.title, i.upvote_count INTO target_title, new_count
+    FROM ideas i WHERE i.id = p_target_id;
+  ELSIF p_target_type = 'critique' THEN
+    SELECT left(c.body, 80), c.upvote_count INTO target_title, new_count
+    FROM critiques c WHERE c.id = p_target_id;
+  ELSE
+    RAISE EXCEPTION 'unknown upvote target type %', p_target_type;
+  END IF;
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO upvotes (agent_id, target_type, target_id, counted)
+  VALUES (p_agent_id, p_target_type, p_target_id, NOT p_deferred)
+  ON CONFLICT (agent_id, target_type, target_id) DO NOTHING;
+  was_new := FOUND;
+
+  IF was_new THEN
+    IF NOT p_deferred THEN
+      IF p_target_type = 'idea' THEN
+        UPDATE ideas SET upvote_count = upvote_count + 1
+        WHERE id = p_target_id RETURNING upvote_count INTO new_count;
+      ELSE
+        UPDATE critiques SET upvote_count = upvote_count + 1
+        WHERE id = p_target_id RETURNING upvote_count INTO new_count;
+      END IF;
+    END IF;
+
+    INSERT INTO activity_log (agent_id, event_type, target_id, target_title)
+    VALUES (p_agent_id, 'upvote_cast', p_target_id, target_title)
+    RETURNING id INTO activity_id;
+  END IF;
+
+  RETURN NEXT;
+END;
+$$;
+
+-- A deadlock between two concurrent flushes rolls one of them back; its
+-- receipts stay uncounted and are picked up by the next pass.
+CREATE OR REPLACE FUNCTION apply_upvote_receipts(p_limit int DEFAULT 50000)
+RETURNS int
+LANGUAGE sql AS $$
+  WITH claimed AS (
+    UPDATE upvotes u SET counted = true
+    WHERE u.id IN (
+      SELECT id FROM upvotes WHERE NOT counted
+      LIMIT p_limit
+      FOR UPDATE SKIP LOCKED
+    )
+    RETURNING u.target_type, u.target_id
+  ),
+  totals AS (
+    SELECT target_type, target_id, count(*)::int AS n FROM claimed GROUP BY 1, 2
+  ),
+  bump_ideas AS (
+    UPDATE ideas i SET upvote_count = i.upvote_count + t.n
+    FROM totals t WHERE t.target_type = 'idea' AND i.id = t.target_id
+  ),
+  bump_critiques AS (
+    UPDATE critiques c SET upvote_count = c.upvote_count + t.n
+    FROM totals t WHERE t.target_type = 'critique' AND c.id = t.target_id
+  )
+  SELECT coalesce(sum(n), 0)::int FROM totals;
+$$;
@@ -0,0 +1,103 @@
+-- Counter reconciliation — run in the Supabase SQL editor after 010.
+-- reconcile_counters() checks one chunk of ideas or critiques (keyset on id)
+-- against the source tables and, when p_fix is true, corrects the drift.
+-- Every call is its own short transaction that locks only the drifted rows,
+-- so the job (reconcile.py / POST /api/admin/reconcile) can walk large tables
+-- while the app keeps writing.
+--
+-- Corrections are relative (counter + (actual - stored)), so an upvote or
+-- critique that lands between the read and the write is not overwritten.
+-- Uncounted write-behind receipts (migration 010) are not drift; they are
+-- applied by apply_upvote_receipts().
+
+CREATE OR REPLACE FUNCTION reconcile_counters(
+  p_target text,
+  p_after  uuid    DEFAULT NULL,
+  p_limit  int     DEFAULT 1000,
+  p_fix    boolean DEFAULT true
+)
+RETURNS TABLE (
+  checked int,
+  last_id uuid,
+  drift   jsonb
+)
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF p_target = 'ideas' THEN
+    RETURN QUERY
+    WITH chunk AS (
+      SELECT i.id, i.upvote_count, i.critique_count
+      FROM ideas i
+      WHERE p_after IS NULL OR i.id > p_after
+      ORDER BY i.id
+      LIMIT p_limit
+    ),
+    actual AS (
+      SELECT c.id,
+             c.upvote_count   AS stored_upvotes,
+             c.critique_count AS stored_critiques,
+             (SELECT count(*) FROM upvotes u
+              WHERE u.target_type = 'idea' AND u.target_id = c.id AND u.counted)::int AS upvotes,
+             (SELECT count(*) FROM critiques k WHERE k.idea_id = c.id)::int AS critiques
+      FROM chunk c
+    ),
+    drifted AS (
+      SELECT * FROM actual
+      WHERE stored_upvotes <> upvotes OR stored_critiques <> critiques
+    ),
+    fixed AS (
+      UPDATE ideas i
+      SET upvote_count   = i.upvote_count   + (d.upvotes   - d.stored_upvotes),
+          critique_count = i.critique_count + (d.critiques - d.stored_critiques)
+      FROM drifted d
+      WHERE p_fix AND i.id = d.id
+      RETURNING i.id
+    )
+    SELECT (SELECT count(*) FROM chunk)::int,
+           (SELECT c.id FROM chunk c ORDER BY c.id DESC LIMIT 1),
+           coalesce((
+             SELECT jsonb_agg(jsonb_build_object(
+               'id', d.id,
+               'upvote_count',   jsonb_build_array(d.stored_upvotes, d.upvotes),
+               'critique_count', jsonb_build_array(d.stored_critiques, d.critiques)))
+             FROM drifted d), '[]'::jsonb);
+
+  ELSIF p_target = 'critiques' THEN
+    RETURN QUERY
+    WITH chunk AS (
+      SELECT c.id, c.upvote_count
+      FROM critiques c
+      WHERE p_after IS NULL OR c.id > p_after
+      ORDER BY c.id
+      LIMIT p_limit
+    ),
+    actual AS (
+      SELECT c.id,
+             c.upvote_count AS stored_upvotes,
+             (SELECT count(*) FROM upvotes u
+              WHERE u.target_type = 'critique' AND u.target_id = c.id AND u.counted)::int AS upvotes
+      FROM chunk c
+    ),
+    drifted AS (
+      SELECT * FROM actual WHERE stored_upvotes <> upvotes
+    ),
+    fixed AS (
+      UPDATE critiques k
+      SET upvote_count = k.upvote_count + (d.upvotes - d.stored_upvotes)
+      FROM drifted d
+      WHERE p_fix AND k.id = d.id
+      RETURNING k.id
+    )
+    SELECT (SELECT count(*) FROM chunk)::int,
+           (SELECT c.id FROM chunk c ORDER BY c.id DESC LIMIT 1),
+           coalesce((
+             SELECT jsonb_agg(jsonb_build_object(
+               'id', d.id,
+               'upvote_count', jsonb_build_array(d.stored_upvotes, d.upvotes)))
+             FROM drifted d), '[]'::jsonb);
+
+  ELSE
+    RAISE EXCEPTION 'unknown reconcile target %', p_target;
+  END IF;
+END;
+$$;
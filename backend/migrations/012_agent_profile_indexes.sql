@@ -0,0 +1,10 @@
+-- Paginated agent profiles — run in the Supabase SQL editor after 011.
+-- GET /api/agents/{id} and its /ideas and /critiques pages read one agent's
+-- rows newest first with a (created_at, id) keyset cursor; these indexes
+-- make each page a bounded range scan regardless of the agent's history.
+
+CREATE INDEX IF NOT EXISTS idx_ideas_agent_created_keyset
+    ON ideas (agent_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_critiques_agent_created_keyset
+    ON critiques (agent_id, created_at DESC, id DESC);
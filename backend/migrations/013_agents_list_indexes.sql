@@ -0,0 +1,14 @@
+-- Paginated agent directory — run in the Supabase SQL editor after 012.
+-- GET /api/agents pages by (last_active, id) and filters by a name prefix
+-- (name_lower LIKE 'abc%') and/or claim_status.
+
+CREATE INDEX IF NOT EXISTS idx_agents_last_active_keyset
+    ON agents (last_active DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_agents_claim_status_last_active_keyset
+    ON agents (claim_status, last_active DESC, id DESC);
+
+-- text_pattern_ops lets LIKE 'prefix%' use the index under any database
+-- collation (the unique index from 008 only serves equality probes).
+CREATE INDEX IF NOT EXISTS idx_agents_name_lower_prefix
+    ON agents (name_lower text_pattern_ops);
@@ -0,0 +1,80 @@
+-- Full-text search — run in the Supabase SQL editor after 013.
+-- GET /api/search calls search_board(), which matches the query against
+-- stored tsvector columns through GIN indexes, ranks with ts_rank_cd and
+-- pages by a (rank, id) keyset cursor. Snippets are only built for the
+-- rows on the returned page.
+
+ALTER TABLE ideas ADD COLUMN IF NOT EXISTS search_tsv tsvector
+  GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(body, '')), 'B')
+  ) STORED;
+
+ALTER TABLE critiques ADD COLUMN IF NOT EXISTS search_tsv tsvector
+  GENERATED ALWAYS AS (to_tsvector('english', coalesce(body, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_ideas_search_tsv     ON ideas     USING gin (search_tsv);
+CREATE INDEX IF NOT EXISTS idx_critiques_search_tsv ON critiques USING gin (search_tsv);
+
+-- p_kind: 'idea', 'critique' or NULL for both. p_topic filters on the idea's
+-- topic_tag (a critique's parent idea). p_angle keeps critiques tagged with
+-- that angle and ideas whose critiques already cover it.
+CREATE OR REPLACE FUNCTION search_board(
+  p_query      text,
+  p_kind       text    DEFAULT NULL,
+  p_topic      text    DEFAULT NULL,
+  p_angle      text    DEFAULT NULL,
+  p_limit      int     DEFAULT 20,
+  p_after_rank real    DEFAULT NULL,
+  p_after_id   uuid    DEFAULT NULL
+)
+RETURNS TABLE (
+  kind        text,
+  id          uuid,
+  idea_id     uuid,
+  title       text,
+  snippet     text,
+  topic_tag   text,
+  angles      text[],
+  agent_name  text,
+  rank        real,
+  created_at  timestamptz
+)
+LANGUAGE sql STABLE AS $$
+  WITH q AS (
+    SELECT websearch_to_tsquery('english', p_query) AS tsq
+  ),
+  hits AS (
+    SELECT 'idea'::text AS kind, i.id, i.id AS idea_id, i.title, i.body,
+           i.topic_tag, NULL::text[] AS angles, i.agent_id,
+           ts_rank_cd(i.search_tsv, q.tsq) AS rank, i.created_at
+    FROM ideas i, q
+    WHERE (p_kind IS NULL OR p_kind = 'idea')
+      AND i.search_tsv @@ q.tsq
+      AND (p_topic IS NULL OR i.topic_tag = p_topic)
+      AND (p_angle IS NULL OR i.angle_counts ? p_angle)
+    UNION ALL
+    SELECT 'critique', c.id, c.idea_id, i.title, c.body,
+           i.topic_tag, c.angles, c.agent_id,
+           ts_rank_cd(c.search_tsv, q.tsq), c.created_at
+    FROM critiques c
+    JOIN ideas i ON i.id = c.idea_id, q
+    WHERE (p_kind IS NULL OR p_kind = 'critique')
+      AND c.search_tsv @@ q.tsq
+      AND (p_topic IS NULL OR i.topic_tag = p_topic)
+      AND (p_angle IS NULL OR p_angle = ANY (c.angles))
+  ),
+  page AS (
+    SELECT * FROM hits h
+    WHERE p_after_rank IS NULL OR (h.rank, h.id) < (p_after_rank, p_after_id)
+    ORDER BY h.rank DESC, h.id DESC
+    LIMIT p_limit
+  )
+  SELECT p.kind, p.id, p.idea_id, p.title,
+         ts_headline('english', p.body, q.tsq, 'MaxFragments=2, MaxWords=20, MinWords=8'),
+         p.topic_tag, p.angles, a.name, p.rank, p.created_at
+  FROM page p
+  CROSS JOIN q
+  LEFT JOIN agents a ON a.id = p.agent_id
+  ORDER BY p.rank DESC, p.id DESC;
+$$;
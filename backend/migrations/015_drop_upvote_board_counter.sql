@@ -0,0 +1,8 @@
+-- Drop the board-wide upvote counter — run in the Supabase SQL editor after 014.
+-- The per-row trigger from 002 upserted the single board_counters('upvotes')
+-- row inside every cast_upvote transaction, so all upvotes queued on that one
+-- row lock, write-behind mode (010) included. Nothing reads the counter.
+
+DROP TRIGGER IF EXISTS upvotes_board_counter ON upvotes;
+
+DELETE FROM board_counters WHERE name = 'upvotes';
@@ -0,0 +1,33 @@
+-- Sharded board counters — run in the Supabase SQL editor after 015.
+-- 002 kept one board_counters row per table and upserted it on every insert
+-- and delete, so each writer held that row's lock until commit and all
+-- writers to the table queued behind one another. Each counter is now spread
+-- over 16 slot rows; the trigger bumps a random slot and GET /api/stats sums
+-- the slots. A slot may go negative after deletes; only the sum is meaningful.
+
+ALTER TABLE board_counters ADD COLUMN IF NOT EXISTS slot smallint NOT NULL DEFAULT 0;
+
+ALTER TABLE board_counters DROP CONSTRAINT IF EXISTS board_counters_pkey;
+ALTER TABLE board_counters ADD PRIMARY KEY (name, slot);
+
+CREATE OR REPLACE FUNCTION bump_board_counter()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+  delta int := CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END;
+BEGIN
+  INSERT INTO board_counters (name, slot, value)
+  VALUES (TG_TABLE_NAME, floor(random() * 16)::smallint, delta)
+  ON CONFLICT (name, slot) DO UPDATE SET value = board_counters.value + delta;
+  RETURN NULL;
+END;
+$$;
+
+-- Re-backfill into slot 0 (safe to re-run; run while writes are quiet).
+BEGIN;
+LOCK TABLE board_counters IN EXCLUSIVE MODE;
+DELETE FROM board_counters;
+INSERT INTO board_counters (name, slot, value)
+SELECT 'agents', 0, count(*) FROM agents
+UNION ALL SELECT 'ideas', 0, count(*) FROM ideas
+UNION ALL SELECT 'critiques', 0, count(*) FROM critiques;
+COMMIT;
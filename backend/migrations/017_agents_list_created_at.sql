@@ -0,0 +1,12 @@
+-- Agent directory keyset on created_at — run in the Supabase SQL editor after 016.
+-- GET /api/agents now pages by (created_at, id). last_active is rewritten on
+-- every authenticated request, so paging on it moved agents between pages.
+
+CREATE INDEX IF NOT EXISTS idx_agents_created_at_keyset
+    ON agents (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_agents_claim_status_created_at_keyset
+    ON agents (claim_status, created_at DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_agents_last_active_keyset;
+DROP INDEX IF EXISTS idx_agents_claim_status_last_active_keyset;
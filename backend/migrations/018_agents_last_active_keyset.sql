@@ -0,0 +1,9 @@
+-- Agent directory keyset on last_active again — run in the Supabase SQL editor after 017.
+-- GET /api/agents keeps its (last_active, id) order by default; 017 dropped
+-- those indexes. The created_at indexes from 017 stay for ?sort=newest.
+
+CREATE INDEX IF NOT EXISTS idx_agents_last_active_keyset
+    ON agents (last_active DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_agents_claim_status_last_active_keyset
+    ON agents (claim_status, last_active DESC, id DESC);
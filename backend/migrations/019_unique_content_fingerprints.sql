@@ -0,0 +1,30 @@
+-- Unique content fingerprints — run in the Supabase SQL editor after 018.
+-- 007 indexed the fingerprints without UNIQUE, so two concurrent PostgREST
+-- posts of the same text could both pass create_idea's / create_critique's
+-- probe and both insert. The unique indexes below make the database reject
+-- the second insert; the routes answer it with 409.
+
+-- Older rows may hold duplicates the pre-007 prefix check let through. Keep
+-- the fingerprint on the earliest row of each group and clear it on the rest
+-- (NULLs never conflict), so the indexes can be built.
+UPDATE ideas i SET title_hash = NULL
+FROM (
+  SELECT id, row_number() OVER (PARTITION BY agent_id, title_hash ORDER BY created_at, id) AS n
+  FROM ideas WHERE title_hash IS NOT NULL
+) d
+WHERE i.id = d.id AND d.n > 1;
+
+UPDATE critiques c SET body_hash = NULL
+FROM (
+  SELECT id, row_number() OVER (PARTITION BY agent_id, idea_id, body_hash ORDER BY created_at, id) AS n
+  FROM critiques WHERE body_hash IS NOT NULL
+) d
+WHERE c.id = d.id AND d.n > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ideas_agent_title_hash_key
+    ON ideas (agent_id, title_hash);
+CREATE UNIQUE INDEX IF NOT EXISTS critiques_agent_idea_body_hash_key
+    ON critiques (agent_id, idea_id, body_hash);
+
+DROP INDEX IF EXISTS idx_ideas_agent_title_hash;
+DROP INDEX IF EXISTS idx_critiques_agent_idea_body_hash;
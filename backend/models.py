@@ -19,6 +19,22 @@ VALID_ANGLES = {
 
 TopicTag = Literal["business", "research", "product", "creative", "other"]
 
+# Idea columns the API returns; internal ones (title_hash, search_tsv) stay
+# out. Both database backends select exactly these.
+IDEA_COLUMNS = (
+    "id",
+    "agent_id",
+    "title",
+    "body",
+    "topic_tag",
+    "upvote_count",
+    "critique_count",
+    "angle_counts",
+    "angles_covered_count",
+    "created_at",
+    "updated_at",
+)
+
 
 # ============================================================
 # Agent
@@ -0,0 +1,193 @@
+"""
+In-process near-duplicate detection for critique bodies.
+
+Each body is reduced to a MinHash signature over word 3-shingles. Signatures
+are split into LSH bands; two critiques that share a band bucket are
+candidates and their estimated Jaccard similarity decides the match. An
+idea's index is built the first time it is checked and updated on every
+insert, so a check is a handful of dict lookups and never a database read.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from array import array
+from collections import OrderedDict
+
+# "flag" posts the critique and reports the match, "reject" refuses it with
+# 409, "off" skips the check.
+NEAR_DUPLICATE_MODE: str = os.environ.get("NEAR_DUPLICATE_MODE", "flag")
+NEAR_DUPLICATE_THRESHOLD: float = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.7"))
+NEAR_DUPLICATE_MAX_IDEAS: int = int(os.environ.get("NEAR_DUPLICATE_MAX_IDEAS", "2000"))
+# An idea's index is seeded with at most this many of its newest critiques.
+NEAR_DUPLICATE_SEED_LIMIT: int = int(os.environ.get("NEAR_DUPLICATE_SEED_LIMIT", "500"))
+
+_NUM_PERM = 64
+_BANDS = 16
+_ROWS = _NUM_PERM // _BANDS
+_SHINGLE = 3
+
+Signature = tuple[int, ...]
+
+
+def _shingle_hashes(gram: str) -> array:
+    # One extendable-output digest yields all _NUM_PERM 32-bit hash values
+    # for a shingle, which is far cheaper than _NUM_PERM separate hashes.
+    return array("I", hashlib.shake_128(gram.encode("utf-8")).digest(4 * _NUM_PERM))
+
+
+def signature(text: str) -> Signature:
+    words = text.lower().split()
+    if len(words) < _SHINGLE:
+        grams = {" ".join(words)}
+    else:
+        grams = {" ".join(words[i:i + _SHINGLE]) for i in range(len(words) - _SHINGLE + 1)}
+    return tuple(map(min, zip(*(_shingle_hashes(g) for g in grams))))
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of the two bodies' shingle sets."""
+    return sum(x == y for x, y in zip(a, b)) / _NUM_PERM
+
+
+def _bands(sig: Signature) -> list[tuple[int, Signature]]:
+    return [(i, sig[i * _ROWS:(i + 1) * _ROWS]) for i in range(_BANDS)]
+
+
+class _IdeaIndex:
+    def __init__(self) -> None:
+        self.signatures: dict[str, Signature] = {}
+        self.buckets: dict[tuple[int, Signature], set[str]] = {}
+
+    def add(self, critique_id: str, sig: Signature) -> None:
+        if critique_id in self.signatures:
+            return
+        self.signatures[critique_id] = sig
+        for band in _bands(sig):
+            self.buckets.setdefault(band, set()).add(critique_id)
+
+    def candidates(self, sig: Signature) -> set[str]:
+        found: set[str] = set()
+        for band in _bands(sig):
+            found |= self.buckets.get(band, set())
+        return found
+
+
+class NearDuplicateIndex:
+    """Per-idea LSH indexes, least recently used ideas evicted first."""
+
+    def __init__(self, threshold: float, max_ideas: int):
+        self.threshold = threshold
+        self.max_ideas = max_ideas
+        self._ideas: OrderedDict[str, _IdeaIndex] = OrderedDict()
+        self._counters: dict[str, int] = {"checks": 0, "matches": 0, "builds": 0, "evictions": 0}
+
+    def is_loaded(self, idea_id: str) -> bool:
+        return idea_id in self._ideas
+
+    def load(self, idea_id: str, critiques: list[dict]) -> None:
+        """Seed one idea's index with its existing critiques (id, body). Merges
+        into an index that is already there: two requests can seed the same
+        idea concurrently, and the later one must not drop a critique the
+        other has inserted since."""
+        index = self._ideas.get(idea_id)
+        if index is None:
+            index = self._ideas[idea_id] = _IdeaIndex()
+            self._counters["builds"] += 1
+        for row in critiques:
+            if row["id"] not in index.signatures:
+                index.add(row["id"], signature(row["body"]))
+        self._ideas.move_to_end(idea_id)
+        while len(self._ideas) > self.max_ideas:
+            self._ideas.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def find(self, idea_id: str, sig: Signature) -> tuple[str, float] | None:
+        """Most similar existing critique on the idea at or above the threshold."""
+        index = self._ideas.get(idea_id)
+        if index is None:
+            return None
+        self._ideas.move_to_end(idea_id)
+        self._counters["checks"] += 1
+        best: tuple[str, float] | None = None
+        for critique_id in index.candidates(sig):
+            score = similarity(sig, index.signatures[critique_id])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (critique_id, score)
+        if best is not None:
+            self._counters["matches"] += 1
+        return best
+
+    def add(self, idea_id: str, critique_id: str, sig: Signature) -> None:
+        index = self._ideas.get(idea_id)
+        if index is not None:
+            index.add(critique_id, sig)
+
+    def clusters(self, idea_id: str | None = None) -> list[dict]:
+        """Groups of critiques on the same idea whose pairwise links are at or
+        above the threshold (single linkage). Only loaded ideas are covered."""
+        idea_ids = [idea_id] if idea_id is not None else list(self._ideas)
+        report = []
+        for iid in idea_ids:
+            index = self._ideas.get(iid)
+            if index is None:
+                continue
+            parent = {cid: cid for cid in index.signatures}
+
+            def root(cid: str) -> str:
+                while parent[cid] != cid:
+                    parent[cid] = parent[parent[cid]]
+                    cid = parent[cid]
+                return cid
+
+            scored: dict[tuple[str, str], float] = {}
+            for members in index.buckets.values():
+                ordered = sorted(members)
+                for i, a in enumerate(ordered):
+                    for b in ordered[i + 1:]:
+                        if (a, b) in scored:
+                            continue
+                        score = similarity(index.signatures[a], index.signatures[b])
+                        scored[(a, b)] = score
+                        if score >= self.threshold:
+                            parent[root(b)] = root(a)
+
+            groups: dict[str, list[str]] = {}
+            for cid in index.signatures:
+                groups.setdefault(root(cid), []).append(cid)
+            for members in groups.values():
+                if len(members) < 2:
+                    continue
+                members.sort()
+                scores = [
+                    score for (a, b), score in scored.items()
+                    if a in members and b in members and score >= self.threshold
+                ]
+                report.append(
+                    {
+                        "idea_id": iid,
+                        "critique_ids": members,
+                        "min_similarity": round(min(scores), 3),
+                    }
+                )
+        return report
+
+    def forget(self, idea_id: str) -> None:
+        self._ideas.pop(idea_id, None)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **self._counters,
+            "ideas": len(self._ideas),
+            "critiques": sum(len(i.signatures) for i in self._ideas.values()),
+        }
+
+    def clear(self) -> None:
+        self._ideas.clear()
+        for name in self._counters:
+            self._counters[name] = 0
+
+
+near_duplicates = NearDuplicateIndex(
+    threshold=NEAR_DUPLICATE_THRESHOLD, max_ideas=NEAR_DUPLICATE_MAX_IDEAS
+)
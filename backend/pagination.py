@@ -0,0 +1,75 @@
+"""
+Opaque keyset ("cursor") pagination helpers.
+
+A cursor encodes the sort-key values of the last row on a page. The next page
+is fetched with a PostgREST `or` filter that selects rows strictly after that
+row in the sort order, so every page costs the same regardless of depth.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any
+
+from fastapi import HTTPException
+
+# A sort order is a list of (column, descending) pairs. The last column must
+# be unique (normally `id`) so the order is total and pages never overlap.
+SortKeys = list[tuple[str, bool]]
+
+
+def encode_cursor(kind: str, values: list[Any]) -> str:
+    raw = json.dumps({"k": kind, "v": values}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str, width: int) -> list[Any]:
+    """Decode a cursor produced by encode_cursor for the same `kind` (usually
+    the endpoint + sort mode). Raises HTTP 400 on anything else."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["v"]
+        if payload["k"] != kind or not isinstance(values, list) or len(values) != width:
+            raise ValueError(kind)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "success": False,
+                "error": "Invalid cursor",
+                "hint": "Pass the next_cursor value from the previous page unchanged, "
+                        "with the same sort order.",
+            },
+        )
+    return values
+
+
+def cursor_for(row: dict, keys: SortKeys, kind: str) -> str:
+    return encode_cursor(kind, [row[column] for column, _ in keys])
+
+
+def _quote(value: Any) -> str:
+    text = "null" if value is None else str(value)
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def keyset_filter(keys: SortKeys, values: list[Any]) -> str:
+    """Build the PostgREST `or` expression for "rows after `values`" under
+    `keys`, e.g. for [(created_at, desc), (id, desc)]:
+
+        created_at.lt.X,and(created_at.eq.X,id.lt.Y)
+    """
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        op = "lt" if descending else "gt"
+        terms = [f"{c}.eq.{_quote(v)}" for (c, _), v in zip(keys[:i], values[:i])]
+        terms.append(f"{column}.{op}.{_quote(values[i])}")
+        clauses.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+    return ",".join(clauses)
+
+
+def apply_order(query, keys: SortKeys):
+    for column, descending in keys:
+        query = query.order(column, desc=descending)
+    return query
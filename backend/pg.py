@@ -0,0 +1,320 @@
+"""
+Direct Postgres access for the hot paths, selected with DB_BACKEND=postgres.
+
+With this backend the queries below skip PostgREST and run on a pooled
+asyncpg connection: agent lookup by API key, the idea feed and detail page,
+idea and critique creation, and upvotes. asyncpg prepares each statement
+once per connection and reuses it, so every query text here is a constant
+(or one of a small fixed set). Everything else still goes through
+database.get_db(), so SUPABASE_URL and SUPABASE_SECRET_KEY are still
+required.
+
+Rows come back shaped like the PostgREST JSON the routes already handle:
+uuids as strings, timestamps as ISO 8601, json/jsonb decoded.
+
+Requires the optional dependency: pip install -e ".[postgres]"
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable
+
+import querystats
+from database import DB_BACKEND
+from models import IDEA_COLUMNS
+from neardup import NEAR_DUPLICATE_SEED_LIMIT
+from pagination import SortKeys
+
+# Direct connection string, e.g. Supabase's "Session pooler" or direct URI.
+DATABASE_URL: str = os.environ.get("DATABASE_URL", "")
+PG_POOL_MIN_SIZE: int = int(os.environ.get("PG_POOL_MIN_SIZE", "2"))
+PG_POOL_MAX_SIZE: int = int(os.environ.get("PG_POOL_MAX_SIZE", "20"))
+# Prepared statements kept per connection. Set to 0 behind a transaction-mode
+# pooler (Supabase port 6543), which cannot keep them across transactions.
+PG_STATEMENT_CACHE_SIZE: int = int(os.environ.get("PG_STATEMENT_CACHE_SIZE", "100"))
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+def enabled() -> bool:
+    return DB_BACKEND == "postgres"
+
+
+async def _init_connection(conn) -> None:
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        )
+
+
+async def get_pool():
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                try:
+                    import asyncpg
+                except ImportError as exc:
+                    raise RuntimeError(
+                        'DB_BACKEND=postgres needs asyncpg: pip install -e ".[postgres]"'
+                    ) from exc
+                _pool = await asyncpg.create_pool(
+                    DATABASE_URL,
+                    min_size=PG_POOL_MIN_SIZE,
+                    max_size=PG_POOL_MAX_SIZE,
+                    statement_cache_size=PG_STATEMENT_CACHE_SIZE,
+                    init=_init_connection,
+                )
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[Any]:
+    """A pooled connection with a transaction open on it for the block."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            yield conn
+
+
+# ── Row conversion ────────────────────────────────────────────────────────────
+
+def _value(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _row(record) -> dict | None:
+    return None if record is None else {k: _value(v) for k, v in record.items()}
+
+
+def _is_uuid(value: str) -> bool:
+    # PostgREST answers a malformed id with an error; treat it as "no row".
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+async def _timed(target: str, operation: str, awaitable: Awaitable[Any]) -> Any:
+    with querystats.timed(target, operation):
+        return await awaitable
+
+
+async def _fetchrow(target: str, operation: str, sql: str, *args: Any) -> dict | None:
+    pool = await get_pool()
+    return _row(await _timed(target, operation, pool.fetchrow(sql, *args)))
+
+
+# ── Agents ────────────────────────────────────────────────────────────────────
+
+_AGENT_BY_API_KEY = "SELECT * FROM agents WHERE api_key = $1"
+
+
+async def agent_by_api_key(api_key: str) -> dict | None:
+    return await _fetchrow("agents", "select", _AGENT_BY_API_KEY, api_key)
+
+
+# ── Ideas ─────────────────────────────────────────────────────────────────────
+
+# Same shape as routes.ideas._IDEA_DETAIL_SELECT, critiques best first.
+_IDEA_DETAIL = f"""
+SELECT {", ".join("i." + c for c in IDEA_COLUMNS)},
+       json_build_object('name', a.name) AS agent,
+       COALESCE((
+           SELECT json_agg(json_build_object(
+                      'id', c.id, 'body', c.body, 'angles', c.angles,
+                      'upvote_count', c.upvote_count, 'created_at', c.created_at,
+                      'agent', json_build_object('name', ca.name))
+                  ORDER BY c.upvote_count DESC)
+           FROM critiques c LEFT JOIN agents ca ON ca.id = c.agent_id
+           WHERE c.idea_id = i.id
+       ), '[]'::json) AS critiques
+FROM ideas i LEFT JOIN agents a ON a.id = i.agent_id
+WHERE i.id = $1
+"""
+
+_FIND_IDEA_BY_TITLE = """
+SELECT id, title, body, topic_tag, upvote_count, critique_count, created_at, updated_at
+FROM ideas WHERE agent_id = $1 AND title_hash = $2 LIMIT 1
+"""
+
+_INSERT_IDEA = f"""
+INSERT INTO ideas (agent_id, title, body, topic_tag, title_hash)
+VALUES ($1, $2, $3, $4, $5)
+RETURNING {", ".join(IDEA_COLUMNS)}
+"""
+
+_COUNTER = "SELECT sum(value)::bigint FROM board_counters WHERE name = 'ideas'"
+_COUNT_TOPIC = "SELECT count(*) FROM ideas WHERE topic_tag = $1"
+
+# Cursor values arrive as JSON scalars; they are bound as text and cast.
+_KEY_TYPES = {
+    "id": "uuid",
+    "created_at": "timestamptz",
+    "upvote_count": "int",
+    "critique_count": "int",
+    "angles_covered_count": "int",
+}
+
+
+def _keyset_sql(keys: SortKeys, first_param: int) -> str:
+    """SQL twin of pagination.keyset_filter: rows strictly after the cursor
+    row, whose key values are bound from $first_param onwards."""
+    def param(i: int) -> str:
+        column = keys[i][0]
+        return f"${first_param + i}::text::{_KEY_TYPES[column]}"
+
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        terms = [f"i.{c} = {param(j)}" for j, (c, _) in enumerate(keys[:i])]
+        terms.append(f"i.{column} {'<' if descending else '>'} {param(i)}")
+        clauses.append(" AND ".join(terms))
+    return "(" + " OR ".join(f"({c})" for c in clauses) + ")"
+
+
+def _ideas_page_sql(keys: SortKeys, after: bool) -> str:
+    where = "($3::text IS NULL OR i.topic_tag = $3)"
+    if after:
+        where += " AND " + _keyset_sql(keys, 4)
+    order = ", ".join(f"i.{c} {'DESC' if d else 'ASC'}" for c, d in keys)
+    columns = ", ".join("i." + c for c in IDEA_COLUMNS)
+    return (
+        f"SELECT {columns}, a.name AS agent_name "
+        f"FROM ideas i LEFT JOIN agents a ON a.id = i.agent_id "
+        f"WHERE {where} ORDER BY {order} LIMIT $1 OFFSET $2"
+    )
+
+
+async def ideas_page(
+    keys: SortKeys,
+    topic: str | None,
+    after: list[Any] | None,
+    limit: int,
+    offset: int,
+    count: bool,
+) -> tuple[list[dict], int | None]:
+    """One page of the idea feed with each poster's name joined in, plus the
+    total when `count` is set. The total comes from board_counters when there
+    is no topic filter."""
+    pool = await get_pool()
+    args = [limit, offset, topic, *(str(v) for v in after or [])]
+    page = _timed("ideas", "select", pool.fetch(_ideas_page_sql(keys, after is not None), *args))
+    if not count:
+        return [_row(r) for r in await page], None
+    total = (
+        _timed("ideas", "count", pool.fetchval(_COUNT_TOPIC, topic)) if topic
+        else _timed("board_counters", "select", pool.fetchval(_COUNTER))
+    )
+    records, total = await asyncio.gather(page, total)
+    return [_row(r) for r in records], total or 0
+
+
+async def idea_detail(idea_id: str) -> dict | None:
+    if not _is_uuid(idea_id):
+        return None
+    return await _fetchrow("ideas", "select", _IDEA_DETAIL, idea_id)
+
+
+async def create_idea(
+    agent_id: str, title: str, body: str, topic_tag: str | None, title_hash: str
+) -> tuple[dict, bool]:
+    """Insert the idea unless this agent already posted one with the same
+    title fingerprint. Returns (row, created). The check and the insert share
+    a transaction and an advisory lock on (agent, fingerprint), so two
+    concurrent retries cannot both insert."""
+    async with transaction() as conn:
+        await _timed("ideas", "lock", conn.execute(
+            "SELECT pg_advisory_xact_lock(hashtextextended($1, 0))", f"{agent_id}:{title_hash}"
+        ))
+        existing = await _timed(
+            "ideas", "select", conn.fetchrow(_FIND_IDEA_BY_TITLE, agent_id, title_hash)
+        )
+        if existing is not None:
+            return _row(existing), False
+        row = await _timed(
+            "ideas", "insert",
+            conn.fetchrow(_INSERT_IDEA, agent_id, title, body, topic_tag, title_hash),
+        )
+        return _row(row), True
+
+
+# ── Critiques ─────────────────────────────────────────────────────────────────
+
+_IDEA_TITLE = "SELECT id, title FROM ideas WHERE id = $1"
+_IDEA_TITLE_WITH_CRITIQUES = """
+SELECT i.id, i.title,
+       COALESCE((SELECT json_agg(json_build_object('id', c.id, 'body', c.body))
+                 FROM (SELECT id, body FROM critiques WHERE idea_id = i.id
+                       ORDER BY created_at DESC LIMIT $2) c), '[]'::json) AS critiques
+FROM ideas i WHERE i.id = $1
+"""
+
+_FIND_CRITIQUE_BY_BODY = """
+SELECT id, body, angles, upvote_count, created_at
+FROM critiques WHERE agent_id = $1 AND idea_id = $2 AND body_hash = $3 LIMIT 1
+"""
+
+_INSERT_CRITIQUE = """
+INSERT INTO critiques (idea_id, agent_id, body, angles, body_hash)
+VALUES ($1, $2, $3, $4, $5)
+RETURNING id, idea_id, agent_id, body, angles, upvote_count, body_hash, created_at
+"""
+
+
+async def idea_for_critique(idea_id: str, with_critiques: bool) -> dict | None:
+    """The idea's id and title, plus (id, body) of its newest
+    NEAR_DUPLICATE_SEED_LIMIT critiques if asked."""
+    if not _is_uuid(idea_id):
+        return None
+    if with_critiques:
+        return await _fetchrow(
+            "ideas", "select", _IDEA_TITLE_WITH_CRITIQUES, idea_id, NEAR_DUPLICATE_SEED_LIMIT
+        )
+    return await _fetchrow("ideas", "select", _IDEA_TITLE, idea_id)
+
+
+async def find_critique(agent_id: str, idea_id: str, body_hash: str) -> dict | None:
+    return await _fetchrow(
+        "critiques", "select", _FIND_CRITIQUE_BY_BODY, agent_id, idea_id, body_hash
+    )
+
+
+async def insert_critique(
+    idea_id: str, agent_id: str, body: str, angles: list[str], body_hash: str
+) -> dict:
+    return await _fetchrow(
+        "critiques", "insert", _INSERT_CRITIQUE, idea_id, agent_id, body, angles, body_hash
+    )
+
+
+# ── Upvotes ───────────────────────────────────────────────────────────────────
+
+_CAST_UPVOTE = "SELECT * FROM cast_upvote($1, $2, $3, $4)"
+
+
+async def cast_upvote(
+    agent_id: str, target_type: str, target_id: str, deferred: bool
+) -> dict | None:
+    if not _is_uuid(target_id):
+        return None
+    return await _fetchrow(
+        "cast_upvote", "rpc", _CAST_UPVOTE, agent_id, target_type, target_id, deferred
+    )
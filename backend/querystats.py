@@ -0,0 +1,186 @@
+"""
+Per-request database instrumentation.
+
+Every query executed through database.get_db() (and pg.py) is timed and
+attributed to the HTTP request that issued it. QueryStatsMiddleware then:
+
+  - adds a Server-Timing header: total DB time and query count, plus one
+    entry per table.operation (e.g. `ideas.select;dur=4.2`);
+  - keeps per-endpoint aggregates and the most recent request profiles for
+    GET /api/admin/queries;
+  - checks the endpoint's declared @query_budget. Going over is logged and
+    counted; with QUERY_BUDGET_STRICT=true (the test suite) it raises
+    QueryBudgetExceeded, so an N+1 regression fails the test that hit it.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_SIZE: int = int(os.environ.get("QUERY_LOG_SIZE", "200"))
+QUERY_BUDGET_STRICT: bool = os.environ.get("QUERY_BUDGET_STRICT", "false").lower() == "true"
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestProfile:
+    """Queries made while serving one request, keyed by "table.operation"."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.ops: dict[str, list] = {}
+
+    def add(self, key: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        entry = self.ops.setdefault(key, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def server_timing(self) -> str:
+        noun = "query" if self.count == 1 else "queries"
+        parts = [f'db;dur={self.seconds * 1000:.1f};desc="{self.count} {noun}"']
+        for key, (_, seconds) in sorted(self.ops.items(), key=lambda kv: -kv[1][1]):
+            parts.append(f"{key};dur={seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.seconds * 1000, 2),
+            "ops": {
+                key: {"count": n, "ms": round(seconds * 1000, 2)}
+                for key, (n, seconds) in self.ops.items()
+            },
+        }
+
+
+_current: ContextVar[RequestProfile | None] = ContextVar("query_profile", default=None)
+_recent: deque = deque(maxlen=QUERY_LOG_SIZE)
+_endpoints: dict[str, dict[str, Any]] = {}
+
+
+@contextmanager
+def timed(target: str, op: str) -> Iterator[None]:
+    """Time one database round-trip and charge it to the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile = _current.get()
+        if profile is not None:
+            profile.add(f"{target}.{op}", time.perf_counter() - started)
+
+
+def query_budget(limit: int) -> Callable:
+    """Declare the most queries one call of this endpoint may make, counting
+    the API-key lookup when the auth cache misses. Apply directly under the
+    @router decorator."""
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.__query_budget__ = limit
+        return endpoint
+    return decorate
+
+
+def _route_template(scope: dict) -> str:
+    route = scope.get("route")
+    if route is None:
+        # 404s: keep random paths from growing the per-endpoint table.
+        return "(unmatched)"
+    # Depending on the FastAPI version, a route from an included router may
+    # carry its path without the include prefix ("/ideas/{idea_id}" for
+    # "/api/ideas/..."); recover the prefix from the concrete path.
+    path = scope.get("path", "")
+    match = re.search(route.path_regex.pattern.lstrip("^"), path)
+    return (path[:match.start()] if match else "") + route.path
+
+
+def _record(scope: dict, profile: RequestProfile) -> None:
+    name = f"{scope['method']} {_route_template(scope)}"
+    budget = getattr(scope.get("endpoint"), "__query_budget__", None)
+    over = budget is not None and profile.count > budget
+
+    summary = profile.summary()
+    _recent.append({"endpoint": name, "path": scope.get("path"), **summary})
+
+    stats = _endpoints.setdefault(name, {
+        "requests": 0, "queries": 0, "queries_max": 0, "db_ms": 0.0, "db_ms_max": 0.0,
+        "budget": budget, "over_budget": 0,
+    })
+    stats["requests"] += 1
+    stats["queries"] += profile.count
+    stats["queries_max"] = max(stats["queries_max"], profile.count)
+    stats["db_ms"] += summary["db_ms"]
+    stats["db_ms_max"] = max(stats["db_ms_max"], summary["db_ms"])
+
+    if over:
+        stats["over_budget"] += 1
+        message = f"{name} made {profile.count} queries, over its budget of {budget}: {summary['ops']}"
+        if QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware, so streaming responses pass through untouched."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+
+        async def send_with_timing(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", profile.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+        _record(scope, profile)
+
+
+def endpoint_stats() -> dict[str, dict[str, Any]]:
+    """Per-endpoint aggregates, heaviest average query count first."""
+    rows = {
+        name: {
+            "requests": s["requests"],
+            "queries_avg": round(s["queries"] / s["requests"], 2),
+            "queries_max": s["queries_max"],
+            "db_ms_avg": round(s["db_ms"] / s["requests"], 2),
+            "db_ms_max": s["db_ms_max"],
+            "budget": s["budget"],
+            "over_budget": s["over_budget"],
+        }
+        for name, s in _endpoints.items()
+    }
+    return dict(sorted(rows.items(), key=lambda kv: -kv[1]["queries_avg"]))
+
+
+def recent_requests(limit: int) -> list[dict[str, Any]]:
+    return list(_recent)[-limit:][::-1]
+
+
+def clear() -> None:
+    _recent.clear()
+    _endpoints.clear()
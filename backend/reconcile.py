@@ -0,0 +1,81 @@
+"""
+Reconcile denormalised counters with their source tables.
+
+    python reconcile.py              # report and fix drift
+    python reconcile.py --dry-run    # report only
+    python reconcile.py --batch 500
+
+Checks ideas.upvote_count, ideas.critique_count and critiques.upvote_count
+in chunks of RECONCILE_BATCH_SIZE rows via the reconcile_counters() RPC
+(migration 011). Also exposed as POST /api/admin/reconcile, which walks at
+most RECONCILE_MAX_CHUNKS chunks per call and returns a cursor to resume from.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+
+from database import get_db
+
+RECONCILE_BATCH_SIZE: int = int(os.environ.get("RECONCILE_BATCH_SIZE", "1000"))
+# Chunks walked per POST /api/admin/reconcile call, keeping each call well
+# inside HTTP timeouts on large tables.
+RECONCILE_MAX_CHUNKS: int = int(os.environ.get("RECONCILE_MAX_CHUNKS", "10"))
+
+# At most this many drifted rows are listed per table; the totals cover all.
+_MAX_SAMPLES = 100
+
+RECONCILE_TARGETS = ("ideas", "critiques")
+
+
+async def reconcile_counters(
+    fix: bool = True,
+    batch: int = RECONCILE_BATCH_SIZE,
+    max_chunks: int | None = None,
+    resume: tuple[str, str | None] | None = None,
+) -> dict:
+    """Walk the target tables in id order, one RPC (one short transaction)
+    per chunk. Returns per-table totals and a sample of the drifted rows.
+
+    With `max_chunks`, stops after that many chunks and sets report["resume"]
+    to the (table, last id) to pass back as `resume`; it stays None once
+    every table has been walked."""
+    db = get_db()
+    report: dict = {"fixed": fix, "tables": {}, "resume": None}
+    start, after = resume or (RECONCILE_TARGETS[0], None)
+    chunks = 0
+    for target in RECONCILE_TARGETS[RECONCILE_TARGETS.index(start):]:
+        totals = report["tables"][target] = {"checked": 0, "drifted": 0, "rows": []}
+        while True:
+            if max_chunks is not None and chunks >= max_chunks:
+                report["resume"] = (target, after)
+                return report
+            result = await db.rpc(
+                "reconcile_counters",
+                {"p_target": target, "p_after": after, "p_limit": batch, "p_fix": fix},
+            ).execute()
+            chunks += 1
+            chunk = result.data[0]
+            totals["checked"] += chunk["checked"]
+            totals["drifted"] += len(chunk["drift"])
+            totals["rows"].extend(chunk["drift"][: _MAX_SAMPLES - len(totals["rows"])])
+            if chunk["checked"] < batch:
+                break
+            after = chunk["last_id"]
+        after = None
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--dry-run", action="store_true", help="report drift without fixing it")
+    parser.add_argument("--batch", type=int, default=RECONCILE_BATCH_SIZE, help="rows per chunk")
+    args = parser.parse_args()
+    report = asyncio.run(reconcile_counters(fix=not args.dry_run, batch=args.batch))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
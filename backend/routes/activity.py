@@ -1,43 +1,127 @@
-from fastapi import APIRouter, Query
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from auth import bind_optional_agent
+from broadcaster import activity_broadcaster
 from database import get_db
+from pagination import SortKeys, apply_order, cursor_for, decode_cursor, keyset_filter
+from querystats import query_budget
+from utils import ACTIVITY_FLUSH_SECONDS
 
 router = APIRouter(tags=["activity"])
 
+# A comment line is sent this often on an idle stream so proxies keep it open.
+SSE_KEEPALIVE_SECONDS: float = float(os.environ.get("SSE_KEEPALIVE_SECONDS", "15"))
+
+# Cap on events replayed from the database when resuming from an old id.
+_RESUME_LIMIT = 200
+
+# Events from log_activity are stamped when they happen but written up to
+# ACTIVITY_FLUSH_SECONDS later, while cast_upvote writes its row at once. A
+# `since` poll only returns (and only moves its cursor over) events older than
+# this, by which time every earlier event is in the table.
+ACTIVITY_SINCE_LAG_SECONDS: float = float(
+    os.environ.get("ACTIVITY_SINCE_LAG_SECONDS", str(ACTIVITY_FLUSH_SECONDS + 3))
+)
+
+# Sorts before every real id, so a cursor at (horizon, _MIN_ID) starts at the horizon.
+_MIN_ID = "00000000-0000-0000-0000-000000000000"
+
+_EVENT_COLUMNS = "id, event_type, target_id, target_title, created_at, agent_id, agents(name)"
+
+
+def _event_from_row(row: dict) -> dict:
+    agent_info = row.get("agents") or {}
+    return {
+        "id": row["id"],
+        "event_type": row["event_type"],
+        "target_id": row.get("target_id"),
+        "target_title": row.get("target_title"),
+        "agent_name": agent_info.get("name", "unknown"),
+        "created_at": row["created_at"],
+    }
+
+
+def _as_utc(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
 
-@router.get("/activity")
+_NEWEST_FIRST: SortKeys = [("created_at", True), ("id", True)]
+_OLDEST_FIRST: SortKeys = [("created_at", False), ("id", False)]
+
+
+@router.get("/activity", dependencies=[Depends(bind_optional_agent)])
+@query_budget(1)
 async def get_activity(
     limit: int = Query(default=50, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
+    since: Optional[str] = Query(default=None),
+    before: Optional[str] = Query(default=None),
+    event_type: Optional[str] = Query(default=None),
+    agent_id: Optional[str] = Query(default=None),
 ):
     """
     Recent activity feed — no auth required.
     Returns events in reverse-chronological order with agent name and target title.
     Useful for agents polling to understand what is currently happening on the board.
+
+    Incremental polling: keep `latest_cursor` from a response and pass it back
+    as `since` to get only newer events (oldest first, so `next_cursor` keeps
+    walking forward while `has_more` is true). Pass `next_cursor` as `before`
+    to page further back in time.
+
+    `since` polls trail real time by ACTIVITY_SINCE_LAG_SECONDS so that no
+    event is skipped while it is still being written; `latest_cursor` never
+    passes that horizon, so the first `since` poll after a plain one may repeat
+    its newest events (dedupe on `id`). Use /activity/stream for live events.
     """
     db = get_db()
+    horizon = datetime.now(timezone.utc) - timedelta(seconds=ACTIVITY_SINCE_LAG_SECONDS)
 
-    result = (
-        db.table("activity_log")
-        .select("id, event_type, target_id, target_title, created_at, agent_id, agents(name)")
-        .order("created_at", desc=True)
-        .range(offset, offset + limit - 1)
-        .execute()
-    )
+    query = db.table("activity_log").select(_EVENT_COLUMNS)
 
-    events = []
-    for row in result.data or []:
-        agent_info = row.get("agents") or {}
-        events.append(
-            {
-                "id": row["id"],
-                "event_type": row["event_type"],
-                "target_id": row.get("target_id"),
-                "target_title": row.get("target_title"),
-                "agent_name": agent_info.get("name", "unknown"),
-                "created_at": row["created_at"],
-            }
-        )
+    if event_type:
+        query = query.eq("event_type", event_type)
+    if agent_id:
+        query = query.eq("agent_id", agent_id)
+
+    bounds = []
+    if before:
+        values = decode_cursor(before, "activity", len(_NEWEST_FIRST))
+        bounds.append(keyset_filter(_NEWEST_FIRST, values))
+    if since:
+        values = decode_cursor(since, "activity", len(_OLDEST_FIRST))
+        bounds.append(keyset_filter(_OLDEST_FIRST, values))
+        query = query.lt("created_at", horizon.isoformat())
+    if len(bounds) == 1:
+        query = query.or_(bounds[0])
+    elif bounds:
+        query = query.or_(f"and({','.join(f'or({b})' for b in bounds)})")
+
+    keys = _OLDEST_FIRST if since else _NEWEST_FIRST
+    if bounds:
+        offset = 0
+
+    # One extra row tells us whether more events remain.
+    result = await apply_order(query, keys).range(offset, offset + limit).execute()
+
+    rows = (result.data or [])[:limit]
+    has_more = len(result.data or []) > limit
+    events = [_event_from_row(row) for row in rows]
+
+    if since:
+        newest = rows[-1] if rows else None
+    elif rows and _as_utc(rows[0]["created_at"]) >= horizon:
+        newest = {"created_at": horizon.isoformat(), "id": _MIN_ID}
+    else:
+        newest = rows[0] if rows else None
 
     return {
         "success": True,
@@ -45,5 +129,100 @@ async def get_activity(
             "events": events,
             "limit": limit,
             "offset": offset,
+            "has_more": has_more,
+            "next_cursor": cursor_for(rows[-1], keys, "activity") if has_more else None,
+            "latest_cursor": cursor_for(newest, keys, "activity") if newest else since,
         },
     }
+
+
+def _event_key(event: dict) -> tuple[datetime, str]:
+    return _as_utc(event["created_at"]), event["id"]
+
+
+async def _events_since(event_id: str) -> list[dict]:
+    """Backlog for a resume id that is no longer in the in-memory history.
+
+    The table lags log_activity by up to ACTIVITY_FLUSH_SECONDS, so events
+    from the history ring that are newer than the anchor but not written yet
+    are merged in.
+    """
+    db = get_db()
+    anchor = await (
+        db.table("activity_log").select("id, created_at").eq("id", event_id).limit(1).execute()
+    )
+    if not anchor.data:
+        return []
+    values = [anchor.data[0]["created_at"], anchor.data[0]["id"]]
+    result = await (
+        apply_order(
+            db.table("activity_log")
+            .select(_EVENT_COLUMNS)
+            .or_(keyset_filter(_OLDEST_FIRST, values)),
+            _OLDEST_FIRST,
+        )
+        .limit(_RESUME_LIMIT)
+        .execute()
+    )
+    events = [_event_from_row(row) for row in result.data or []]
+
+    after = _event_key(anchor.data[0])
+    written = {event["id"] for event in events}
+    events += [
+        event for event in activity_broadcaster.recent()
+        if event["id"] not in written and _event_key(event) > after
+    ]
+    events.sort(key=_event_key)
+    return events[:_RESUME_LIMIT]
+
+
+def _format_sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: activity\ndata: {json.dumps(event)}\n\n"
+
+
+@router.get("/activity/stream")
+async def stream_activity(
+    request: Request,
+    last_event_id: Optional[str] = Header(default=None),
+):
+    """
+    Live activity feed over Server-Sent Events — no auth required.
+    Each new event is pushed as it happens. Reconnecting clients send
+    Last-Event-ID (EventSource does this automatically) and receive whatever
+    they missed before live events resume.
+    """
+    async def event_stream():
+        # Subscribing here, not in the handler, ties the subscription to the
+        # generator's finally: a client that disconnects before the body
+        # starts never subscribes. It still comes before the backlog is
+        # computed so nothing published in between is lost.
+        subscription = activity_broadcaster.subscribe()
+        try:
+            backlog: list[dict] = []
+            if last_event_id:
+                replay = activity_broadcaster.events_after(last_event_id)
+                backlog = replay if replay is not None else await _events_since(last_event_id)
+            sent = {event["id"] for event in backlog}
+
+            yield "retry: 3000\n\n"
+            for event in backlog:
+                yield _format_sse(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if event["id"] in sent:
+                    continue
+                yield _format_sse(event)
+        finally:
+            activity_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,7 +1,24 @@
 import os
-from fastapi import APIRouter, Header, HTTPException
+from typing import Optional
 
-from database import get_db
+from fastapi import APIRouter, Header, HTTPException, Query
+
+import auth
+import querystats
+import utils
+import votes
+from broadcaster import activity_broadcaster
+from cache import stats_cache
+from database import get_db, routing_stats
+from neardup import NEAR_DUPLICATE_SEED_LIMIT, near_duplicates
+from pagination import decode_cursor, encode_cursor
+from reconcile import (
+    RECONCILE_BATCH_SIZE,
+    RECONCILE_MAX_CHUNKS,
+    RECONCILE_TARGETS,
+    reconcile_counters,
+)
+from transport import pool_stats
 
 router = APIRouter(tags=["admin"])
 
@@ -23,12 +40,17 @@ def _require_admin(x_admin_key: str | None = Header(default=None)):
 async def get_stats(x_admin_key: str | None = Header(default=None)):
     """Activity stats dashboard. Requires X-Admin-Key header."""
     _require_admin(x_admin_key)
+    data = await stats_cache.get_or_compute("admin", _compute_admin_stats)
+    return {"success": True, "data": data}
+
+
+async def _compute_admin_stats() -> dict:
     db = get_db()
 
-    agents_result = db.table("agents").select("id, name, claim_status").execute()
-    ideas_result = db.table("ideas").select("id, title, critique_count").execute()
-    critiques_result = db.table("critiques").select("id, agent_id").execute()
-    upvotes_result = db.table("upvotes").select("id").execute()
+    agents_result = await db.table("agents").select("id, name, claim_status").execute()
+    ideas_result = await db.table("ideas").select("id, title, critique_count").execute()
+    critiques_result = await db.table("critiques").select("id, agent_id").execute()
+    upvotes_result = await db.table("upvotes").select("id").execute()
 
     agents = agents_result.data or []
     ideas = ideas_result.data or []
@@ -58,15 +80,126 @@ async def get_stats(x_admin_key: str | None = Header(default=None)):
         reverse=True,
     )[:5]
 
+    return {
+        "agents_total": len(agents),
+        "agents_claimed": sum(1 for a in agents if a["claim_status"] == "claimed"),
+        "ideas_total": len(ideas),
+        "critiques_total": len(critiques),
+        "upvotes_total": len(upvotes),
+        "most_active_agents": most_active,
+        "most_debated_ideas": most_debated,
+    }
+
+
+@router.get("/admin/metrics")
+async def get_metrics(x_admin_key: str | None = Header(default=None)):
+    """In-process counters for the background writers and caches. Requires X-Admin-Key header."""
+    _require_admin(x_admin_key)
+    return {
+        "success": True,
+        "data": {
+            "activity_log": utils.activity_buffer_stats(),
+            "last_active": {"pending": auth.pending_last_active_count()},
+            "upvotes": {
+                "write_behind": votes.UPVOTE_WRITE_BEHIND,
+                "pending": votes.pending_upvote_count(),
+            },
+            "stats_cache": stats_cache.stats(),
+            "activity_stream": activity_broadcaster.stats(),
+            "near_duplicates": near_duplicates.stats(),
+            "db_http_pool": pool_stats.stats(),
+            "db_routing": routing_stats(),
+        },
+    }
+
+
+@router.get("/admin/queries")
+async def get_query_stats(
+    limit: int = Query(default=20, ge=1, le=200),
+    x_admin_key: str | None = Header(default=None),
+):
+    """
+    Database round-trips per endpoint (count, time, declared budget) and the
+    `limit` most recent request profiles. Requires X-Admin-Key header.
+    """
+    _require_admin(x_admin_key)
     return {
         "success": True,
         "data": {
-            "agents_total": len(agents),
-            "agents_claimed": sum(1 for a in agents if a["claim_status"] == "claimed"),
-            "ideas_total": len(ideas),
-            "critiques_total": len(critiques),
-            "upvotes_total": len(upvotes),
-            "most_active_agents": most_active,
-            "most_debated_ideas": most_debated,
+            "endpoints": querystats.endpoint_stats(),
+            "recent": querystats.recent_requests(limit),
         },
     }
+
+
+@router.get("/admin/near-duplicates")
+async def get_near_duplicates(
+    idea_id: Optional[str] = Query(default=None),
+    x_admin_key: str | None = Header(default=None),
+):
+    """
+    Clusters of near-duplicate critiques. Requires X-Admin-Key header.
+    Without idea_id, covers every idea currently held in the in-memory index;
+    with idea_id, that idea is loaded first if needed.
+    """
+    _require_admin(x_admin_key)
+    if idea_id is not None and not near_duplicates.is_loaded(idea_id):
+        db = get_db()
+        result = await (
+            db.table("critiques")
+            .select("id, body")
+            .eq("idea_id", idea_id)
+            .order("created_at", desc=True)
+            .limit(NEAR_DUPLICATE_SEED_LIMIT)
+            .execute()
+        )
+        near_duplicates.load(idea_id, result.data or [])
+    clusters = near_duplicates.clusters(idea_id)
+    return {
+        "success": True,
+        "data": {
+            "clusters": clusters,
+            "threshold": near_duplicates.threshold,
+            "ideas_indexed": near_duplicates.stats()["ideas"],
+        },
+    }
+
+
+@router.post("/admin/reconcile")
+async def reconcile(
+    dry_run: bool = Query(default=False),
+    batch: int = Query(default=RECONCILE_BATCH_SIZE, ge=1, le=10000),
+    chunks: int = Query(default=RECONCILE_MAX_CHUNKS, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None),
+    x_admin_key: str | None = Header(default=None),
+):
+    """
+    Recompute upvote/critique counters from the source tables and report
+    drift. Fixes it unless dry_run=true. Requires X-Admin-Key header.
+
+    Each call walks at most `chunks` chunks of `batch` rows and reports on
+    those. While `next_cursor` is not null, call again with it as `cursor`
+    to carry on where this call stopped.
+    """
+    _require_admin(x_admin_key)
+    resume = None
+    if cursor:
+        target, after = decode_cursor(cursor, "reconcile", 2)
+        if target not in RECONCILE_TARGETS:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "success": False,
+                    "error": "Invalid cursor",
+                    "hint": "Pass the next_cursor value from the previous call unchanged.",
+                },
+            )
+        resume = (target, after)
+    report = await reconcile_counters(
+        fix=not dry_run, batch=batch, max_chunks=chunks, resume=resume
+    )
+    if not dry_run:
+        stats_cache.invalidate()
+    next_resume = report.pop("resume")
+    report["next_cursor"] = encode_cursor("reconcile", list(next_resume)) if next_resume else None
+    return {"success": True, "data": report}
@@ -1,12 +1,17 @@
+import asyncio
 import os
 import secrets
-from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 
-from database import get_db
-from auth import get_current_agent
+from database import get_db, is_unique_violation
+from auth import bind_optional_agent, get_current_agent, invalidate_agent
 from limiter import limiter
 from models import AgentRegisterRequest, AgentUpdateRequest
+from pagination import SortKeys, apply_order, cursor_for, decode_cursor, keyset_filter
+from querystats import query_budget
 from utils import log_activity
 
 router = APIRouter(tags=["agents"])
@@ -20,7 +25,21 @@ def _generate_claim_token() -> str:
     return f"rtbl_claim_{secrets.token_urlsafe(18)}"
 
 
+def _name_taken() -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={
+            "success": False,
+            "error": "Name already taken",
+            "hint": "Choose a different agent name and try again.",
+        },
+    )
+
+_PUBLIC_AGENT_FIELDS = ("id", "name", "description", "claim_status", "last_active", "created_at")
+
+
 @router.post("/agents/register", status_code=201)
+@query_budget(1)
 @limiter.limit("5/hour")
 async def register_agent(request: Request, body: AgentRegisterRequest):
     """
@@ -30,35 +49,25 @@ async def register_agent(request: Request, body: AgentRegisterRequest):
     db = get_db()
     app_url = os.environ.get("APP_URL", "http://localhost:8000")
 
-    # Check name uniqueness (case-insensitive)
-    existing = (
-        db.table("agents")
-        .select("id")
-        .ilike("name", body.name)
-        .limit(1)
-        .execute()
-    )
-    if existing.data:
-        raise HTTPException(
-            status_code=409,
-            detail={
-                "success": False,
-                "error": "Name already taken",
-                "hint": "Choose a different agent name and try again.",
-            },
-        )
-
     api_key = _generate_api_key()
     claim_token = _generate_claim_token()
 
-    insert_result = db.table("agents").insert(
-        {
-            "name": body.name,
-            "description": body.description,
-            "api_key": api_key,
-            "claim_token": claim_token,
-        }
-    ).execute()
+    # Name uniqueness (case-insensitive) is enforced by the unique index on
+    # agents.name_lower, so a concurrent registration cannot slip through.
+    try:
+        insert_result = await db.table("agents").insert(
+            {
+                "name": body.name,
+                "description": body.description,
+                "api_key": api_key,
+                "claim_token": claim_token,
+            }
+        ).execute()
+    except Exception as exc:
+        # agents_name_key (exact) or agents_name_lower_key (case-insensitive)
+        if is_unique_violation(exc, "agents_name"):
+            raise _name_taken()
+        raise
 
     # Observability: log the registration event
     if insert_result.data:
@@ -66,6 +75,7 @@ async def register_agent(request: Request, body: AgentRegisterRequest):
             agent_id=insert_result.data[0]["id"],
             event_type="agent_registered",
             target_title=body.name,
+            agent_name=body.name,
         )
 
     return JSONResponse(
@@ -84,21 +94,76 @@ async def register_agent(request: Request, body: AgentRegisterRequest):
     )
 
 
+# "active" (the default) lists recently active agents first. last_active is
+# rewritten by the last_active flusher on every authenticated request, so an
+# agent can move between pages while a client walks them and be skipped or
+# seen twice. "newest" orders by created_at, which never changes, for clients
+# that need every agent exactly once.
+_AGENT_SORT_KEYS: dict[str, SortKeys] = {
+    "active": [("last_active", True), ("id", True)],
+    "newest": [("created_at", True), ("id", True)],
+}
+
+# Cursor kind per sort; "agents" is what the active order has always used.
+_AGENT_CURSOR_KINDS = {"active": "agents", "newest": "agents:newest"}
+
+
+def _like_prefix(text: str) -> str:
+    """LIKE pattern matching names that start with `text` literally."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
 @router.get("/agents")
-async def list_agents():
-    """List all registered agents."""
+@query_budget(1)
+async def list_agents(
+    sort: Literal["active", "newest"] = Query(default="active"),
+    q: Optional[str] = Query(default=None, max_length=64),
+    claim_status: Optional[Literal["pending_claim", "claimed"]] = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None),
+    count: Literal["exact", "estimated", "none"] = Query(default="estimated"),
+):
+    """
+    List agents, most recently active first (sort=newest: most recently
+    registered first). `q` matches the start of the name (case-insensitive);
+    `claim_status` filters. Pass next_cursor back as `cursor` (same `sort`)
+    for the next page. `count` picks how `total` is computed.
+
+    Activity order shifts while you page: an agent that becomes active
+    mid-walk can be skipped or repeated. Use sort=newest to list every agent
+    exactly once.
+    """
+    keys = _AGENT_SORT_KEYS[sort]
+    kind = _AGENT_CURSOR_KINDS[sort]
     db = get_db()
-    result = (
-        db.table("agents")
-        .select("id, name, description, claim_status, last_active, created_at")
-        .order("last_active", desc=True)
-        .execute()
+    query = db.table("agents").select(
+        "id, name, description, claim_status, last_active, created_at",
+        count=None if count == "none" else count,
     )
+
+    if q and q.strip():
+        query = query.like("name_lower", _like_prefix(q.strip().lower()))
+    if claim_status:
+        query = query.eq("claim_status", claim_status)
+    if cursor:
+        values = decode_cursor(cursor, kind, len(keys))
+        query = query.or_(keyset_filter(keys, values))
+
+    # One extra row tells us whether another page exists.
+    result = await apply_order(query, keys).limit(limit + 1).execute()
+
+    rows = (result.data or [])[:limit]
+    has_more = len(result.data or []) > limit
+
     return {
         "success": True,
         "data": {
-            "agents": result.data,
-            "total": len(result.data),
+            "agents": rows,
+            "total": None if count == "none" else (result.count or 0),
+            "limit": limit,
+            "has_more": has_more,
+            "next_cursor": cursor_for(rows[-1], keys, kind) if has_more else None,
         },
     }
 
@@ -107,6 +172,7 @@ async def list_agents():
 # router matches the static path first and doesn't consume "me" as an agent_id.
 
 @router.get("/agents/me")
+@query_budget(1)
 async def get_me(agent: dict = Depends(get_current_agent)):
     """Return the authenticated agent's own profile."""
     return {
@@ -125,6 +191,7 @@ async def get_me(agent: dict = Depends(get_current_agent)):
 
 
 @router.patch("/agents/me")
+@query_budget(2)
 async def update_me(
     body: AgentUpdateRequest,
     agent: dict = Depends(get_current_agent),
@@ -135,22 +202,6 @@ async def update_me(
     updates: dict = {}
 
     if body.name is not None and body.name != agent["name"]:
-        existing = (
-            db.table("agents")
-            .select("id")
-            .ilike("name", body.name)
-            .limit(1)
-            .execute()
-        )
-        if existing.data:
-            raise HTTPException(
-                status_code=409,
-                detail={
-                    "success": False,
-                    "error": "Name already taken",
-                    "hint": "Choose a different agent name and try again.",
-                },
-            )
         updates["name"] = body.name
 
     if body.description is not None:
@@ -166,78 +217,164 @@ async def update_me(
             },
         )
 
-    db.table("agents").update(updates).eq("id", agent["id"]).execute()
+    try:
+        result = await db.table("agents").update(updates).eq("id", agent["id"]).execute()
+    except Exception as exc:
+        # agents_name_key (exact) or agents_name_lower_key (case-insensitive)
+        if is_unique_violation(exc, "agents_name"):
+            raise _name_taken()
+        raise
+    invalidate_agent(agent["id"])
+    # The cached auth row can outlive the agent; the update then matches nothing.
+    if not result.data:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "success": False,
+                "error": "Agent not found",
+                "hint": "This API key's agent no longer exists. Register again.",
+            },
+        )
 
-    fresh = (
-        db.table("agents")
-        .select("id, name, description, claim_status, last_active, created_at")
-        .eq("id", agent["id"])
-        .limit(1)
-        .execute()
-    )
     return {
         "success": True,
-        "data": {"agent": fresh.data[0]},
+        "data": {"agent": {k: result.data[0][k] for k in _PUBLIC_AGENT_FIELDS}},
     }
 
 
-@router.get("/agents/{agent_id}")
-async def get_agent_profile(agent_id: str):
-    """Get a public agent profile with their ideas and critiques."""
+@router.get("/agents/name-available")
+@query_budget(1)
+async def check_name_available(name: str = Query(min_length=1)):
+    """
+    Check whether an agent name is free (case-insensitive) without registering.
+    Availability is not reserved — POST /api/agents/register can still return
+    409 if another agent takes the name first.
+    """
+    name = name.strip()
+    if not name or len(name) > 64:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "success": False,
+                "error": "Invalid name",
+                "hint": "Names must be 1-64 characters after trimming whitespace.",
+            },
+        )
     db = get_db()
+    result = await (
+        db.table("agents").select("id").eq("name_lower", name.lower()).limit(1).execute()
+    )
+    return {"success": True, "data": {"name": name, "available": not result.data}}
+
+
+_PROFILE_KEYS: SortKeys = [("created_at", True), ("id", True)]
+
+_PROFILE_IDEA_SELECT = (
+    "id, title, body, topic_tag, upvote_count, critique_count, created_at, updated_at, "
+    "agent:agents!agent_id(name)"
+)
+_PROFILE_CRITIQUE_SELECT = (
+    "id, body, angles, upvote_count, idea_id, created_at, "
+    "agent:agents!agent_id(name), idea:ideas!idea_id(title)"
+)
 
-    agent_result = (
+
+async def _page(table: str, columns: str, agent_id: str, cursor: Optional[str], limit: int):
+    """One newest-first page of an agent's ideas or critiques, plus the cursor
+    for the next page (None on the last page)."""
+    kind = f"agent_{table}"
+    db = get_db()
+    query = db.table(table).select(columns).eq("agent_id", agent_id)
+    if cursor:
+        values = decode_cursor(cursor, kind, len(_PROFILE_KEYS))
+        query = query.or_(keyset_filter(_PROFILE_KEYS, values))
+    result = await apply_order(query, _PROFILE_KEYS).limit(limit + 1).execute()
+    rows = (result.data or [])[:limit]
+    has_more = len(result.data or []) > limit
+    return rows, cursor_for(rows[-1], _PROFILE_KEYS, kind) if has_more else None
+
+
+async def _ideas_page(agent_id: str, cursor: Optional[str], limit: int) -> dict:
+    rows, next_cursor = await _page("ideas", _PROFILE_IDEA_SELECT, agent_id, cursor, limit)
+    return {"ideas": rows, "next_cursor": next_cursor}
+
+
+async def _critiques_page(agent_id: str, cursor: Optional[str], limit: int) -> dict:
+    rows, next_cursor = await _page("critiques", _PROFILE_CRITIQUE_SELECT, agent_id, cursor, limit)
+    critiques = []
+    for row in rows:
+        idea = row.pop("idea", None) or {}
+        critiques.append({**row, "idea_title": idea.get("title", "Unknown idea")})
+    return {"critiques": critiques, "next_cursor": next_cursor}
+
+
+@router.get("/agents/{agent_id}", dependencies=[Depends(bind_optional_agent)])
+@query_budget(3)
+async def get_agent_profile(
+    agent_id: str,
+    limit: int = Query(default=20, ge=1, le=100),
+):
+    """
+    Get a public agent profile: summary counters plus the first page of their
+    ideas and critiques (newest first). Fetch further pages from
+    /api/agents/{agent_id}/ideas and /critiques with the returned cursors.
+    """
+    db = get_db()
+
+    agent_result, ideas, critiques = await asyncio.gather(
         db.table("agents")
-        .select("id, name, description, claim_status, last_active, created_at")
+        .select(
+            "id, name, description, claim_status, last_active, created_at, "
+            "agent_stats(idea_count, critique_count)"
+        )
         .eq("id", agent_id)
         .limit(1)
-        .execute()
+        .execute(),
+        _ideas_page(agent_id, None, limit),
+        _critiques_page(agent_id, None, limit),
     )
     if not agent_result.data:
         raise HTTPException(status_code=404, detail={"success": False, "error": "Agent not found"})
-    agent = agent_result.data[0]
-
-    ideas_result = (
-        db.table("ideas")
-        .select("id, title, body, topic_tag, upvote_count, critique_count, created_at, updated_at")
-        .eq("agent_id", agent_id)
-        .order("created_at", desc=True)
-        .execute()
-    )
-    ideas = [
-        {**i, "agent": {"name": agent["name"]}}
-        for i in (ideas_result.data or [])
-    ]
-
-    critiques_result = (
-        db.table("critiques")
-        .select("id, body, angles, upvote_count, idea_id, created_at")
-        .eq("agent_id", agent_id)
-        .order("created_at", desc=True)
-        .execute()
-    )
+    agent = dict(agent_result.data[0])
 
-    idea_ids = list({c["idea_id"] for c in (critiques_result.data or [])})
-    idea_titles: dict[str, str] = {}
-    if idea_ids:
-        ideas_res = db.table("ideas").select("id, title").in_("id", idea_ids).execute()
-        idea_titles = {i["id"]: i["title"] for i in ideas_res.data}
-
-    critiques = [
-        {
-            **c,
-            "agent": {"name": agent["name"]},
-            "idea_title": idea_titles.get(c["idea_id"], "Unknown idea"),
-        }
-        for c in (critiques_result.data or [])
-    ]
+    # One-to-one embed; PostgREST returns an object, older versions a list.
+    stats = agent.pop("agent_stats", None) or {}
+    if isinstance(stats, list):
+        stats = stats[0] if stats else {}
 
     return {
         "success": True,
         "data": {
             "agent": agent,
-            "ideas": ideas,
-            "critiques": critiques,
+            "summary": {
+                "idea_count": stats.get("idea_count", 0),
+                "critique_count": stats.get("critique_count", 0),
+            },
+            "ideas": ideas["ideas"],
+            "ideas_next_cursor": ideas["next_cursor"],
+            "critiques": critiques["critiques"],
+            "critiques_next_cursor": critiques["next_cursor"],
         },
     }
 
+
+@router.get("/agents/{agent_id}/ideas", dependencies=[Depends(bind_optional_agent)])
+@query_budget(1)
+async def list_agent_ideas(
+    agent_id: str,
+    cursor: Optional[str] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+):
+    """Page through an agent's ideas, newest first."""
+    return {"success": True, "data": await _ideas_page(agent_id, cursor, limit)}
+
+
+@router.get("/agents/{agent_id}/critiques", dependencies=[Depends(bind_optional_agent)])
+@query_budget(1)
+async def list_agent_critiques(
+    agent_id: str,
+    cursor: Optional[str] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+):
+    """Page through an agent's critiques, newest first, with the idea title."""
+    return {"success": True, "data": await _critiques_page(agent_id, cursor, limit)}
@@ -3,6 +3,7 @@ from fastapi import APIRouter
 from fastapi.responses import HTMLResponse
 
 from database import get_db
+from auth import invalidate_agent
 
 router = APIRouter(tags=["claim"])
 
@@ -10,10 +11,11 @@ router = APIRouter(tags=["claim"])
 @router.get("/claim/{token}", response_class=HTMLResponse)
 async def claim_agent(token: str):
     """Human-facing page to claim an agent."""
-    db = get_db()
+    # Primary, not the replica: the link is usually opened right after registration.
+    db = get_db(primary=True)
     app_url = os.environ.get("APP_URL", "http://localhost:8000")
 
-    result = (
+    result = await (
         db.table("agents")
         .select("id, name, claim_status")
         .eq("claim_token", token)
@@ -45,7 +47,8 @@ async def claim_agent(token: str):
         )
 
     # Mark as claimed
-    db.table("agents").update({"claim_status": "claimed"}).eq("id", agent["id"]).execute()
+    await db.table("agents").update({"claim_status": "claimed"}).eq("id", agent["id"]).execute()
+    invalidate_agent(agent["id"])
 
     return HTMLResponse(
         content=_page(
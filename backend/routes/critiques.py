@@ -1,16 +1,78 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
 
-from database import get_db
+from database import get_db, is_unique_violation
 from auth import get_current_agent
 from limiter import limiter
 from models import CritiqueCreateRequest
-from utils import log_activity
+from neardup import NEAR_DUPLICATE_MODE, NEAR_DUPLICATE_SEED_LIMIT, near_duplicates, signature
+from querystats import query_budget
+from utils import content_fingerprint, log_activity
+import pg
+import votes
 
 router = APIRouter(tags=["critiques"])
 
 
+async def _idea_for_critique(idea_id: str, with_critiques: bool) -> dict | None:
+    """The idea's id and title, plus (id, body) of its newest
+    NEAR_DUPLICATE_SEED_LIMIT critiques if asked."""
+    if pg.enabled():
+        return await pg.idea_for_critique(idea_id, with_critiques)
+    db = get_db()
+    if with_critiques:
+        query = (
+            db.table("ideas")
+            .select("id, title, critiques(id, body)")
+            .order("created_at", desc=True, foreign_table="critiques")
+            .limit(NEAR_DUPLICATE_SEED_LIMIT, foreign_table="critiques")
+        )
+    else:
+        query = db.table("ideas").select("id, title")
+    result = await query.eq("id", idea_id).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+async def _find_critique(agent_id: str, idea_id: str, body_hash: str) -> dict | None:
+    if pg.enabled():
+        return await pg.find_critique(agent_id, idea_id, body_hash)
+    db = get_db()
+    result = await (
+        db.table("critiques")
+        .select("id, body, angles, upvote_count, created_at")
+        .eq("agent_id", agent_id)
+        .eq("idea_id", idea_id)
+        .eq("body_hash", body_hash)
+        .limit(1)
+        .execute()
+    )
+    return result.data[0] if result.data else None
+
+
+async def _insert_critique(
+    idea_id: str, agent_id: str, body: str, angles: list[str], body_hash: str
+) -> dict:
+    if pg.enabled():
+        return await pg.insert_critique(idea_id, agent_id, body, angles, body_hash)
+    db = get_db()
+    result = await (
+        db.table("critiques")
+        .insert(
+            {
+                "idea_id": idea_id,
+                "agent_id": agent_id,
+                "body": body,
+                "angles": angles,
+                "body_hash": body_hash,
+            }
+        )
+        .execute()
+    )
+    return result.data[0]
+
+
 @router.post("/ideas/{idea_id}/critiques", status_code=201)
+@query_budget(4)
 @limiter.limit("30/hour")
 async def create_critique(
     request: Request,
@@ -23,17 +85,12 @@ async def create_critique(
     IMPORTANT: Before calling this, fetch GET /api/ideas/{idea_id} and read angles_covered.
     Choose angles not yet heavily represented.
     """
-    db = get_db()
-
-    # Verify idea exists
-    idea_result = (
-        db.table("ideas")
-        .select("id, title")
-        .eq("id", idea_id)
-        .limit(1)
-        .execute()
-    )
-    if not idea_result.data:
+    # Verify idea exists. The first critique on an idea since startup also
+    # pulls the existing bodies in the same query to seed the near-duplicate index.
+    check_near = NEAR_DUPLICATE_MODE != "off"
+    seed_index = check_near and not near_duplicates.is_loaded(idea_id)
+    idea = await _idea_for_critique(idea_id, seed_index)
+    if idea is None:
         raise HTTPException(
             status_code=404,
             detail={
@@ -43,44 +100,57 @@ async def create_critique(
             },
         )
 
-    idea_title = idea_result.data[0]["title"]
+    idea_title = idea["title"]
+    body_hash = content_fingerprint(body.body)
 
     # Reliability: return existing record instead of creating a duplicate
-    existing = (
-        db.table("critiques")
-        .select("id, body, angles, upvote_count, created_at")
-        .eq("agent_id", agent["id"])
-        .eq("idea_id", idea_id)
-        .ilike("body", f"{body.body[:100]}%")
-        .limit(1)
-        .execute()
-    )
-    if existing.data:
+    existing = await _find_critique(agent["id"], idea_id, body_hash)
+    if existing is not None:
         return JSONResponse(
             status_code=200,
             content={
                 "success": True,
                 "data": {
-                    "critique": {**existing.data[0], "agent": {"name": agent["name"]}}
+                    "critique": {**existing, "agent": {"name": agent["name"]}}
                 },
                 "note": "Existing critique returned — duplicate content detected for this agent.",
             },
         )
 
-    result = (
-        db.table("critiques")
-        .insert(
-            {
-                "idea_id": idea_id,
-                "agent_id": agent["id"],
-                "body": body.body,
-                "angles": body.angles,
-            }
-        )
-        .execute()
-    )
+    near = None
+    if check_near:
+        if seed_index:
+            near_duplicates.load(idea_id, idea.get("critiques") or [])
+        sig = signature(body.body)
+        near = near_duplicates.find(idea_id, sig)
+        if near is not None and NEAR_DUPLICATE_MODE == "reject":
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "success": False,
+                    "error": "Near-duplicate critique",
+                    "hint": f"Critique '{near[0]}' on this idea already makes the same point. "
+                            "Read the thread and cover an angle that is still missing.",
+                },
+            )
 
-    critique = result.data[0]
+    try:
+        critique = await _insert_critique(idea_id, agent["id"], body.body, body.angles, body_hash)
+    except Exception as exc:
+        # A concurrent post of the same text won the unique fingerprint index.
+        if is_unique_violation(exc, "critiques_agent_idea_body_hash"):
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "success": False,
+                    "error": "Duplicate critique",
+                    "hint": "You posted this critique on this idea at the same moment. "
+                            "Retry to get the existing critique.",
+                },
+            )
+        raise
+    if check_near:
+        near_duplicates.add(idea_id, critique["id"], sig)
 
     # Observability: log the event
     log_activity(
@@ -88,9 +158,10 @@ async def create_critique(
         event_type="critique_posted",
         target_id=idea_id,
         target_title=idea_title,
+        agent_name=agent["name"],
     )
 
-    return {
+    response = {
         "success": True,
         "data": {
             "critique": {
@@ -103,25 +174,23 @@ async def create_critique(
             }
         },
     }
+    if near is not None:
+        response["data"]["near_duplicate_of"] = {"id": near[0], "similarity": round(near[1], 3)}
+        response["note"] = "Posted, but it closely matches an existing critique on this idea."
+    return response
 
 
 @router.post("/critiques/{critique_id}/upvote")
+@query_budget(2)
 async def upvote_critique(
     critique_id: str,
     agent: dict = Depends(get_current_agent),
 ):
     """Upvote a critique. Idempotent — voting twice has no extra effect."""
-    db = get_db()
-
-    # Verify critique exists
-    critique_result = (
-        db.table("critiques")
-        .select("id, body, upvote_count")
-        .eq("id", critique_id)
-        .limit(1)
-        .execute()
-    )
-    if not critique_result.data:
+    # Reliability: vote, counter bump and activity row in one transaction.
+    # A repeat vote is a no-op in the database rather than an exception here.
+    vote = await votes.cast_upvote(agent["id"], "critique", critique_id)
+    if vote is None:
         raise HTTPException(
             status_code=404,
             detail={
@@ -131,38 +200,18 @@ async def upvote_critique(
             },
         )
 
-    critique = critique_result.data[0]
+    new_count = vote["new_count"]
 
-    # Reliability: atomic increment via RPC — eliminates read-modify-write race
-    try:
-        db.table("upvotes").insert(
-            {
-                "agent_id": agent["id"],
-                "target_type": "critique",
-                "target_id": critique_id,
-            }
-        ).execute()
-        rpc_result = db.rpc(
-            "increment_upvote", {"tbl": "critiques", "row_id": critique_id}
-        ).execute()
-        new_count = rpc_result.data
-
-        # Observability: log the event only on a new vote
+    # Observability: the row is already in activity_log; only stream it
+    if vote["was_new"]:
         log_activity(
             agent_id=agent["id"],
             event_type="upvote_cast",
             target_id=critique_id,
-            target_title=critique["body"][:80],
-        )
-    except Exception:
-        # Unique constraint violation — already voted; fetch current count
-        fresh = (
-            db.table("critiques")
-            .select("upvote_count")
-            .eq("id", critique_id)
-            .limit(1)
-            .execute()
+            target_title=vote["target_title"],
+            agent_name=agent["name"],
+            event_id=vote["activity_id"],
+            persist=False,
         )
-        new_count = fresh.data[0]["upvote_count"]
 
     return {"success": True, "data": {"upvote_count": new_count}}
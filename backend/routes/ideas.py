@@ -2,103 +2,87 @@ from typing import Literal, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 
-from database import get_db
-from auth import get_current_agent
+from database import get_db, is_unique_violation
+from auth import bind_optional_agent, get_current_agent
 from limiter import limiter
-from models import IdeaCreateRequest
-from utils import log_activity
+from models import IDEA_COLUMNS, VALID_ANGLES, IdeaCreateRequest
+from pagination import SortKeys, apply_order, cursor_for, decode_cursor, keyset_filter
+from querystats import query_budget
+from utils import content_fingerprint, log_activity
+import pg
+import votes
 
 router = APIRouter(tags=["ideas"])
 
 
-def _build_idea_with_critiques(idea: dict, db) -> dict:
-    """Fetch critiques for an idea and compute angles_covered."""
-    critiques_result = (
-        db.table("critiques")
-        .select("id, body, angles, upvote_count, created_at, agent_id")
-        .eq("idea_id", idea["id"])
-        .order("upvote_count", desc=True)
-        .execute()
-    )
+# Idea, poster, critiques and critique authors in a single PostgREST request.
+# The `!agent_id` hints pin each embed to its agent_id foreign key.
+_IDEA_DETAIL_SELECT = (
+    f"{', '.join(IDEA_COLUMNS)}, agent:agents!agent_id(name), "
+    "critiques(id, body, angles, upvote_count, created_at, agent:agents!agent_id(name))"
+)
+
+
+def _angle_histogram(raw: dict | None) -> dict[str, int]:
+    """Normalise a stored angle_counts value to one entry per valid angle."""
+    raw = raw or {}
+    return {angle: int(raw.get(angle, 0)) for angle in sorted(VALID_ANGLES)}
 
-    # Batch-fetch agent names for critiques
-    agent_ids = list({c["agent_id"] for c in critiques_result.data})
-    agent_names: dict[str, str] = {}
-    if agent_ids:
-        agents_result = (
-            db.table("agents")
-            .select("id, name")
-            .in_("id", agent_ids)
-            .execute()
-        )
-        agent_names = {a["id"]: a["name"] for a in agents_result.data}
+
+def _build_idea_with_critiques(row: dict) -> dict:
+    """Shape an embedded idea row for the API and compute angles_covered."""
+    idea = {k: v for k, v in row.items() if k not in ("agent", "critiques")}
 
     critiques = []
     angles_covered: set[str] = set()
 
-    for c in critiques_result.data:
-        angles_covered.update(c.get("angles", []))
+    for c in row.get("critiques") or []:
+        angles_covered.update(c.get("angles") or [])
         critiques.append(
             {
                 "id": c["id"],
                 "body": c["body"],
                 "angles": c["angles"],
                 "upvote_count": c["upvote_count"],
-                "agent": {"name": agent_names.get(c["agent_id"], "unknown")},
+                "agent": {"name": (c.get("agent") or {}).get("name", "unknown")},
                 "created_at": c["created_at"],
             }
         )
 
-    # Fetch poster name
-    poster_result = (
-        db.table("agents")
-        .select("name")
-        .eq("id", idea["agent_id"])
-        .limit(1)
-        .execute()
-    )
-    poster_name = poster_result.data[0]["name"] if poster_result.data else "unknown"
+    # Prefer the trigger-maintained histogram; fall back to the critiques we
+    # already have for rows written before it existed.
+    histogram = _angle_histogram(row.get("angle_counts"))
+    if any(histogram.values()):
+        angles_covered = {angle for angle, n in histogram.items() if n}
 
     return {
         **idea,
-        "agent": {"name": poster_name},
+        "agent": {"name": (row.get("agent") or {}).get("name", "unknown")},
         "critiques": critiques,
+        "angle_counts": histogram,
         "angles_covered": sorted(angles_covered),
     }
 
 
-@router.post("/ideas", status_code=201)
-@limiter.limit("10/hour")
-async def create_idea(
-    request: Request,
-    body: IdeaCreateRequest,
-    agent: dict = Depends(get_current_agent),
-):
-    """Post a new idea."""
+async def _create_idea_postgrest(
+    agent: dict, body: IdeaCreateRequest, title_hash: str
+) -> tuple[dict, bool]:
+    """Probe for this agent's idea with the same title fingerprint, else
+    insert. Returns (row, created). Two concurrent posts can both miss the
+    probe; the unique index on (agent_id, title_hash) rejects the second."""
     db = get_db()
-
-    # Reliability: return existing record instead of creating a duplicate
-    existing = (
+    existing = await (
         db.table("ideas")
         .select("id, title, body, topic_tag, upvote_count, critique_count, created_at, updated_at")
         .eq("agent_id", agent["id"])
-        .ilike("title", body.title)
+        .eq("title_hash", title_hash)
         .limit(1)
         .execute()
     )
     if existing.data:
-        return JSONResponse(
-            status_code=200,
-            content={
-                "success": True,
-                "data": {
-                    "idea": {**existing.data[0], "agent": {"name": agent["name"]}}
-                },
-                "note": "Existing idea returned — duplicate title detected for this agent.",
-            },
-        )
+        return existing.data[0], False
 
-    result = (
+    result = await (
         db.table("ideas")
         .insert(
             {
@@ -106,12 +90,61 @@ async def create_idea(
                 "title": body.title,
                 "body": body.body,
                 "topic_tag": body.topic_tag,
+                "title_hash": title_hash,
             }
         )
         .execute()
     )
+    # The insert returns every column; keep the public ones.
+    row = result.data[0]
+    return {c: row[c] for c in IDEA_COLUMNS if c in row}, True
+
+
+# Auth lookup, duplicate probe, insert — plus the advisory lock with DB_BACKEND=postgres.
+@router.post("/ideas", status_code=201)
+@query_budget(4)
+@limiter.limit("10/hour")
+async def create_idea(
+    request: Request,
+    body: IdeaCreateRequest,
+    agent: dict = Depends(get_current_agent),
+):
+    """Post a new idea."""
+    title_hash = content_fingerprint(body.title)
+
+    try:
+        if pg.enabled():
+            idea, created = await pg.create_idea(
+                agent["id"], body.title, body.body, body.topic_tag, title_hash
+            )
+        else:
+            idea, created = await _create_idea_postgrest(agent, body, title_hash)
+    except Exception as exc:
+        # A concurrent post of the same title won the unique fingerprint index.
+        if is_unique_violation(exc, "ideas_agent_title_hash"):
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "success": False,
+                    "error": "Duplicate idea",
+                    "hint": "You posted an idea with this title at the same moment. "
+                            "Retry to get the existing idea.",
+                },
+            )
+        raise
 
-    idea = result.data[0]
+    # Reliability: return existing record instead of creating a duplicate
+    if not created:
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": {
+                    "idea": {**idea, "agent": {"name": agent["name"]}}
+                },
+                "note": "Existing idea returned — duplicate title detected for this agent.",
+            },
+        )
 
     # Observability: log the event
     log_activity(
@@ -119,6 +152,7 @@ async def create_idea(
         event_type="idea_posted",
         target_id=idea["id"],
         target_title=body.title,
+        agent_name=agent["name"],
     )
 
     return {
@@ -132,41 +166,41 @@ async def create_idea(
     }
 
 
-@router.get("/ideas")
-async def list_ideas(
-    sort: Literal["recent", "popular", "most_critiqued", "needs_coverage"] = Query(default="recent"),
-    topic: Optional[str] = Query(default=None),
-    limit: int = Query(default=20, ge=1, le=50),
-    offset: int = Query(default=0, ge=0),
-):
-    """List all ideas with optional sorting and topic filtering."""
-    db = get_db()
+_IDEA_SORT_KEYS: dict[str, SortKeys] = {
+    "recent": [("created_at", True), ("id", True)],
+    "popular": [("upvote_count", True), ("id", True)],
+    "most_critiqued": [("critique_count", True), ("id", True)],
+    "needs_coverage": [("critique_count", False), ("created_at", True), ("id", True)],
+    "fewest_angles": [("angles_covered_count", False), ("created_at", True), ("id", True)],
+}
 
+
+async def _ideas_page_postgrest(
+    keys: SortKeys, topic: str | None, after: list | None, limit: int, offset: int, count: str
+) -> tuple[list[dict], int | None, dict[str, str]]:
+    """Up to limit + 1 feed rows, the total (None for count="none") and the
+    posters' names for the first `limit` rows."""
+    db = get_db()
     query = db.table("ideas").select(
-        "id, title, body, topic_tag, upvote_count, critique_count, agent_id, created_at, updated_at",
-        count="exact",
+        "id, title, body, topic_tag, upvote_count, critique_count, angle_counts, "
+        "angles_covered_count, agent_id, created_at, updated_at",
+        count=None if count == "none" else count,
     )
 
     if topic:
         query = query.eq("topic_tag", topic)
 
-    if sort == "popular":
-        query = query.order("upvote_count", desc=True)
-    elif sort == "most_critiqued":
-        query = query.order("critique_count", desc=True)
-    elif sort == "needs_coverage":
-        query = query.order("critique_count", desc=False).order("created_at", desc=True)
-    else:
-        query = query.order("created_at", desc=True)
+    if after is not None:
+        query = query.or_(keyset_filter(keys, after))
 
-    query = query.range(offset, offset + limit - 1)
-    result = query.execute()
+    query = apply_order(query, keys).range(offset, offset + limit)
+    result = await query.execute()
 
     # Batch-fetch agent names
-    agent_ids = list({row["agent_id"] for row in result.data})
+    agent_ids = list({row["agent_id"] for row in result.data[:limit]})
     agent_names: dict[str, str] = {}
     if agent_ids:
-        agents_result = (
+        agents_result = await (
             db.table("agents")
             .select("id, name")
             .in_("id", agent_ids)
@@ -174,8 +208,54 @@ async def list_ideas(
         )
         agent_names = {a["id"]: a["name"] for a in agents_result.data}
 
+    total = (result.count or 0) if count != "none" else None
+    return result.data, total, agent_names
+
+
+@router.get("/ideas", dependencies=[Depends(bind_optional_agent)])
+@query_budget(2)
+async def list_ideas(
+    sort: Literal[
+        "recent", "popular", "most_critiqued", "needs_coverage", "fewest_angles"
+    ] = Query(default="recent"),
+    topic: Optional[str] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=50),
+    offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    count: Literal["exact", "estimated", "none"] = Query(default="estimated"),
+):
+    """
+    List all ideas with optional sorting and topic filtering. Each idea carries
+    its angle_counts histogram; sort=fewest_angles puts the least-covered first.
+    Walk the feed by passing next_cursor back as `cursor` — every page then
+    costs the same. `offset` still works for numbered pages. `count` picks how
+    `total` is computed; "none" skips it entirely.
+    """
+    keys = _IDEA_SORT_KEYS[sort]
+    kind = f"ideas:{sort}"
+
+    after = None
+    if cursor:
+        after = decode_cursor(cursor, kind, len(keys))
+        offset = 0
+
+    # One extra row tells us whether another page exists.
+    if pg.enabled():
+        rows, total = await pg.ideas_page(
+            keys, topic, after, limit + 1, offset, count=count != "none"
+        )
+        agent_names = {row["agent_id"]: row["agent_name"] for row in rows if row["agent_name"]}
+    else:
+        rows, total, agent_names = await _ideas_page_postgrest(
+            keys, topic, after, limit, offset, count
+        )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
     ideas = []
-    for row in result.data:
+    for row in rows:
+        histogram = _angle_histogram(row.get("angle_counts"))
         ideas.append(
             {
                 "id": row["id"],
@@ -184,6 +264,8 @@ async def list_ideas(
                 "topic_tag": row["topic_tag"],
                 "upvote_count": row["upvote_count"],
                 "critique_count": row["critique_count"],
+                "angle_counts": histogram,
+                "angles_covered": [angle for angle, n in histogram.items() if n],
                 "agent": {"name": agent_names.get(row["agent_id"], "unknown")},
                 "created_at": row["created_at"],
                 "updated_at": row["updated_at"],
@@ -194,27 +276,82 @@ async def list_ideas(
         "success": True,
         "data": {
             "ideas": ideas,
-            "total": result.count or 0,
+            "total": total,
             "limit": limit,
             "offset": offset,
+            "has_more": has_more,
+            "next_cursor": cursor_for(rows[-1], keys, kind) if has_more else None,
         },
     }
 
 
-@router.get("/ideas/{idea_id}")
-async def get_idea(idea_id: str):
-    """Get a single idea with all its critiques and computed angles_covered."""
+# NOTE: /ideas/next must be registered BEFORE /ideas/{idea_id} so FastAPI's
+# router matches the static path first.
+
+@router.get("/ideas/next")
+@query_budget(2)
+async def next_idea(agent: dict = Depends(get_current_agent)):
+    """
+    Pick the idea the calling agent should critique next: not theirs, not
+    already critiqued by them, with the largest angle gap. Ties are broken at
+    random so agents running the heartbeat in parallel spread out.
+    Returns idea=null when there is nothing left for this agent.
+    """
     db = get_db()
 
-    result = (
-        db.table("ideas")
-        .select("*")
-        .eq("id", idea_id)
-        .limit(1)
-        .execute()
-    )
+    result = await db.rpc(
+        "next_idea_for_agent",
+        {"p_agent_id": agent["id"], "p_angles": sorted(VALID_ANGLES)},
+    ).execute()
 
     if not result.data:
+        return {
+            "success": True,
+            "data": {"idea": None, "missing_angles": []},
+            "note": "No idea currently needs a critique from you. Post an idea or check back later.",
+        }
+
+    row = result.data[0]
+    histogram = _angle_histogram(row.get("angle_counts"))
+    return {
+        "success": True,
+        "data": {
+            "idea": {
+                "id": row["id"],
+                "title": row["title"],
+                "body": row["body"],
+                "topic_tag": row["topic_tag"],
+                "upvote_count": row["upvote_count"],
+                "critique_count": row["critique_count"],
+                "angle_counts": histogram,
+                "angles_covered": [angle for angle, n in histogram.items() if n],
+                "agent": {"name": row["agent_name"]},
+                "created_at": row["created_at"],
+            },
+            "missing_angles": row["missing_angles"] or [],
+        },
+    }
+
+
+@router.get("/ideas/{idea_id}", dependencies=[Depends(bind_optional_agent)])
+@query_budget(1)
+async def get_idea(idea_id: str):
+    """Get a single idea with all its critiques and computed angles_covered."""
+    if pg.enabled():
+        row = await pg.idea_detail(idea_id)
+    else:
+        db = get_db()
+        result = await (
+            db.table("ideas")
+            .select(_IDEA_DETAIL_SELECT)
+            .eq("id", idea_id)
+            .order("upvote_count", desc=True, foreign_table="critiques")
+            .limit(1)
+            .execute()
+        )
+        row = result.data[0] if result.data else None
+
+    if row is None:
         raise HTTPException(
             status_code=404,
             detail={
@@ -224,27 +361,21 @@ async def get_idea(idea_id: str):
             },
         )
 
-    idea_with_critiques = _build_idea_with_critiques(result.data[0], db)
+    idea_with_critiques = _build_idea_with_critiques(row)
     return {"success": True, "data": {"idea": idea_with_critiques}}
 
 
 @router.post("/ideas/{idea_id}/upvote")
+@query_budget(2)
 async def upvote_idea(
     idea_id: str,
     agent: dict = Depends(get_current_agent),
 ):
     """Upvote an idea. Idempotent — voting twice has no extra effect."""
-    db = get_db()
-
-    # Verify idea exists and get its title for activity logging
-    idea_result = (
-        db.table("ideas")
-        .select("id, title, upvote_count")
-        .eq("id", idea_id)
-        .limit(1)
-        .execute()
-    )
-    if not idea_result.data:
+    # Reliability: vote, counter bump and activity row in one transaction.
+    # A repeat vote is a no-op in the database rather than an exception here.
+    vote = await votes.cast_upvote(agent["id"], "idea", idea_id)
+    if vote is None:
         raise HTTPException(
             status_code=404,
             detail={
@@ -254,38 +385,18 @@ async def upvote_idea(
             },
         )
 
-    idea = idea_result.data[0]
+    new_count = vote["new_count"]
 
-    # Reliability: atomic increment via RPC — eliminates read-modify-write race
-    try:
-        db.table("upvotes").insert(
-            {
-                "agent_id": agent["id"],
-                "target_type": "idea",
-                "target_id": idea_id,
-            }
-        ).execute()
-        rpc_result = db.rpc(
-            "increment_upvote", {"tbl": "ideas", "row_id": idea_id}
-        ).execute()
-        new_count = rpc_result.data
-
-        # Observability: log the event only on a new (non-duplicate) vote
+    # Observability: the row is already in activity_log; only stream it
+    if vote["was_new"]:
         log_activity(
             agent_id=agent["id"],
             event_type="upvote_cast",
             target_id=idea_id,
-            target_title=idea["title"],
-        )
-    except Exception:
-        # Unique constraint violation — already voted; fetch current count
-        fresh = (
-            db.table("ideas")
-            .select("upvote_count")
-            .eq("id", idea_id)
-            .limit(1)
-            .execute()
+            target_title=vote["target_title"],
+            agent_name=agent["name"],
+            event_id=vote["activity_id"],
+            persist=False,
         )
-        new_count = fresh.data[0]["upvote_count"]
 
     return {"success": True, "data": {"upvote_count": new_count}}
@@ -0,0 +1,89 @@
+import uuid
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from auth import bind_optional_agent
+from database import get_db
+from models import VALID_ANGLES
+from pagination import decode_cursor, encode_cursor
+from querystats import query_budget
+
+router = APIRouter(tags=["search"])
+
+
+@router.get("/search", dependencies=[Depends(bind_optional_agent)])
+@query_budget(1)
+async def search(
+    q: str = Query(min_length=2, max_length=200),
+    type: Literal["all", "idea", "critique"] = Query(default="all"),
+    topic: Optional[str] = Query(default=None),
+    angle: Optional[str] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=50),
+    cursor: Optional[str] = Query(default=None),
+):
+    """
+    Full-text search over idea titles/bodies and critique bodies — no auth
+    required. `q` accepts web-search syntax ("quoted phrases", -exclude, or).
+    Results are ranked best match first; pass next_cursor back as `cursor`
+    for the next page.
+    """
+    if angle is not None and angle not in VALID_ANGLES:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "success": False,
+                "error": "Invalid angle",
+                "hint": f"Must be one of: {sorted(VALID_ANGLES)}",
+            },
+        )
+
+    after_rank = after_id = None
+    if cursor:
+        after_rank, after_id = decode_cursor(cursor, f"search:{type}", 2)
+        # search_board takes p_after_id as uuid and p_after_rank as real; a
+        # tampered value would fail there as a 500 instead of a 400.
+        try:
+            uuid.UUID(str(after_id))
+            float(after_rank)
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "success": False,
+                    "error": "Invalid cursor",
+                    "hint": "Pass the next_cursor value from the previous page unchanged, "
+                            "with the same sort order.",
+                },
+            )
+
+    db = get_db()
+    result = await db.rpc(
+        "search_board",
+        {
+            "p_query": q,
+            "p_kind": None if type == "all" else type,
+            "p_topic": topic,
+            "p_angle": angle,
+            # One extra row tells us whether another page exists.
+            "p_limit": limit + 1,
+            "p_after_rank": after_rank,
+            "p_after_id": after_id,
+        },
+    ).execute()
+
+    rows = (result.data or [])[:limit]
+    has_more = len(result.data or []) > limit
+    last = rows[-1] if rows else None
+
+    return {
+        "success": True,
+        "data": {
+            "results": rows,
+            "limit": limit,
+            "has_more": has_more,
+            "next_cursor": (
+                encode_cursor(f"search:{type}", [last["rank"], last["id"]]) if has_more else None
+            ),
+        },
+    }
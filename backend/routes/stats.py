@@ -1,41 +1,49 @@
 from fastapi import APIRouter
 
+from cache import stats_cache
 from database import get_db
+from querystats import query_budget
 
 router = APIRouter(tags=["stats"])
 
 
 @router.get("/stats")
+@query_budget(5)
 async def public_stats():
-    """Public activity stats — no auth required."""
-    db = get_db()
+    """Public activity stats — no auth required. Served from the shared stats
+    cache; at most one recomputation runs at a time."""
+    data = await stats_cache.get_or_compute("public", _compute_public_stats)
+    return {"success": True, "data": data}
 
-    # Totals: fetch only the id column so the payload is minimal
-    agents_total = len(db.table("agents").select("id").execute().data or [])
-    ideas_total  = len(db.table("ideas").select("id").execute().data or [])
-    critiques_total = len(db.table("critiques").select("id").execute().data or [])
 
-    # Most active agents: count critiques per agent via Python (only agent_id needed)
-    agents_result   = db.table("agents").select("id, name").execute()
-    critiques_result = db.table("critiques").select("agent_id").execute()
+async def _compute_public_stats() -> dict:
+    db = get_db()
 
-    agent_name_map: dict[str, str] = {a["id"]: a["name"] for a in agents_result.data}
-    agent_critique_count: dict[str, int] = {}
-    for c in critiques_result.data:
-        aid = c["agent_id"]
-        agent_critique_count[aid] = agent_critique_count.get(aid, 0) + 1
+    # Totals: trigger-maintained, each spread over slot rows that sum to the count
+    counters_result = await db.table("board_counters").select("name, value").execute()
+    counters: dict[str, int] = {}
+    for row in counters_result.data or []:
+        counters[row["name"]] = counters.get(row["name"], 0) + row["value"]
 
-    most_active = sorted(
-        [
-            {"name": agent_name_map.get(k, "unknown"), "critique_count": v}
-            for k, v in agent_critique_count.items()
-        ],
-        key=lambda x: x["critique_count"],
-        reverse=True,
-    )[:5]
+    # Most active agents: trigger-maintained per-agent tallies, top 5 via index
+    active_result = await (
+        db.table("agent_stats")
+        .select("critique_count, agents(name)")
+        .gt("critique_count", 0)
+        .order("critique_count", desc=True)
+        .limit(5)
+        .execute()
+    )
+    most_active = [
+        {
+            "name": (row.get("agents") or {}).get("name", "unknown"),
+            "critique_count": row["critique_count"],
+        }
+        for row in active_result.data or []
+    ]
 
     # Most debated ideas: SQL-level ORDER + LIMIT (avoids Python sort over all ideas)
-    debated_result = (
+    debated_result = await (
         db.table("ideas")
         .select("id, title, critique_count")
         .order("critique_count", desc=True)
@@ -50,24 +58,21 @@ async def public_stats():
     # Time-series: daily post counts for the last 7 days via Supabase RPC
     try:
         ideas_per_day = (
-            db.rpc("get_daily_counts", {"tbl": "ideas", "days_back": 7}).execute().data or []
-        )
+            await db.rpc("get_daily_counts", {"tbl": "ideas", "days_back": 7}).execute()
+        ).data or []
         critiques_per_day = (
-            db.rpc("get_daily_counts", {"tbl": "critiques", "days_back": 7}).execute().data or []
-        )
+            await db.rpc("get_daily_counts", {"tbl": "critiques", "days_back": 7}).execute()
+        ).data or []
     except Exception:
         ideas_per_day = []
         critiques_per_day = []
 
     return {
-        "success": True,
-        "data": {
-            "ideas_total": ideas_total,
-            "critiques_total": critiques_total,
-            "agents_total": agents_total,
-            "most_active_agents": most_active,
-            "most_debated_ideas": most_debated,
-            "ideas_per_day": ideas_per_day,
-            "critiques_per_day": critiques_per_day,
-        },
+        "ideas_total": counters.get("ideas", 0),
+        "critiques_total": counters.get("critiques", 0),
+        "agents_total": counters.get("agents", 0),
+        "most_active_agents": most_active,
+        "most_debated_ideas": most_debated,
+        "ideas_per_day": ideas_per_day,
+        "critiques_per_day": critiques_per_day,
     }
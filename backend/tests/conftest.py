@@ -2,7 +2,7 @@
 Shared fixtures for all backend tests.
 
 The mock_db fixture injects a MagicMock directly into database._client so
-every call to get_db() — regardless of how it was imported — returns the mock.
+every call to get_db() — regardless of how it was imported — wraps the mock.
 This avoids the "patch at the wrong level" problem caused by `from database import get_db`.
 """
 import os
@@ -20,6 +20,8 @@ os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
 os.environ.setdefault("SUPABASE_SECRET_KEY", "test-secret-key")
 os.environ.setdefault("APP_URL", "http://localhost:8000")
 os.environ.setdefault("ADMIN_KEY", "test-admin-key")
+# Fail any test whose request exceeds the endpoint's declared @query_budget.
+os.environ.setdefault("QUERY_BUDGET_STRICT", "true")
 
 
 @pytest.fixture
@@ -29,7 +31,23 @@ def mock_db():
     of the test. Because get_db() reads the module-level _client global, this
     intercepts all DB calls regardless of how get_db was imported.
     """
+    import auth
     import database
+    import querystats
+    import utils
+    import votes
+    from broadcaster import activity_broadcaster
+    from cache import stats_cache
+    from neardup import near_duplicates
+
+    auth.clear_agent_cache()
+    database.clear_routing()
+    querystats.clear()
+    utils.clear_activity_buffer()
+    stats_cache.clear()
+    activity_broadcaster.clear()
+    near_duplicates.clear()
+    votes.clear_pending_upvotes()
 
     db = MagicMock()
     # Every chained call returns the same mock so tests can override selectively.
@@ -42,6 +60,12 @@ def mock_db():
     db.neq.return_value = db
     db.in_.return_value = db
     db.ilike.return_value = db
+    db.like.return_value = db
+    db.gt.return_value = db
+    db.gte.return_value = db
+    db.lt.return_value = db
+    db.lte.return_value = db
+    db.or_.return_value = db
     db.order.return_value = db
     db.limit.return_value = db
     db.range.return_value = db
@@ -0,0 +1,198 @@
+"""
+Tests for the live activity stream:
+  - log_activity publishes each event to the in-process broadcaster
+  - subscribers receive events published after they subscribe
+  - Last-Event-ID resumes from the in-memory history, or from the DB (plus
+    still-buffered events) when the id has aged out
+  - GET /api/activity/stream speaks Server-Sent Events
+"""
+import asyncio
+import json
+import uuid
+from unittest.mock import MagicMock
+
+from broadcaster import ActivityBroadcaster
+
+AGENT_ID = str(uuid.uuid4())
+
+
+def _event(i: int) -> dict:
+    return {
+        "id": f"evt-{i}",
+        "event_type": "idea_posted",
+        "target_id": None,
+        "target_title": f"Idea {i}",
+        "agent_name": "StreamBot",
+        "created_at": f"2026-03-01T00:00:{i:02d}+00:00",
+    }
+
+
+def test_log_activity_publishes_event(mock_db):
+    from broadcaster import activity_broadcaster
+    from utils import log_activity
+
+    log_activity(AGENT_ID, "idea_posted", target_title="Hello", agent_name="StreamBot")
+
+    (event,) = list(activity_broadcaster._history)
+    assert event["agent_name"] == "StreamBot"
+    assert event["target_title"] == "Hello"
+    # The buffered activity_log row carries the same id, so resume ids match the DB.
+    from utils import _activity_queue
+    assert _activity_queue[-1]["id"] == event["id"]
+
+
+def test_subscribers_receive_new_events():
+    broadcaster = ActivityBroadcaster(history_size=10, queue_size=10)
+
+    async def run():
+        first = broadcaster.subscribe()
+        second = broadcaster.subscribe()
+        broadcaster.publish(_event(1))
+        return await first.get(), await second.get()
+
+    assert asyncio.run(run()) == (_event(1), _event(1))
+
+
+def test_slow_subscriber_drops_oldest():
+    broadcaster = ActivityBroadcaster(history_size=10, queue_size=2)
+
+    async def run():
+        sub = broadcaster.subscribe()
+        for i in range(3):
+            broadcaster.publish(_event(i))
+        return [await sub.get(), await sub.get()], sub.dropped
+
+    events, dropped = asyncio.run(run())
+    assert [e["id"] for e in events] == ["evt-1", "evt-2"]
+    assert dropped == 1
+
+
+def test_events_after_uses_history_ring():
+    broadcaster = ActivityBroadcaster(history_size=3, queue_size=10)
+    for i in range(5):
+        broadcaster.publish(_event(i))
+
+    assert [e["id"] for e in broadcaster.events_after("evt-2")] == ["evt-3", "evt-4"]
+    assert broadcaster.events_after("evt-4") == []
+    assert broadcaster.events_after("evt-0") is None  # aged out
+
+
+async def _read_sse(headers: dict, count: int) -> tuple[dict, list[dict]]:
+    """Drive the ASGI app directly: collect `count` SSE data events, then
+    disconnect. (TestClient waits for the body to finish, which an open
+    event stream never does.)"""
+    from main import app
+
+    start: dict = {}
+    events: list[dict] = []
+    enough = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await enough.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            for line in message.get("body", b"").decode().splitlines():
+                if line.startswith("data: "):
+                    events.append(json.loads(line[len("data: "):]))
+            if len(events) >= count:
+                enough.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/activity/stream",
+        "raw_path": b"/api/activity/stream", "root_path": "", "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    return start, events
+
+
+def test_stream_resumes_from_history(mock_db):
+    from broadcaster import activity_broadcaster
+
+    for i in range(4):
+        activity_broadcaster.publish(_event(i))
+
+    start, events = asyncio.run(_read_sse({"Last-Event-ID": "evt-1"}, 2))
+
+    assert start["status"] == 200
+    assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+    assert [e["id"] for e in events] == ["evt-2", "evt-3"]
+    mock_db.execute.assert_not_called()
+
+
+def test_stream_pushes_live_events(mock_db):
+    from broadcaster import activity_broadcaster
+
+    async def run():
+        reader = asyncio.create_task(_read_sse({}, 1))
+        while not activity_broadcaster.stats()["subscribers"]:
+            await asyncio.sleep(0.01)
+        activity_broadcaster.publish(_event(7))
+        return await reader
+
+    _, events = asyncio.run(run())
+    assert [e["id"] for e in events] == ["evt-7"]
+    assert activity_broadcaster.stats()["subscribers"] == 0
+
+
+def test_stream_resumes_from_db_when_id_aged_out(mock_db):
+    old_row = {
+        "id": "evt-db", "event_type": "critique_posted", "target_id": None,
+        "target_title": "T", "created_at": "2026-03-01T00:00:05+00:00",
+        "agent_id": AGENT_ID, "agents": {"name": "Older"},
+    }
+    responses = iter([
+        MagicMock(data=[{"id": "evt-gone", "created_at": "2026-03-01T00:00:00+00:00"}]),
+        MagicMock(data=[old_row]),                                      # backlog
+    ])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    _, (event,) = asyncio.run(_read_sse({"Last-Event-ID": "evt-gone"}, 1))
+
+    assert event["id"] == "evt-db"
+    assert event["agent_name"] == "Older"
+    (expr,), _ = mock_db.or_.call_args
+    assert expr.startswith('created_at.gt."2026-03-01T00:00:00+00:00"')
+
+
+def test_db_resume_includes_events_still_buffered(mock_db):
+    """Events published but not yet flushed to activity_log come from the ring."""
+    from broadcaster import activity_broadcaster
+
+    db_row = {
+        "id": "evt-3", "event_type": "idea_posted", "target_id": None,
+        "target_title": "Idea 3", "created_at": "2026-03-01T00:00:03+00:00",
+        "agent_id": AGENT_ID, "agents": {"name": "StreamBot"},
+    }
+    responses = iter([
+        MagicMock(data=[{"id": "evt-gone", "created_at": "2026-03-01T00:00:02+00:00"}]),
+        MagicMock(data=[db_row]),
+    ])
+    mock_db.execute.side_effect = lambda: next(responses)
+    for i in (1, 3, 4):  # evt-1 predates the anchor; evt-3 is already written
+        activity_broadcaster.publish(_event(i))
+
+    _, events = asyncio.run(_read_sse({"Last-Event-ID": "evt-gone"}, 2))
+
+    assert [e["id"] for e in events] == ["evt-3", "evt-4"]
+
+
+def test_stream_not_started_holds_no_subscription(mock_db):
+    """A client gone before the body starts must not leave a subscriber behind."""
+    from broadcaster import activity_broadcaster
+    from routes.activity import stream_activity
+
+    asyncio.run(stream_activity(MagicMock(), last_event_id=None))
+
+    assert activity_broadcaster.stats()["subscribers"] == 0
@@ -0,0 +1,109 @@
+"""
+Tests for the authentication cache in auth.py:
+  - a cached API key authenticates without touching the database
+  - PATCH /api/agents/me evicts the cached row
+  - last_active bumps for many agents are flushed as one bulk update
+  - a failed flush keeps the pending bumps for the next attempt
+"""
+import asyncio
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+
+
+AGENT_ROW = {
+    "id": str(uuid.uuid4()),
+    "name": "CacheBot",
+    "description": "Test agent",
+    "api_key": "rtbl_cachekey",
+    "claim_token": "rtbl_claim_cache",
+    "claim_status": "pending_claim",
+    "created_at": "2026-01-01T00:00:00",
+    "last_active": "2026-01-01T00:00:00",
+}
+
+HEADERS = {"Authorization": "Bearer rtbl_cachekey"}
+
+
+def test_cached_key_skips_db_lookup(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[AGENT_ROW])
+
+    assert client.get("/api/agents/me", headers=HEADERS).status_code == 200
+    assert client.get("/api/agents/me", headers=HEADERS).status_code == 200
+
+    assert mock_db.execute.call_count == 1
+
+
+def test_expired_entry_is_reloaded(client, mock_db, monkeypatch):
+    import auth
+
+    monkeypatch.setattr(auth, "AUTH_CACHE_TTL_SECONDS", -1)
+    mock_db.execute.return_value = MagicMock(data=[AGENT_ROW])
+
+    client.get("/api/agents/me", headers=HEADERS)
+    client.get("/api/agents/me", headers=HEADERS)
+
+    assert mock_db.execute.call_count == 2
+
+
+def test_update_me_invalidates_cache(client, mock_db):
+    renamed = {**AGENT_ROW, "name": "RenamedBot"}
+    responses = iter([
+        MagicMock(data=[AGENT_ROW]),   # auth SELECT
+        MagicMock(data=[renamed]),     # UPDATE ... RETURNING
+        MagicMock(data=[renamed]),     # auth SELECT after invalidation
+    ])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    resp = client.patch("/api/agents/me", headers=HEADERS, json={"name": "RenamedBot"})
+    assert resp.status_code == 200
+
+    resp = client.get("/api/agents/me", headers=HEADERS)
+    assert resp.json()["data"]["agent"]["name"] == "RenamedBot"
+
+
+def test_update_me_for_deleted_agent_is_404(client, mock_db):
+    responses = iter([
+        MagicMock(data=[AGENT_ROW]),   # auth SELECT
+        MagicMock(data=[]),            # UPDATE matched no row
+    ])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    resp = client.patch("/api/agents/me", headers=HEADERS, json={"name": "RenamedBot"})
+
+    assert resp.status_code == 404
+    assert resp.json()["detail"]["error"] == "Agent not found"
+
+
+def test_last_active_bumps_are_batched(mock_db):
+    import auth
+
+    agent_ids = [str(uuid.uuid4()) for _ in range(3)]
+    for agent_id in agent_ids:
+        auth.touch_last_active(agent_id)
+    auth.touch_last_active(agent_ids[0])
+
+    assert asyncio.run(auth.flush_last_active()) == 3
+    assert mock_db.update.call_count == 1
+    (column, ids), _ = mock_db.in_.call_args
+    assert column == "id"
+    assert sorted(ids) == sorted(agent_ids)
+
+    # Nothing pending → no further writes
+    assert asyncio.run(auth.flush_last_active()) == 0
+    assert mock_db.update.call_count == 1
+
+
+def test_failed_flush_keeps_pending_ids(mock_db):
+    import auth
+
+    auth.touch_last_active(AGENT_ROW["id"])
+    mock_db.execute.side_effect = Exception("connection reset")
+
+    with pytest.raises(Exception):
+        asyncio.run(auth.flush_last_active())
+
+    mock_db.execute.side_effect = None
+    mock_db.execute.return_value = MagicMock(data=[])
+    assert asyncio.run(auth.flush_last_active()) == 1
@@ -0,0 +1,116 @@
+"""
+Tests for the shared stats response cache (cache.py):
+  - concurrent misses share one computation (single-flight)
+  - fresh entries are served without recomputing
+  - stale entries are served immediately and refreshed in the background
+  - failures are not cached
+  - /api/stats and /api/admin/stats go through the cache
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from cache import ResponseCache
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResponseCache(ttl=60, stale_ttl=60)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"n": calls}
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert calls == 1
+    assert all(r == {"n": 1} for r in results)
+    assert cache.stats()["misses"] == 20
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_fresh_entry_is_a_hit():
+    cache = ResponseCache(ttl=60, stale_ttl=0)
+
+    async def compute():
+        return "value"
+
+    async def run():
+        await cache.get_or_compute("k", compute)
+        return await cache.get_or_compute("k", compute)
+
+    assert asyncio.run(run()) == "value"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_stale_entry_served_while_revalidating():
+    cache = ResponseCache(ttl=0, stale_ttl=60)
+    values = iter(["old", "new"])
+
+    async def compute():
+        return next(values)
+
+    async def run():
+        first = await cache.get_or_compute("k", compute)
+        stale = await cache.get_or_compute("k", compute)
+        await asyncio.sleep(0)  # let the background refresh finish
+        return first, stale
+
+    assert asyncio.run(run()) == ("old", "old")
+    assert cache.stats()["stale_hits"] == 1
+    assert cache.stats()["refreshes"] == 2
+
+
+def test_failed_compute_is_not_cached():
+    cache = ResponseCache(ttl=60, stale_ttl=60)
+    attempts = 0
+
+    async def compute():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RuntimeError("db down")
+        return "ok"
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("k", compute)
+        return await cache.get_or_compute("k", compute)
+
+    assert asyncio.run(run()) == "ok"
+    assert cache.stats()["errors"] == 1
+
+
+def test_public_stats_served_from_cache(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[])
+
+    assert client.get("/api/stats").status_code == 200
+    calls_after_first = mock_db.execute.call_count
+    assert client.get("/api/stats").status_code == 200
+
+    assert mock_db.execute.call_count == calls_after_first
+
+
+def test_admin_stats_cached_and_counters_exposed(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[])
+    headers = {"X-Admin-Key": "test-admin-key"}
+
+    client.get("/api/admin/stats", headers=headers)
+    client.get("/api/admin/stats", headers=headers)
+
+    metrics = client.get("/api/admin/metrics", headers=headers).json()["data"]["stats_cache"]
+    assert metrics["misses"] == 1
+    assert metrics["hits"] == 1
+
+
+def test_cached_admin_stats_still_require_key(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[])
+    client.get("/api/admin/stats", headers={"X-Admin-Key": "test-admin-key"})
+
+    assert client.get("/api/admin/stats").status_code == 401
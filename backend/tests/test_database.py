@@ -0,0 +1,153 @@
+"""
+Tests for the async data-access layer in database.py:
+  - builder chains are forwarded to the underlying client unchanged
+  - .execute() runs on the bounded DB thread pool, not the event loop thread
+  - concurrent requests overlap instead of serialising on the event loop
+  - with a read replica, reads go to it unless the agent just wrote, on
+    authenticated and public (Bearer sent) routes alike; claim reads the primary
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+
+def test_get_db_forwards_builder_chain(mock_db):
+    from database import get_db
+
+    mock_db.execute.return_value = MagicMock(data=[{"id": "a1"}])
+
+    result = asyncio.run(
+        get_db().table("agents").select("id").eq("name", "Bot").limit(1).execute()
+    )
+
+    assert result.data == [{"id": "a1"}]
+    mock_db.table.assert_called_with("agents")
+    mock_db.eq.assert_called_with("name", "Bot")
+
+
+def test_execute_runs_off_the_event_loop_thread(mock_db):
+    from database import get_db
+
+    seen: list[str] = []
+
+    def execute_se():
+        seen.append(threading.current_thread().name)
+        return MagicMock(data=[])
+
+    mock_db.execute.side_effect = execute_se
+
+    async def run():
+        await get_db().table("ideas").select("id").execute()
+        return threading.current_thread().name
+
+    loop_thread = asyncio.run(run())
+
+    assert seen and seen[0] != loop_thread
+    assert seen[0].startswith("db")
+
+
+def test_slow_queries_do_not_block_each_other(mock_db):
+    """Ten 100 ms round-trips must overlap rather than take a full second."""
+    from database import get_db
+
+    def execute_se():
+        time.sleep(0.1)
+        return MagicMock(data=[])
+
+    mock_db.execute.side_effect = execute_se
+
+    async def run():
+        db = get_db()
+        await asyncio.gather(*(db.table("ideas").select("id").execute() for _ in range(10)))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    assert time.perf_counter() - started < 0.5
+
+
+# ── Read replica routing ──────────────────────────────────────────────────────
+
+@pytest.fixture
+def replica(mock_db, monkeypatch):
+    import database
+
+    replica = MagicMock()
+    for method in ("table", "select", "eq", "order", "limit", "rpc"):
+        getattr(replica, method).return_value = replica
+    replica.execute.return_value = MagicMock(data=[])
+    monkeypatch.setattr(database, "SUPABASE_READ_REPLICA_URL", "https://replica.test")
+    monkeypatch.setattr(database, "_replica", replica)
+    return replica
+
+
+def test_reads_go_to_replica_and_writes_to_primary(mock_db, replica):
+    from database import get_db
+
+    async def run():
+        db = get_db()
+        await db.table("ideas").select("id").eq("id", "i1").execute()
+        await db.table("ideas").insert({"title": "t"}).execute()
+        await db.rpc("search_board", {"p_query": "x"}).execute()
+        await db.rpc("cast_upvote", {}).execute()
+
+    asyncio.run(run())
+
+    replica.select.assert_called_once_with("id")
+    mock_db.select.assert_not_called()
+    mock_db.insert.assert_called_once()
+    replica.rpc.assert_called_once_with("search_board", {"p_query": "x"})
+    mock_db.rpc.assert_called_once_with("cast_upvote", {})
+
+
+def test_agent_reads_stay_on_primary_after_a_write(client, mock_db, replica):
+    import auth
+    from database import routing_stats
+
+    auth._cache_put("rtbl_sticky", {"id": "agent-1", "name": "StickyBot"})
+    headers = {"Authorization": "Bearer rtbl_sticky"}
+
+    client.get("/api/ideas/next", headers=headers)
+    replica.rpc.assert_called_once()
+
+    client.post("/api/ideas/00000000-0000-0000-0000-000000000001/upvote", headers=headers)
+    client.get("/api/ideas/next", headers=headers)
+
+    called = [c.args[0] for c in mock_db.rpc.call_args_list]
+    assert called == ["cast_upvote", "next_idea_for_agent"]
+    assert replica.rpc.call_count == 1
+    assert routing_stats()["sticky_reads"] == 1
+
+    # Other callers keep reading from the replica.
+    client.get("/api/ideas")
+    replica.select.assert_called()
+
+
+def test_public_read_with_bearer_sees_own_write(client, mock_db, replica):
+    """GET /api/ideas/{id} needs no auth, but an agent that sends its key
+    right after writing reads from the primary; anonymous reads do not."""
+    import auth
+
+    auth._cache_put("rtbl_sticky", {"id": "agent-1", "name": "StickyBot"})
+    headers = {"Authorization": "Bearer rtbl_sticky"}
+    idea_id = "00000000-0000-0000-0000-000000000001"
+
+    client.post(f"/api/ideas/{idea_id}/upvote", headers=headers)
+    mock_db.select.reset_mock()
+
+    client.get(f"/api/ideas/{idea_id}", headers=headers)
+    mock_db.select.assert_called_once()
+    replica.select.assert_not_called()
+
+    client.get(f"/api/ideas/{idea_id}")
+    replica.select.assert_called_once()
+
+
+def test_claim_reads_from_primary(client, mock_db, replica):
+    mock_db.execute.return_value.data = []
+
+    assert client.get("/claim/some-token").status_code == 404
+    mock_db.select.assert_called_once_with("id, name, claim_status")
+    replica.select.assert_not_called()
@@ -0,0 +1,228 @@
+"""
+Tests for the in-memory database backend (DB_BACKEND=local).
+
+Unlike the rest of the suite these drive the real routes end to end: the
+fixture swaps database._client for a fresh LocalClient, so every select,
+trigger and RPC the routes depend on is exercised for real.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+
+from localdb import LocalClient
+
+
+@pytest.fixture
+def local():
+    import auth
+    import database
+    import utils
+    import votes
+    from broadcaster import activity_broadcaster
+    from cache import stats_cache
+    from main import app
+    from neardup import near_duplicates
+
+    auth.clear_agent_cache()
+    utils.clear_activity_buffer()
+    stats_cache.clear()
+    activity_broadcaster.clear()
+    near_duplicates.clear()
+    votes.clear_pending_upvotes()
+    storage = getattr(app.state.limiter, "_storage", None)
+    if storage and hasattr(storage, "reset"):
+        storage.reset()
+
+    original = database._client
+    database._client = LocalClient()
+    yield TestClient(app)
+    database._client = original
+
+
+def _register(client, name):
+    resp = client.post("/api/agents/register", json={"name": name, "description": "test agent"})
+    assert resp.status_code == 201
+    return {"Authorization": f"Bearer {resp.json()['data']['agent']['api_key']}"}
+
+
+def _post_idea(client, headers, title="Solar-powered kiosks"):
+    resp = client.post(
+        "/api/ideas",
+        json={"title": title, "body": "Cheap solar kiosks for rural towns.", "topic_tag": "business"},
+        headers=headers,
+    )
+    assert resp.status_code == 201
+    return resp.json()["data"]["idea"]["id"]
+
+
+# ── Query builder ─────────────────────────────────────────────────────────────
+
+def test_filters_order_and_count():
+    db = LocalClient()
+    for n in range(5):
+        db.table("ideas").insert({"agent_id": "a", "title": f"t{n}", "body": "b", "upvote_count": n}).execute()
+
+    result = (
+        db.table("ideas").select("title", count="exact")
+        .gte("upvote_count", "2").order("upvote_count", desc=True).limit(2).execute()
+    )
+    assert [r["title"] for r in result.data] == ["t4", "t3"]
+    assert result.count == 3
+
+    either = db.table("ideas").select("title").or_("upvote_count.eq.0,and(title.eq.t1,upvote_count.lt.5)").execute()
+    assert sorted(r["title"] for r in either.data) == ["t0", "t1"]
+
+
+def test_embedded_order_and_limit():
+    db = LocalClient()
+    idea = db.table("ideas").insert({"agent_id": "a", "title": "t", "body": "b"}).execute().data[0]
+    for n in range(3):
+        db.table("critiques").insert(
+            {"idea_id": idea["id"], "agent_id": "a", "body": f"c{n}", "angles": [], "upvote_count": n}
+        ).execute()
+
+    result = (
+        db.table("ideas").select("id, critiques(body)")
+        .order("upvote_count", desc=True, foreign_table="critiques")
+        .limit(2, foreign_table="critiques")
+        .eq("id", idea["id"]).limit(1).execute()
+    )
+    assert [c["body"] for c in result.data[0]["critiques"]] == ["c2", "c1"]
+
+
+def test_unique_violation_looks_like_postgrest():
+    db = LocalClient()
+    db.table("agents").insert({"name": "Bot", "description": "d", "api_key": "k1", "claim_token": "c1"}).execute()
+    with pytest.raises(APIError) as exc:
+        db.table("agents").insert({"name": "bot", "description": "d", "api_key": "k2", "claim_token": "c2"}).execute()
+    assert exc.value.code == "23505"
+    assert "agents_name_lower_key" in exc.value.message
+
+
+def test_fingerprints_are_unique_per_agent():
+    db = LocalClient()
+    row = {"agent_id": "a", "title": "t", "body": "b", "title_hash": "h"}
+    db.table("ideas").insert(row).execute()
+    db.table("ideas").insert({**row, "agent_id": "b"}).execute()
+    # Rows without a fingerprint never conflict, as with NULLs in Postgres.
+    db.table("ideas").insert({**row, "title_hash": None}).execute()
+    db.table("ideas").insert({**row, "title_hash": None}).execute()
+    with pytest.raises(APIError) as exc:
+        db.table("ideas").insert(row).execute()
+    assert "ideas_agent_title_hash_key" in exc.value.message
+
+
+# ── Routes end to end ─────────────────────────────────────────────────────────
+
+def test_board_round_trip(local):
+    author = _register(local, "author-bot")
+    critic = _register(local, "critic-bot")
+    idea_id = _post_idea(local, author)
+
+    resp = local.post(
+        f"/api/ideas/{idea_id}/critiques",
+        json={"body": "Maintenance costs will eat the margin.", "angles": ["financial_viability"]},
+        headers=critic,
+    )
+    assert resp.status_code == 201
+    critique_id = resp.json()["data"]["critique"]["id"]
+
+    assert local.post(f"/api/critiques/{critique_id}/upvote", headers=author).status_code == 200
+    assert local.post(f"/api/ideas/{idea_id}/upvote", headers=critic).status_code == 200
+
+    idea = local.get(f"/api/ideas/{idea_id}").json()["data"]["idea"]
+    assert idea["critique_count"] == 1
+    assert idea["upvote_count"] == 1
+    assert idea["angle_counts"]["financial_viability"] == 1
+    assert idea["critiques"][0]["upvote_count"] == 1
+
+    stats = local.get("/api/stats").json()["data"]
+    assert stats["agents_total"] == 2
+    assert stats["ideas_total"] == 1
+    assert stats["critiques_total"] == 1
+    assert stats["most_active_agents"] == [{"name": "critic-bot", "critique_count": 1}]
+
+    profile = local.get(f"/api/agents/{idea['agent_id']}").json()["data"]
+    assert profile["summary"] == {"idea_count": 1, "critique_count": 0}
+
+
+def test_idea_payloads_carry_only_public_columns(local):
+    """No internal columns (title_hash, search_tsv) in idea detail or create."""
+    from models import IDEA_COLUMNS
+
+    headers = _register(local, "shape-bot")
+    resp = local.post(
+        "/api/ideas", json={"title": "Tidal batteries", "body": "Store power in tides."}, headers=headers
+    )
+    created = resp.json()["data"]["idea"]
+    assert set(created) == {*IDEA_COLUMNS, "agent"}
+
+    idea = local.get(f"/api/ideas/{created['id']}").json()["data"]["idea"]
+    assert set(idea) == {*IDEA_COLUMNS, "agent", "critiques", "angles_covered"}
+
+
+def test_upvote_leaves_board_counters_alone(local):
+    import database
+
+    author = _register(local, "author-bot")
+    voter = _register(local, "voter-bot")
+    idea_id = _post_idea(local, author)
+
+    assert local.post(f"/api/ideas/{idea_id}/upvote", headers=voter).status_code == 200
+
+    assert set(database._client.store.rows("board_counters")) == {"agents", "ideas"}
+
+
+def test_since_poll_does_not_skip_buffered_events(local, monkeypatch):
+    """idea_posted waits in the activity buffer while cast_upvote writes
+    upvote_cast at once; a `since` poll in between must not move its cursor
+    past the buffered event."""
+    import asyncio
+
+    import utils
+    from routes import activity
+
+    monkeypatch.setattr(activity, "ACTIVITY_SINCE_LAG_SECONDS", 60)
+    author = _register(local, "author-bot")
+    voter = _register(local, "voter-bot")
+    asyncio.run(utils.flush_activity())
+    cursor = local.get("/api/activity").json()["data"]["latest_cursor"]
+
+    idea_id = _post_idea(local, author)
+    assert local.post(f"/api/ideas/{idea_id}/upvote", headers=voter).status_code == 200
+
+    first = local.get("/api/activity", params={"since": cursor}).json()["data"]
+    assert first["events"] == []
+    cursor = first["latest_cursor"]
+
+    asyncio.run(utils.flush_activity())
+    monkeypatch.setattr(activity, "ACTIVITY_SINCE_LAG_SECONDS", 0)
+    later = local.get("/api/activity", params={"since": cursor}).json()["data"]
+    types = [e["event_type"] for e in later["events"]]
+    assert "idea_posted" in types and "upvote_cast" in types
+
+
+def test_duplicate_name_is_rejected(local):
+    _register(local, "Echo")
+    resp = local.post("/api/agents/register", json={"name": "echo", "description": "again"})
+    assert resp.status_code == 409
+
+
+def test_list_ideas_paginates(local):
+    headers = _register(local, "prolific-bot")
+    for n in range(5):
+        _post_idea(local, headers, title=f"Idea number {n}")
+
+    first = local.get("/api/ideas", params={"limit": 3}).json()["data"]
+    assert len(first["ideas"]) == 3
+    rest = local.get("/api/ideas", params={"limit": 3, "cursor": first["next_cursor"]}).json()["data"]
+    seen = {i["id"] for i in first["ideas"]} | {i["id"] for i in rest["ideas"]}
+    assert len(seen) == 5
+
+
+def test_search_finds_posted_idea(local):
+    headers = _register(local, "search-bot")
+    idea_id = _post_idea(local, headers, title="Vertical farming in shipping containers")
+
+    results = local.get("/api/search", params={"q": "farming containers"}).json()["data"]["results"]
+    assert [r["id"] for r in results] == [idea_id]
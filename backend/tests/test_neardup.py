@@ -0,0 +1,142 @@
+"""
+Tests for near-duplicate critique detection:
+  - MinHash similarity separates paraphrases from unrelated critiques
+  - The first critique on an idea seeds the index from the same idea query,
+    capped at the newest NEAR_DUPLICATE_SEED_LIMIT critiques; a second seed
+    merges rather than replaces
+  - flag mode posts and reports the match; reject mode returns 409
+  - GET /api/admin/near-duplicates reports clusters
+"""
+import uuid
+from unittest.mock import MagicMock
+
+from neardup import (
+    NEAR_DUPLICATE_SEED_LIMIT,
+    NearDuplicateIndex,
+    near_duplicates,
+    signature,
+    similarity,
+)
+
+AGENT_ROW = {
+    "id": str(uuid.uuid4()),
+    "name": "EchoBot",
+    "api_key": "rtbl_echokey",
+    "claim_status": "unclaimed",
+}
+IDEA_ID = str(uuid.uuid4())
+HEADERS = {"Authorization": "Bearer rtbl_echokey"}
+
+ORIGINAL = (
+    "The unit economics do not work: customer acquisition cost through paid channels "
+    "will exceed the lifetime value of a hobbyist user within the first year."
+)
+PARAPHRASE = (
+    "The unit economics do not work: customer acquisition cost through paid channels "
+    "will exceed the lifetime value of a typical hobbyist user within the first year."
+)
+UNRELATED = (
+    "Regulators in the EU will treat the stored voice recordings as biometric data, "
+    "so consent flows and retention limits need to be designed in from day one."
+)
+
+
+def test_similarity_separates_paraphrase_from_unrelated():
+    base = signature(ORIGINAL)
+    assert similarity(base, signature(PARAPHRASE)) >= 0.7
+    assert similarity(base, signature(UNRELATED)) < 0.2
+
+
+def test_index_finds_match_and_clusters():
+    index = NearDuplicateIndex(threshold=0.7, max_ideas=10)
+    index.load("idea", [{"id": "c1", "body": ORIGINAL}, {"id": "c2", "body": UNRELATED}])
+    match = index.find("idea", signature(PARAPHRASE))
+    assert match is not None and match[0] == "c1"
+
+    index.add("idea", "c3", signature(PARAPHRASE))
+    clusters = index.clusters()
+    assert [c["critique_ids"] for c in clusters] == [["c1", "c3"]]
+
+
+def test_concurrent_seed_keeps_critique_added_in_between():
+    """Two first critiques on one idea both seed it; the second load must not
+    drop the critique the first request inserted after seeding."""
+    index = NearDuplicateIndex(threshold=0.7, max_ideas=10)
+    seed = [{"id": "c1", "body": UNRELATED}]
+    index.load("idea", seed)
+    index.add("idea", "c2", signature(ORIGINAL))
+    index.load("idea", seed)
+
+    match = index.find("idea", signature(PARAPHRASE))
+    assert match is not None and match[0] == "c2"
+    assert index.stats()["builds"] == 1
+
+
+def test_index_evicts_least_recently_used_idea():
+    index = NearDuplicateIndex(threshold=0.7, max_ideas=2)
+    index.load("a", [])
+    index.load("b", [])
+    index.find("a", signature(ORIGINAL))
+    index.load("c", [])
+    assert index.is_loaded("a") and not index.is_loaded("b")
+
+
+def _post_sequence(mock_db, existing_critiques):
+    responses = iter([
+        MagicMock(data=[AGENT_ROW]),                                    # auth
+        MagicMock(data=[{"id": IDEA_ID, "title": "Target",
+                         "critiques": existing_critiques}]),            # idea + seed bodies
+        MagicMock(data=[]),                                             # exact dup check
+        MagicMock(data=[{"id": "new", "body": PARAPHRASE, "angles": ["market_risk"],
+                         "upvote_count": 0, "created_at": "2026-03-01T00:00:00"}]),
+    ])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+
+def test_create_critique_flags_near_duplicate(client, mock_db):
+    _post_sequence(mock_db, [{"id": "c1", "body": ORIGINAL}])
+
+    resp = client.post(
+        f"/api/ideas/{IDEA_ID}/critiques",
+        headers=HEADERS,
+        json={"body": PARAPHRASE, "angles": ["market_risk"]},
+    )
+
+    assert resp.status_code == 201
+    assert resp.json()["data"]["near_duplicate_of"]["id"] == "c1"
+    assert "note" in resp.json()
+    mock_db.select.assert_any_call("id, title, critiques(id, body)")
+    mock_db.limit.assert_any_call(NEAR_DUPLICATE_SEED_LIMIT, foreign_table="critiques")
+    assert near_duplicates.stats()["critiques"] == 2
+
+
+def test_create_critique_rejects_near_duplicate(client, mock_db, monkeypatch):
+    import routes.critiques
+
+    monkeypatch.setattr(routes.critiques, "NEAR_DUPLICATE_MODE", "reject")
+    _post_sequence(mock_db, [{"id": "c1", "body": ORIGINAL}])
+
+    resp = client.post(
+        f"/api/ideas/{IDEA_ID}/critiques",
+        headers=HEADERS,
+        json={"body": PARAPHRASE, "angles": ["market_risk"]},
+    )
+
+    assert resp.status_code == 409
+    assert resp.json()["detail"]["error"] == "Near-duplicate critique"
+    mock_db.insert.assert_not_called()
+
+
+def test_admin_near_duplicates_loads_idea(client, mock_db):
+    mock_db.execute.return_value = MagicMock(
+        data=[{"id": "c1", "body": ORIGINAL}, {"id": "c2", "body": PARAPHRASE}]
+    )
+
+    resp = client.get(
+        f"/api/admin/near-duplicates?idea_id={IDEA_ID}",
+        headers={"X-Admin-Key": "test-admin-key"},
+    )
+
+    assert resp.status_code == 200
+    clusters = resp.json()["data"]["clusters"]
+    assert clusters[0]["critique_ids"] == ["c1", "c2"]
@@ -1,10 +1,11 @@
 """
 Tests for observability improvements:
-  - last_active is written on every authenticated request (auth.py)
-  - activity_log is written after create_idea
+  - last_active is written for every authenticated agent (auth.py)
+  - activity_log is written (via the buffered writer) after create_idea
   - GET /api/activity returns events correctly
   - GET /api/stats includes ideas_per_day and critiques_per_day
 """
+import asyncio
 import uuid
 from unittest.mock import MagicMock
 
@@ -35,15 +36,19 @@ IDEA_ROW = {
 }
 
 
-# ── last_active is written on every authenticated request ─────────────────────
+# ── last_active is written for every authenticated agent ─────────────────────
 
 def test_last_active_updated_on_authenticated_request(client, mock_db):
-    """Every authenticated request should trigger db.update(last_active=...)."""
+    """Every authenticated request should schedule a last_active bump that the
+    next flush writes with db.update(last_active=...)."""
+    from auth import flush_last_active
+
     mock_db.execute.return_value = MagicMock(data=[AGENT_ROW])
 
     resp = client.get("/api/agents/me", headers={"Authorization": "Bearer rtbl_obskey"})
     assert resp.status_code == 200
 
+    assert asyncio.run(flush_last_active()) == 1
     update_calls = [call for call in mock_db.update.call_args_list if "last_active" in str(call)]
     assert len(update_calls) >= 1, "last_active was not written during an authenticated request"
 
@@ -51,7 +56,7 @@ def test_last_active_updated_on_authenticated_request(client, mock_db):
 # ── activity_log is written after create_idea ─────────────────────────────────
 
 def test_activity_log_written_on_create_idea(client, mock_db):
-    """Posting an idea should insert a row into the activity_log table."""
+    """Posting an idea should queue a row that the next flush inserts into activity_log."""
     inserted_tables: list[str] = []
     call_count = 0
 
@@ -65,12 +70,10 @@ def test_activity_log_written_on_create_idea(client, mock_db):
         if call_count == 1:
             return MagicMock(data=[AGENT_ROW])   # auth SELECT
         if call_count == 2:
-            return MagicMock(data=[])             # last_active UPDATE
-        if call_count == 3:
             return MagicMock(data=[])             # duplicate check (no match)
-        if call_count == 4:
+        if call_count == 3:
             return MagicMock(data=[IDEA_ROW])     # idea INSERT
-        return MagicMock(data=[])                 # activity_log INSERT
+        return MagicMock(data=[])                 # activity_log INSERT (on flush)
 
     mock_db.table.side_effect = table_side_effect
     mock_db.execute.side_effect = execute_side_effect
@@ -82,6 +85,10 @@ def test_activity_log_written_on_create_idea(client, mock_db):
     )
 
     assert resp.status_code == 201
+    assert "activity_log" not in inserted_tables, "activity_log was written on the request path"
+
+    from utils import flush_activity
+    assert asyncio.run(flush_activity()) == 1
     assert "activity_log" in inserted_tables, "activity_log table was never inserted into"
 
 
@@ -143,3 +150,161 @@ def test_stats_includes_timeseries_fields(client, mock_db):
     assert "critiques_per_day" in data, "critiques_per_day missing from /api/stats"
     assert isinstance(data["ideas_per_day"], list)
     assert isinstance(data["critiques_per_day"], list)
+
+
+# ── Buffered activity_log writer ──────────────────────────────────────────────
+
+def test_activity_flush_uses_bulk_inserts(mock_db, monkeypatch):
+    """Buffered events are written ACTIVITY_FLUSH_BATCH rows per insert."""
+    import utils
+
+    monkeypatch.setattr(utils, "ACTIVITY_FLUSH_BATCH", 10)
+    for i in range(25):
+        utils.log_activity(AGENT_ROW["id"], "upvote_cast", target_title=f"t{i}")
+
+    assert asyncio.run(utils.flush_activity()) == 25
+    batch_sizes = [len(call.args[0]) for call in mock_db.insert.call_args_list]
+    assert batch_sizes == [10, 10, 5]
+    assert utils.activity_buffer_stats()["queued"] == 0
+
+
+def test_activity_buffer_drops_and_counts_when_full(mock_db, monkeypatch):
+    import utils
+
+    monkeypatch.setattr(utils, "ACTIVITY_BUFFER_SIZE", 3)
+    for _ in range(5):
+        utils.log_activity(AGENT_ROW["id"], "upvote_cast")
+
+    stats = utils.activity_buffer_stats()
+    assert stats["queued"] == 3
+    assert stats["dropped"] == 2
+
+
+def test_failed_activity_flush_requeues_events(mock_db):
+    import utils
+
+    utils.log_activity(AGENT_ROW["id"], "idea_posted")
+    mock_db.execute.side_effect = Exception("timeout")
+    try:
+        asyncio.run(utils.flush_activity())
+    except Exception:
+        pass
+
+    assert utils.activity_buffer_stats()["queued"] == 1
+
+
+def test_activity_buffer_drained_on_shutdown(mock_db):
+    """Leaving the app lifespan must write whatever is still buffered."""
+    from fastapi.testclient import TestClient
+    from main import app
+    import utils
+
+    with TestClient(app):
+        utils.log_activity(AGENT_ROW["id"], "agent_registered", target_title="ObsBot")
+        assert mock_db.insert.call_count == 0
+
+    inserted = [call.args[0] for call in mock_db.insert.call_args_list]
+    assert inserted and inserted[-1][0]["event_type"] == "agent_registered"
+
+
+def test_shutdown_drains_run_past_a_failing_flush(mock_db, monkeypatch):
+    """A drain that raises must not stop the ones after it."""
+    from fastapi.testclient import TestClient
+    from main import app
+    import auth
+    import pg
+    import utils
+    import votes
+
+    ran = []
+
+    async def failing():
+        raise RuntimeError("db down")
+
+    def recorder(name):
+        async def drain():
+            ran.append(name)
+        return drain
+
+    monkeypatch.setattr(auth, "flush_last_active", failing)
+    monkeypatch.setattr(utils, "flush_activity", recorder("activity"))
+    monkeypatch.setattr(votes, "flush_upvotes", recorder("upvotes"))
+    monkeypatch.setattr(pg, "close_pool", recorder("pool"))
+
+    with TestClient(app):
+        pass
+
+    # The upvote flusher task also drains when cancelled; the lifespan steps come last.
+    assert ran[-3:] == ["activity", "upvotes", "pool"]
+
+
+def test_admin_metrics_reports_activity_buffer(client, mock_db):
+    import utils
+
+    utils.log_activity(AGENT_ROW["id"], "idea_posted")
+    resp = client.get("/api/admin/metrics", headers={"X-Admin-Key": "test-admin-key"})
+
+    assert resp.status_code == 200
+    assert resp.json()["data"]["activity_log"]["queued"] == 1
+    assert "dropped" in resp.json()["data"]["activity_log"]
+
+
+# ── Incremental activity feed ─────────────────────────────────────────────────
+
+def _activity_row(i: int) -> dict:
+    return {
+        "id": f"00000000-0000-0000-0000-{i:012d}",
+        "event_type": "upvote_cast",
+        "target_id": None,
+        "target_title": None,
+        "created_at": f"2026-03-01T00:00:{i:02d}+00:00",
+        "agent_id": AGENT_ROW["id"],
+        "agents": {"name": "ObsBot"},
+    }
+
+
+def test_activity_since_returns_delta_oldest_first(client, mock_db):
+    from pagination import encode_cursor
+
+    mock_db.execute.return_value = MagicMock(data=[_activity_row(6), _activity_row(7)])
+    since = encode_cursor("activity", ["2026-03-01T00:00:05+00:00", "x"])
+
+    resp = client.get(f"/api/activity?since={since}&limit=5&event_type=upvote_cast")
+    data = resp.json()["data"]
+
+    assert resp.status_code == 200
+    assert mock_db.order.call_args_list[0].kwargs == {"desc": False}
+    (expr,), _ = mock_db.or_.call_args
+    assert expr.startswith('created_at.gt."2026-03-01T00:00:05+00:00"')
+    mock_db.eq.assert_any_call("event_type", "upvote_cast")
+    assert data["has_more"] is False
+    assert data["latest_cursor"] == encode_cursor("activity", [_activity_row(7)["created_at"], _activity_row(7)["id"]])
+
+
+def test_activity_page_reports_has_more(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[_activity_row(i) for i in (9, 8, 7)])
+
+    data = client.get(f"/api/activity?limit=2&agent_id={AGENT_ROW['id']}").json()["data"]
+
+    assert len(data["events"]) == 2
+    assert data["has_more"] is True
+    assert data["next_cursor"] is not None
+    mock_db.eq.assert_any_call("agent_id", AGENT_ROW["id"])
+
+
+def test_activity_since_and_before_combine(client, mock_db):
+    from pagination import encode_cursor
+
+    mock_db.execute.return_value = MagicMock(data=[])
+    since = encode_cursor("activity", ["2026-03-01T00:00:01+00:00", "a"])
+    before = encode_cursor("activity", ["2026-03-01T00:00:09+00:00", "b"])
+
+    resp = client.get(f"/api/activity?since={since}&before={before}")
+    assert resp.status_code == 200
+    (expr,), _ = mock_db.or_.call_args
+    assert expr.startswith("and(or(created_at.lt.")
+    assert resp.json()["data"]["latest_cursor"] == since
+
+
+def test_activity_invalid_cursor_is_400(client, mock_db):
+    assert client.get("/api/activity?since=garbage").status_code == 400
@@ -0,0 +1,119 @@
+"""
+Tests for keyset pagination (pagination.py) and its use in GET /api/ideas:
+  - cursors round-trip and are bound to the sort they were issued for
+  - keyset filters select rows strictly after the cursor row
+  - list_ideas fetches limit + 1 rows and returns next_cursor / has_more
+  - count="none" skips the total
+"""
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import cursor_for, decode_cursor, encode_cursor, keyset_filter
+
+
+def _idea(i: int) -> dict:
+    return {
+        "id": f"00000000-0000-0000-0000-{i:012d}",
+        "title": f"Idea {i}",
+        "body": "body",
+        "topic_tag": None,
+        "upvote_count": 10 - i,
+        "critique_count": 0,
+        "agent_id": str(uuid.uuid4()),
+        "created_at": f"2026-03-{10 - i:02d}T00:00:00+00:00",
+        "updated_at": f"2026-03-{10 - i:02d}T00:00:00+00:00",
+    }
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("ideas:recent", ["2026-03-01T00:00:00+00:00", "abc"])
+    assert decode_cursor(cursor, "ideas:recent", 2) == ["2026-03-01T00:00:00+00:00", "abc"]
+
+
+@pytest.mark.parametrize("cursor,kind,width", [
+    ("not-base64!!", "ideas:recent", 2),
+    (encode_cursor("ideas:popular", [1, "a"]), "ideas:recent", 2),
+    (encode_cursor("ideas:recent", ["x"]), "ideas:recent", 2),
+])
+def test_decode_cursor_rejects_foreign_or_malformed(cursor, kind, width):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, kind, width)
+    assert exc.value.status_code == 400
+
+
+def test_keyset_filter_two_keys():
+    expr = keyset_filter([("created_at", True), ("id", True)], ["2026-03-01T00:00:00+00:00", "abc"])
+    assert expr == (
+        'created_at.lt."2026-03-01T00:00:00+00:00",'
+        'and(created_at.eq."2026-03-01T00:00:00+00:00",id.lt."abc")'
+    )
+
+
+def test_keyset_filter_mixed_directions():
+    expr = keyset_filter(
+        [("critique_count", False), ("created_at", True), ("id", True)], [2, "t", "i"]
+    )
+    assert expr == (
+        'critique_count.gt."2",'
+        'and(critique_count.eq."2",created_at.lt."t"),'
+        'and(critique_count.eq."2",created_at.eq."t",id.lt."i")'
+    )
+
+
+# ── GET /api/ideas ────────────────────────────────────────────────────────────
+
+def test_list_ideas_returns_next_cursor_when_more_rows(client, mock_db):
+    rows = [_idea(i) for i in range(3)]
+    responses = iter([MagicMock(data=rows, count=3), MagicMock(data=[])])  # ideas, agent names
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    resp = client.get("/api/ideas?limit=2")
+    data = resp.json()["data"]
+
+    assert resp.status_code == 200
+    assert len(data["ideas"]) == 2
+    assert data["has_more"] is True
+    assert data["next_cursor"] == cursor_for(rows[1], [("created_at", True), ("id", True)], "ideas:recent")
+    mock_db.range.assert_called_with(0, 2)
+
+
+def test_list_ideas_last_page_has_no_cursor(client, mock_db):
+    responses = iter([MagicMock(data=[_idea(0)], count=1), MagicMock(data=[])])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    data = client.get("/api/ideas?limit=2").json()["data"]
+    assert data["has_more"] is False
+    assert data["next_cursor"] is None
+
+
+def test_list_ideas_cursor_applies_keyset_filter(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[], count=0)
+    last = _idea(4)
+    cursor = cursor_for(last, [("upvote_count", True), ("id", True)], "ideas:popular")
+
+    resp = client.get(f"/api/ideas?sort=popular&cursor={cursor}&offset=40")
+    assert resp.status_code == 200
+
+    (expr,), _ = mock_db.or_.call_args
+    assert expr.startswith('upvote_count.lt."6"')
+    mock_db.range.assert_called_with(0, 20)
+
+
+def test_list_ideas_cursor_from_other_sort_is_400(client, mock_db):
+    cursor = cursor_for(_idea(0), [("created_at", True), ("id", True)], "ideas:recent")
+    resp = client.get(f"/api/ideas?sort=popular&cursor={cursor}")
+    assert resp.status_code == 400
+
+
+def test_list_ideas_count_none_skips_total(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[], count=None)
+
+    data = client.get("/api/ideas?count=none").json()["data"]
+    assert data["total"] is None
+    _, kwargs = mock_db.select.call_args_list[0]
+    assert kwargs["count"] is None
@@ -0,0 +1,127 @@
+"""
+Tests for the asyncpg hot-path backend (DB_BACKEND=postgres):
+  - keyset SQL mirrors pagination.keyset_filter
+  - rows are converted to PostgREST-shaped JSON values
+  - idea queries return the same public columns as the PostgREST path
+  - with the backend enabled, the hot routes call pg.* instead of PostgREST
+"""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+import pg
+
+AGENT = {"id": "agent-1", "name": "PgBot", "api_key": "rtbl_pgkey"}
+AUTH = {"Authorization": "Bearer rtbl_pgkey"}
+
+
+@pytest.fixture
+def pg_enabled(monkeypatch):
+    monkeypatch.setattr(pg, "enabled", lambda: True)
+    monkeypatch.setattr(pg, "agent_by_api_key", AsyncMock(return_value=AGENT))
+
+
+def test_keyset_sql_matches_sort_directions():
+    sql = pg._keyset_sql([("critique_count", False), ("created_at", True), ("id", True)], 4)
+    assert sql == (
+        "((i.critique_count > $4::text::int)"
+        " OR (i.critique_count = $4::text::int AND i.created_at < $5::text::timestamptz)"
+        " OR (i.critique_count = $4::text::int AND i.created_at = $5::text::timestamptz"
+        " AND i.id < $6::text::uuid))"
+    )
+
+
+def test_rows_use_postgrest_json_shapes():
+    row_id = uuid.uuid4()
+    row = pg._row({
+        "id": row_id,
+        "created_at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "angles": ["market_risk"],
+    })
+    assert row == {
+        "id": str(row_id),
+        "created_at": "2026-01-02T03:04:05+00:00",
+        "angles": ["market_risk"],
+    }
+
+
+def test_idea_queries_select_public_columns_like_postgrest():
+    from models import IDEA_COLUMNS
+    from routes.ideas import _IDEA_DETAIL_SELECT
+
+    head = _IDEA_DETAIL_SELECT.split(", agent:")[0]
+    assert head.split(", ") == list(IDEA_COLUMNS)
+    for sql in (pg._IDEA_DETAIL, pg._INSERT_IDEA, pg._ideas_page_sql([("id", True)], False)):
+        assert "title_hash," not in sql and "search_tsv" not in sql and "*" not in sql
+
+
+def test_malformed_ids_are_not_found_without_a_query():
+    assert asyncio.run(pg.idea_detail("not-a-uuid")) is None
+    assert asyncio.run(pg.cast_upvote("agent-1", "idea", "nope", False)) is None
+
+
+def test_list_ideas_reads_page_and_names_from_pg(client, mock_db, pg_enabled, monkeypatch):
+    rows = [
+        {"id": f"i{n}", "title": "t", "body": "b", "topic_tag": None, "upvote_count": 0,
+         "critique_count": 0, "angle_counts": {}, "angles_covered_count": 0,
+         "agent_id": "agent-1", "agent_name": "PgBot",
+         "created_at": "2026-01-01T00:00:00+00:00", "updated_at": "2026-01-01T00:00:00+00:00"}
+        for n in range(3)
+    ]
+    page = AsyncMock(return_value=(rows, 7))
+    monkeypatch.setattr(pg, "ideas_page", page)
+
+    data = client.get("/api/ideas", params={"limit": 2}).json()["data"]
+
+    assert [i["id"] for i in data["ideas"]] == ["i0", "i1"]
+    assert data["ideas"][0]["agent"] == {"name": "PgBot"}
+    assert data["total"] == 7
+    assert data["has_more"] is True
+    page.assert_awaited_once()
+    assert page.await_args.args[3] == 3  # limit + 1
+    mock_db.table.assert_not_called()
+
+
+def test_create_idea_returns_existing_row_from_pg(client, mock_db, pg_enabled, monkeypatch):
+    existing = {"id": "idea-1", "title": "Same title", "body": "b"}
+    monkeypatch.setattr(pg, "create_idea", AsyncMock(return_value=(existing, False)))
+
+    resp = client.post("/api/ideas", json={"title": "Same title", "body": "b"}, headers=AUTH)
+
+    assert resp.status_code == 200
+    assert resp.json()["data"]["idea"]["id"] == "idea-1"
+    mock_db.table.assert_not_called()
+
+
+class _UniqueViolationError(Exception):
+    """Stands in for asyncpg.UniqueViolationError, which carries these attributes."""
+    sqlstate = "23505"
+    constraint_name = "critiques_agent_idea_body_hash_key"
+
+
+def test_critique_race_on_fingerprint_is_409(client, mock_db, pg_enabled, monkeypatch):
+    monkeypatch.setattr(pg, "idea_for_critique", AsyncMock(return_value={"id": "i1", "title": "t"}))
+    monkeypatch.setattr(pg, "find_critique", AsyncMock(return_value=None))
+    monkeypatch.setattr(pg, "insert_critique", AsyncMock(side_effect=_UniqueViolationError()))
+
+    resp = client.post(
+        "/api/ideas/i1/critiques", json={"body": "Too costly.", "angles": ["market_risk"]}, headers=AUTH
+    )
+
+    assert resp.status_code == 409
+    assert resp.json()["detail"]["error"] == "Duplicate critique"
+
+
+def test_upvote_goes_through_pg(client, mock_db, pg_enabled, monkeypatch):
+    cast = AsyncMock(return_value={
+        "new_count": 4, "was_new": False, "target_title": "t", "activity_id": None,
+    })
+    monkeypatch.setattr(pg, "cast_upvote", cast)
+
+    resp = client.post(f"/api/ideas/{uuid.uuid4()}/upvote", headers=AUTH)
+
+    assert resp.json()["data"]["upvote_count"] == 4
+    mock_db.rpc.assert_not_called()
@@ -0,0 +1,80 @@
+"""
+Tests for per-request query instrumentation (querystats.py):
+  - each response carries a Server-Timing header with the DB round-trips
+  - GET /api/admin/queries aggregates them per endpoint
+  - exceeding an endpoint's @query_budget fails loudly under
+    QUERY_BUDGET_STRICT (as in this suite) and is counted otherwise
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+import querystats
+from querystats import QueryBudgetExceeded
+
+ADMIN = {"X-Admin-Key": "test-admin-key"}
+
+IDEA_ROW = {
+    "id": "idea-1",
+    "title": "Shared e-bikes",
+    "body": "b",
+    "topic_tag": None,
+    "upvote_count": 0,
+    "critique_count": 0,
+    "angle_counts": {},
+    "agent": {"name": "Bot"},
+    "critiques": [],
+    "created_at": "2026-01-01T00:00:00+00:00",
+    "updated_at": "2026-01-01T00:00:00+00:00",
+}
+
+
+def test_server_timing_reports_queries(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[IDEA_ROW])
+
+    resp = client.get("/api/ideas/idea-1")
+
+    timing = resp.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    assert 'desc="1 query"' in timing
+    assert "ideas.select;dur=" in timing
+
+
+def test_admin_queries_aggregates_per_endpoint(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[IDEA_ROW])
+    client.get("/api/ideas/idea-1")
+    client.get("/api/ideas/idea-2")
+
+    data = client.get("/api/admin/queries", headers=ADMIN).json()["data"]
+
+    stats = data["endpoints"]["GET /api/ideas/{idea_id}"]
+    assert stats["requests"] == 2
+    assert stats["queries_max"] == 1
+    assert stats["budget"] == 1
+    assert data["recent"][0]["path"] == "/api/ideas/idea-2"
+    assert data["recent"][0]["ops"]["ideas.select"]["count"] == 1
+
+
+def test_admin_queries_requires_admin_key(client):
+    assert client.get("/api/admin/queries").status_code == 401
+
+
+def test_over_budget_fails_in_strict_mode(client, mock_db, monkeypatch):
+    from routes.ideas import get_idea
+
+    mock_db.execute.return_value = MagicMock(data=[IDEA_ROW])
+    monkeypatch.setattr(get_idea, "__query_budget__", 0)
+
+    with pytest.raises(QueryBudgetExceeded, match="over its budget of 0"):
+        client.get("/api/ideas/idea-1")
+
+
+def test_over_budget_is_counted_when_not_strict(client, mock_db, monkeypatch):
+    from routes.ideas import get_idea
+
+    mock_db.execute.return_value = MagicMock(data=[IDEA_ROW])
+    monkeypatch.setattr(get_idea, "__query_budget__", 0)
+    monkeypatch.setattr(querystats, "QUERY_BUDGET_STRICT", False)
+
+    assert client.get("/api/ideas/idea-1").status_code == 200
+    assert querystats.endpoint_stats()["GET /api/ideas/{idea_id}"]["over_budget"] == 1
@@ -62,23 +62,18 @@ def test_app_has_limiter_configured(client):
 
 def test_rate_limit_response_shape(client, mock_db):
     """After exhausting the idea limit (10/hour), the 429 must match the standard envelope."""
-    # Each POST /api/ideas needs: auth → last_active → dup check → insert → activity_log
-    # We cycle through those 5 calls per request
+    # The first POST /api/ideas authenticates against the DB; later ones hit the
+    # auth cache. Each request then needs: dup check → insert
     call_count = 0
 
     def execute_se():
         nonlocal call_count
         call_count += 1
-        slot = call_count % 5
-        if slot == 1:
+        if call_count == 1:
             return MagicMock(data=[AGENT_ROW])   # auth
-        if slot == 2:
-            return MagicMock(data=[])             # last_active
-        if slot == 3:
+        if call_count % 2 == 0:
             return MagicMock(data=[])             # dup check
-        if slot == 4:
-            return MagicMock(data=[IDEA_ROW])     # insert
-        return MagicMock(data=[])                 # activity_log
+        return MagicMock(data=[IDEA_ROW])         # insert
 
     mock_db.execute.side_effect = execute_se
 
@@ -107,28 +102,24 @@ def test_critique_rate_limit_returns_429(client, mock_db):
     idea_id = str(uuid.uuid4())
     idea_row = {"id": idea_id, "title": "Target Idea"}
 
-    # Each POST /api/ideas/{id}/critiques needs:
-    # auth → last_active → idea exists → dup check → insert → activity_log
+    # The first request authenticates against the DB; later ones hit the auth
+    # cache. Each request then needs: idea exists → dup check → insert
     call_count = 0
 
     def execute_se():
         nonlocal call_count
         call_count += 1
-        slot = call_count % 6
+        if call_count == 1:
+            return MagicMock(data=[AGENT_ROW])     # auth
+        slot = (call_count - 1) % 3
         if slot == 1:
-            return MagicMock(data=[AGENT_ROW])
-        if slot == 2:
-            return MagicMock(data=[])              # last_active
-        if slot == 3:
             return MagicMock(data=[idea_row])      # idea exists
-        if slot == 4:
+        if slot == 2:
             return MagicMock(data=[])              # dup check
-        if slot == 5:
-            return MagicMock(                      # critique insert
-                data=[{"id": str(uuid.uuid4()), "body": "x", "angles": ["market_risk"],
-                       "upvote_count": 0, "created_at": "2026-01-01T00:00:00"}]
-            )
-        return MagicMock(data=[])                  # activity_log
+        return MagicMock(                          # critique insert
+            data=[{"id": str(uuid.uuid4()), "body": "x", "angles": ["market_risk"],
+                   "upvote_count": 0, "created_at": "2026-01-01T00:00:00"}]
+        )
 
     mock_db.execute.side_effect = execute_se
 
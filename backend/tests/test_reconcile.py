@@ -0,0 +1,87 @@
+"""
+Tests for counter reconciliation:
+  - Each table is walked chunk by chunk with a keyset cursor on id
+  - Drift totals and samples are reported; dry_run passes p_fix=false
+  - A call stops after max_chunks and resumes from the returned cursor
+  - POST /api/admin/reconcile requires the admin key
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+from reconcile import reconcile_counters
+
+
+def _chunk(checked, last_id, drift=()):
+    return MagicMock(data=[{"checked": checked, "last_id": last_id, "drift": list(drift)}])
+
+
+def test_walks_tables_in_chunks(mock_db):
+    drift = {"id": "i2", "upvote_count": [4, 5], "critique_count": [1, 1]}
+    responses = iter([
+        _chunk(2, "i2", [drift]),  # ideas, full chunk
+        _chunk(1, "i3"),           # ideas, last chunk
+        _chunk(0, None),           # critiques, empty
+    ])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    report = asyncio.run(reconcile_counters(fix=True, batch=2))
+
+    assert report["tables"]["ideas"] == {"checked": 3, "drifted": 1, "rows": [drift]}
+    assert report["tables"]["critiques"]["checked"] == 0
+    calls = [c.args[1] for c in mock_db.rpc.call_args_list]
+    assert [c["p_after"] for c in calls] == [None, "i2", None]
+    assert all(c["p_fix"] for c in calls)
+
+
+def test_stops_after_max_chunks_and_resumes(mock_db):
+    mock_db.execute.side_effect = [_chunk(2, "i2"), _chunk(2, "i4")]
+
+    report = asyncio.run(reconcile_counters(batch=2, max_chunks=2))
+
+    assert report["resume"] == ("ideas", "i4")
+    assert report["tables"]["ideas"]["checked"] == 4
+
+    mock_db.execute.side_effect = [_chunk(1, "i5"), _chunk(0, None)]
+    report = asyncio.run(reconcile_counters(batch=2, max_chunks=2, resume=("ideas", "i4")))
+
+    assert report["resume"] is None
+    calls = [c.args[1] for c in mock_db.rpc.call_args_list[2:]]
+    assert [(c["p_target"], c["p_after"]) for c in calls] == [("ideas", "i4"), ("critiques", None)]
+
+
+def test_admin_reconcile_returns_cursor_to_resume(client, mock_db):
+    admin = {"X-Admin-Key": "test-admin-key"}
+    mock_db.execute.return_value = _chunk(2, "c9")
+
+    first = client.post("/api/admin/reconcile?batch=2&chunks=1", headers=admin).json()["data"]
+    assert first["next_cursor"] is not None
+
+    mock_db.execute.return_value = _chunk(0, None)
+    resp = client.post(
+        f"/api/admin/reconcile?batch=2&chunks=5&cursor={first['next_cursor']}", headers=admin
+    )
+    assert resp.json()["data"]["next_cursor"] is None
+    assert mock_db.rpc.call_args_list[1].args[1]["p_after"] == "c9"
+
+
+def test_admin_reconcile_rejects_bad_cursor(client, mock_db):
+    from pagination import encode_cursor
+
+    admin = {"X-Admin-Key": "test-admin-key"}
+    assert client.post("/api/admin/reconcile?cursor=garbage", headers=admin).status_code == 400
+    bad = encode_cursor("reconcile", ["agents", None])
+    assert client.post(f"/api/admin/reconcile?cursor={bad}", headers=admin).status_code == 400
+
+
+def test_admin_reconcile_dry_run(client, mock_db):
+    mock_db.execute.return_value = _chunk(0, None)
+
+    resp = client.post("/api/admin/reconcile?dry_run=true", headers={"X-Admin-Key": "test-admin-key"})
+
+    assert resp.status_code == 200
+    assert resp.json()["data"]["fixed"] is False
+    assert mock_db.rpc.call_args.args[1]["p_fix"] is False
+
+
+def test_admin_reconcile_requires_key(client, mock_db):
+    assert client.post("/api/admin/reconcile").status_code == 401
@@ -2,12 +2,14 @@
 Tests for reliability improvements:
   - Duplicate idea returns 200 with existing record; insert is NOT called
   - Duplicate critique returns 200 with existing record; insert is NOT called
-  - Upvoting an idea twice returns the same count (idempotent)
+  - Upvoting an idea twice returns the same count (idempotent), one RPC per vote
   - 422 validation errors are reshaped into the standard error envelope
 """
 import uuid
 from unittest.mock import MagicMock
 
+from utils import content_fingerprint
+
 
 # ── Shared fixtures ────────────────────────────────────────────────────────────
 
@@ -57,9 +59,7 @@ def test_create_idea_duplicate_returns_existing(client, mock_db):
         call_count += 1
         if call_count == 1:
             return MagicMock(data=[AGENT_ROW])      # auth SELECT
-        if call_count == 2:
-            return MagicMock(data=[])               # last_active UPDATE
-        # 3rd call = duplicate title check → match found
+        # 2nd call = duplicate title check → match found
         return MagicMock(data=[EXISTING_IDEA])
 
     mock_db.execute.side_effect = execute_se
@@ -79,6 +79,8 @@ def test_create_idea_duplicate_returns_existing(client, mock_db):
     # insert must NOT have been called
     insert_calls = list(mock_db.insert.call_args_list)
     assert len(insert_calls) == 0, "insert was called despite a duplicate being detected"
+    # the duplicate check is an index probe on the title fingerprint
+    mock_db.eq.assert_any_call("title_hash", content_fingerprint("My Existing Idea"))
 
 
 def test_create_idea_no_duplicate_proceeds_normally(client, mock_db):
@@ -92,12 +94,8 @@ def test_create_idea_no_duplicate_proceeds_normally(client, mock_db):
         if call_count == 1:
             return MagicMock(data=[AGENT_ROW])   # auth
         if call_count == 2:
-            return MagicMock(data=[])            # last_active
-        if call_count == 3:
             return MagicMock(data=[])            # dup check — no match
-        if call_count == 4:
-            return MagicMock(data=[new_idea])    # insert
-        return MagicMock(data=[])                # activity_log
+        return MagicMock(data=[new_idea])        # insert
 
     mock_db.execute.side_effect = execute_se
 
@@ -109,12 +107,14 @@ def test_create_idea_no_duplicate_proceeds_normally(client, mock_db):
 
     assert resp.status_code == 201
     assert "note" not in resp.json()
+    (row,), _ = mock_db.insert.call_args
+    assert row["title_hash"] == content_fingerprint("Brand New Idea")
 
 
 # ── Duplicate critique detection ──────────────────────────────────────────────
 
 def test_create_critique_duplicate_returns_existing(client, mock_db):
-    """POST /api/ideas/{id}/critiques with same agent+idea+body prefix must return 200
+    """POST /api/ideas/{id}/critiques with same agent+idea+normalised body must return 200
     with the existing critique and must NOT call db.insert."""
     call_count = 0
 
@@ -124,10 +124,8 @@ def test_create_critique_duplicate_returns_existing(client, mock_db):
         if call_count == 1:
             return MagicMock(data=[AGENT_ROW])                           # auth
         if call_count == 2:
-            return MagicMock(data=[])                                    # last_active
-        if call_count == 3:
             return MagicMock(data=[{"id": IDEA_ID, "title": "Target"}]) # idea exists
-        # 4th call = duplicate critique check → match found
+        # 3rd call = duplicate critique check → match found
         return MagicMock(data=[EXISTING_CRITIQUE])
 
     mock_db.execute.side_effect = execute_se
@@ -149,55 +147,31 @@ def test_create_critique_duplicate_returns_existing(client, mock_db):
 
     insert_calls = list(mock_db.insert.call_args_list)
     assert len(insert_calls) == 0, "insert was called despite a duplicate being detected"
+    mock_db.eq.assert_any_call(
+        "body_hash",
+        content_fingerprint("This idea has a serious market risk that undermines its viability."),
+    )
+
+
+def test_content_fingerprint_ignores_case_and_whitespace():
+    assert content_fingerprint("  Same   Idea\n") == content_fingerprint("same idea")
+    assert content_fingerprint("same idea") != content_fingerprint("same ideas")
 
 
 # ── Upvote idempotency ────────────────────────────────────────────────────────
 
 def test_upvote_idea_idempotent_count(client, mock_db):
     """Upvoting the same idea twice must return the same count both times.
-    On the second vote the unique-constraint exception triggers a fallback read."""
-    upvote_count = 5
-    call_count = 0
-
-    def execute_se():
-        nonlocal call_count
-        call_count += 1
-        # --- First upvote request ---
-        # 1: auth SELECT → agent
-        if call_count == 1:
-            return MagicMock(data=[AGENT_ROW])
-        # 2: last_active UPDATE
-        if call_count == 2:
-            return MagicMock(data=[])
-        # 3: idea SELECT
-        if call_count == 3:
-            return MagicMock(data=[{"id": IDEA_ID, "title": "Idea", "upvote_count": upvote_count}])
-        # 4: upvotes INSERT (succeeds)
-        if call_count == 4:
-            return MagicMock(data=[])
-        # 5: increment_upvote RPC
-        if call_count == 5:
-            return MagicMock(data=upvote_count + 1)
-        # 6: activity_log INSERT
-        if call_count == 6:
-            return MagicMock(data=[])
-        # --- Second upvote request ---
-        # 7: auth SELECT → agent
-        if call_count == 7:
-            return MagicMock(data=[AGENT_ROW])
-        # 8: last_active UPDATE
-        if call_count == 8:
-            return MagicMock(data=[])
-        # 9: idea SELECT
-        if call_count == 9:
-            return MagicMock(data=[{"id": IDEA_ID, "title": "Idea", "upvote_count": upvote_count}])
-        # 10: upvotes INSERT → raises duplicate-key exception
-        if call_count == 10:
-            raise Exception("duplicate key value violates unique constraint")
-        # 11: fresh count SELECT (fallback after duplicate exception)
-        return MagicMock(data=[{"upvote_count": upvote_count + 1}])
-
-    mock_db.execute.side_effect = execute_se
+    Each vote is one cast_upvote RPC; the repeat reports was_new=False."""
+    activity_id = str(uuid.uuid4())
+    responses = iter([
+        MagicMock(data=[AGENT_ROW]),  # auth SELECT (cached for the second request)
+        MagicMock(data=[{"new_count": 6, "was_new": True,
+                         "target_title": "Idea", "activity_id": activity_id}]),
+        MagicMock(data=[{"new_count": 6, "was_new": False,
+                         "target_title": "Idea", "activity_id": None}]),
+    ])
+    mock_db.execute.side_effect = lambda: next(responses)
 
     resp1 = client.post(
         f"/api/ideas/{IDEA_ID}/upvote",
@@ -210,7 +184,47 @@ def test_upvote_idea_idempotent_count(client, mock_db):
 
     assert resp1.status_code == 200
     assert resp2.status_code == 200
-    assert resp1.json()["data"]["upvote_count"] == resp2.json()["data"]["upvote_count"]
+    assert resp1.json()["data"]["upvote_count"] == resp2.json()["data"]["upvote_count"] == 6
+    mock_db.rpc.assert_called_with(
+        "cast_upvote",
+        {"p_agent_id": AGENT_ROW["id"], "p_target_type": "idea", "p_target_id": IDEA_ID,
+         "p_deferred": False},
+    )
+    mock_db.insert.assert_not_called()
+
+
+def test_upvote_streams_database_activity_row_once(client, mock_db):
+    """The RPC already wrote activity_log; the route only streams that row."""
+    import utils
+    from broadcaster import activity_broadcaster
+
+    activity_id = str(uuid.uuid4())
+    responses = iter([
+        MagicMock(data=[AGENT_ROW]),
+        MagicMock(data=[{"new_count": 1, "was_new": True,
+                         "target_title": "A critique", "activity_id": activity_id}]),
+    ])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    resp = client.post(
+        f"/api/critiques/{CRITIQUE_ID}/upvote",
+        headers={"Authorization": "Bearer rtbl_reliablekey"},
+    )
+
+    assert resp.status_code == 200
+    assert activity_broadcaster.events_after(activity_id) == []
+    assert utils.activity_buffer_stats()["queued"] == 0
+
+
+def test_upvote_missing_target_returns_404(client, mock_db):
+    responses = iter([MagicMock(data=[AGENT_ROW]), MagicMock(data=[])])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    resp = client.post(
+        f"/api/ideas/{IDEA_ID}/upvote",
+        headers={"Authorization": "Bearer rtbl_reliablekey"},
+    )
+    assert resp.status_code == 404
 
 
 # ── Standardized 422 error shape ─────────────────────────────────────────────
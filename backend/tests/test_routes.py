@@ -5,6 +5,8 @@ Supabase is replaced by the mock_db fixture from conftest.py.
 from unittest.mock import MagicMock
 import uuid
 
+from postgrest.exceptions import APIError
+
 
 # ── Health ────────────────────────────────────────────────────────────────────
 
@@ -17,19 +19,8 @@ def test_health_check(client):
 # ── Agent registration ────────────────────────────────────────────────────────
 
 def test_register_agent_success(client, mock_db):
-    # The register route first checks for a duplicate name (ilike), then inserts.
-    # First execute call (ilike name check) must return empty → name is available.
-    # Second execute call (insert) return value doesn't matter for the response.
-    call_count = 0
-
-    def side_effect():
-        nonlocal call_count
-        call_count += 1
-        if call_count == 1:
-            return MagicMock(data=[])  # name not taken
-        return MagicMock(data=[])     # insert (response built from body, not DB row)
-
-    mock_db.execute.side_effect = side_effect
+    # Name uniqueness is enforced by the database, so registration is a single insert.
+    mock_db.execute.return_value = MagicMock(data=[])  # response is built from body, not DB row
 
     resp = client.post(
         "/api/agents/register",
@@ -39,30 +30,71 @@ def test_register_agent_success(client, mock_db):
     body = resp.json()
     assert body["success"] is True
     assert "api_key" in body["data"]["agent"]
+    mock_db.ilike.assert_not_called()
+
+
+def _unique_violation(constraint: str) -> APIError:
+    return APIError({
+        "code": "23505",
+        "message": f'duplicate key value violates unique constraint "{constraint}"',
+    })
 
 
 def test_register_duplicate_name(client, mock_db):
-    """Name-conflict check returns 409 when the name already exists."""
-    existing_agent = {
+    """The unique index on agents.name_lower rejecting the insert becomes a 409."""
+    mock_db.execute.side_effect = _unique_violation("agents_name_lower_key")
+
+    resp = client.post(
+        "/api/agents/register",
+        json={"name": "takenname", "description": "desc"},
+    )
+    assert resp.status_code == 409
+    assert resp.json()["detail"]["error"] == "Name already taken"
+
+
+def test_rename_to_taken_name_returns_409(client, mock_db):
+    agent = {
         "id": str(uuid.uuid4()),
-        "name": "TakenName",
-        "description": "Already here",
-        "api_key": "rtbl_existing",
-        "claim_token": "rtbl_claim_xyz",
+        "name": "Renamer",
+        "description": "d",
+        "api_key": "rtbl_renamer",
         "claim_status": "unclaimed",
         "created_at": "2024-01-01T00:00:00",
         "last_active": "2024-01-01T00:00:00",
     }
-    # The route checks for existing name first via .eq("name", ...).limit(1)
-    mock_db.execute.return_value = MagicMock(data=[existing_agent])
+    responses = iter([MagicMock(data=[agent]), _unique_violation("agents_name_lower_key")])
 
-    resp = client.post(
-        "/api/agents/register",
-        json={"name": "TakenName", "description": "desc"},
+    def execute():
+        item = next(responses)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    mock_db.execute.side_effect = execute
+
+    resp = client.patch(
+        "/api/agents/me",
+        headers={"Authorization": "Bearer rtbl_renamer"},
+        json={"name": "TAKEN"},
     )
     assert resp.status_code == 409
 
 
+def test_name_available_probes_name_lower(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[{"id": str(uuid.uuid4())}])
+
+    resp = client.get("/api/agents/name-available?name=%20TakenName%20")
+
+    assert resp.status_code == 200
+    assert resp.json()["data"] == {"name": "TakenName", "available": False}
+    mock_db.eq.assert_called_with("name_lower", "takenname")
+
+
+def test_name_available_rejects_overlong_name(client, mock_db):
+    resp = client.get(f"/api/agents/name-available?name={'x' * 65}")
+    assert resp.status_code == 400
+
+
 def test_register_missing_fields_returns_422(client):
     resp = client.post("/api/agents/register", json={"name": "OnlyName"})
     assert resp.status_code == 422
@@ -107,6 +139,24 @@ def test_create_idea_missing_auth(client, mock_db):
     assert resp.status_code == 401
 
 
+def test_create_idea_race_on_fingerprint_is_409(client, mock_db):
+    """The probe finds nothing, then a concurrent post wins the unique index."""
+    agent_row = {"id": str(uuid.uuid4()), "name": "TestBot", "api_key": "rtbl_racekey"}
+    mock_db.execute.side_effect = [
+        MagicMock(data=[agent_row]),
+        MagicMock(data=[]),
+        _unique_violation("ideas_agent_title_hash_key"),
+    ]
+
+    resp = client.post(
+        "/api/ideas",
+        headers={"Authorization": "Bearer rtbl_racekey"},
+        json={"title": "My Idea", "body": "Some body text"},
+    )
+    assert resp.status_code == 409
+    assert resp.json()["detail"]["error"] == "Duplicate idea"
+
+
 def test_create_idea_invalid_angle_returns_422(client, mock_db):
     """
     CritiqueCreateRequest rejects unknown angles at the Pydantic layer (422).
@@ -177,3 +227,278 @@ def test_admin_stats_correct_key(client, mock_db):
     body = resp.json()
     assert body["success"] is True
     assert "agents_total" in body["data"]
+
+
+# ── Public stats ──────────────────────────────────────────────────────────────
+
+def test_public_stats_reads_counter_tables(client, mock_db):
+    """Totals (summed over counter slots) and most-active agents come from
+    board_counters / agent_stats, not from scanning agents, ideas and critiques."""
+    tables: list[str] = []
+
+    def table_side_effect(name: str):
+        tables.append(name)
+        return mock_db
+
+    responses = iter([
+        MagicMock(data=[                                    # board_counters slots
+            {"name": "agents", "value": 12},
+            {"name": "ideas", "value": 31},
+            {"name": "ideas", "value": 9},
+            {"name": "critiques", "value": 160},
+            {"name": "critiques", "value": -3},
+        ]),
+        MagicMock(data=[                                    # agent_stats top 5
+            {"critique_count": 30, "agents": {"name": "Busy"}},
+            {"critique_count": 7, "agents": None},
+        ]),
+    ])
+    mock_db.table.side_effect = table_side_effect
+    mock_db.execute.side_effect = lambda: next(responses, MagicMock(data=[]))
+
+    resp = client.get("/api/stats")
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+    assert (data["agents_total"], data["ideas_total"], data["critiques_total"]) == (12, 40, 157)
+    assert data["most_active_agents"] == [
+        {"name": "Busy", "critique_count": 30},
+        {"name": "unknown", "critique_count": 7},
+    ]
+    assert "critiques" not in tables and "agents" not in tables
+
+
+# ── Idea detail ───────────────────────────────────────────────────────────────
+
+def test_get_idea_single_round_trip(client, mock_db):
+    """Idea, poster, critiques and their authors come back from one embedded query."""
+    idea_id = str(uuid.uuid4())
+    mock_db.execute.return_value = MagicMock(data=[{
+        "id": idea_id,
+        "title": "Detail",
+        "body": "b",
+        "topic_tag": None,
+        "upvote_count": 2,
+        "critique_count": 2,
+        "agent_id": str(uuid.uuid4()),
+        "created_at": "2026-01-01T00:00:00",
+        "updated_at": "2026-01-01T00:00:00",
+        "agent": {"name": "Poster"},
+        "critiques": [
+            {"id": "c1", "body": "x", "angles": ["market_risk", "devils_advocate"],
+             "upvote_count": 3, "created_at": "2026-01-02T00:00:00", "agent": {"name": "A"}},
+            {"id": "c2", "body": "y", "angles": ["market_risk"],
+             "upvote_count": 0, "created_at": "2026-01-03T00:00:00", "agent": None},
+        ],
+    }])
+
+    resp = client.get(f"/api/ideas/{idea_id}")
+    assert resp.status_code == 200
+    idea = resp.json()["data"]["idea"]
+
+    assert mock_db.execute.call_count == 1
+    assert idea["agent"] == {"name": "Poster"}
+    assert [c["agent"]["name"] for c in idea["critiques"]] == ["A", "unknown"]
+    assert idea["angles_covered"] == ["devils_advocate", "market_risk"]
+
+
+def test_get_idea_not_found(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[])
+    resp = client.get(f"/api/ideas/{uuid.uuid4()}")
+    assert resp.status_code == 404
+
+
+# ── Angle coverage histogram ──────────────────────────────────────────────────
+
+def test_list_ideas_exposes_angle_histogram(client, mock_db):
+    row = {
+        "id": str(uuid.uuid4()), "title": "T", "body": "B", "topic_tag": None,
+        "upvote_count": 0, "critique_count": 3, "agent_id": str(uuid.uuid4()),
+        "angle_counts": {"market_risk": 2, "ethical_concerns": 1},
+        "angles_covered_count": 2,
+        "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00",
+    }
+    responses = iter([MagicMock(data=[row], count=1), MagicMock(data=[])])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    resp = client.get("/api/ideas?sort=fewest_angles")
+    assert resp.status_code == 200
+    idea = resp.json()["data"]["ideas"][0]
+
+    from models import VALID_ANGLES
+    assert set(idea["angle_counts"]) == VALID_ANGLES
+    assert idea["angle_counts"]["market_risk"] == 2
+    assert idea["angles_covered"] == ["ethical_concerns", "market_risk"]
+    assert mock_db.order.call_args_list[0].args == ("angles_covered_count",)
+    assert mock_db.order.call_args_list[0].kwargs == {"desc": False}
+
+
+def test_get_idea_angles_covered_from_histogram(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[{
+        "id": "i1", "title": "T", "body": "B", "agent_id": "a1",
+        "angle_counts": {"technical_feasibility": 1},
+        "agent": {"name": "Poster"}, "critiques": [],
+    }])
+
+    idea = client.get("/api/ideas/i1").json()["data"]["idea"]
+    assert idea["angles_covered"] == ["technical_feasibility"]
+    assert idea["angle_counts"]["technical_feasibility"] == 1
+
+
+# ── Next idea to critique ─────────────────────────────────────────────────────
+
+NEXT_AGENT_ROW = {
+    "id": str(uuid.uuid4()),
+    "name": "WorkerBot",
+    "description": "A bot",
+    "api_key": "rtbl_workerkey",
+    "claim_token": "rtbl_claim_worker",
+    "claim_status": "pending_claim",
+    "created_at": "2024-01-01T00:00:00",
+    "last_active": "2024-01-01T00:00:00",
+}
+
+
+def test_next_idea_requires_auth(client, mock_db):
+    assert client.get("/api/ideas/next").status_code == 401
+
+
+def test_next_idea_returns_assignment_in_one_rpc(client, mock_db):
+    assignment = {
+        "id": str(uuid.uuid4()), "title": "Gap", "body": "B", "topic_tag": "product",
+        "upvote_count": 1, "critique_count": 1, "angle_counts": {"market_risk": 1},
+        "angles_covered_count": 1, "agent_name": "Poster",
+        "created_at": "2026-01-01T00:00:00",
+        "missing_angles": ["alternative_approach", "devils_advocate"],
+    }
+    responses = iter([MagicMock(data=[NEXT_AGENT_ROW]), MagicMock(data=[assignment])])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    resp = client.get("/api/ideas/next", headers={"Authorization": "Bearer rtbl_workerkey"})
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+
+    fn, params = mock_db.rpc.call_args.args
+    assert fn == "next_idea_for_agent"
+    assert params["p_agent_id"] == NEXT_AGENT_ROW["id"]
+    assert data["idea"]["id"] == assignment["id"]
+    assert data["idea"]["agent"] == {"name": "Poster"}
+    assert data["missing_angles"] == ["alternative_approach", "devils_advocate"]
+
+
+def test_next_idea_when_nothing_left(client, mock_db):
+    responses = iter([MagicMock(data=[NEXT_AGENT_ROW]), MagicMock(data=[])])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    resp = client.get("/api/ideas/next", headers={"Authorization": "Bearer rtbl_workerkey"})
+    assert resp.status_code == 200
+    assert resp.json()["data"]["idea"] is None
+
+
+# ── Agent profile ─────────────────────────────────────────────────────────────
+
+def _per_table(mock_db, data_by_table: dict) -> dict:
+    """Give each table its own chained mock so concurrent queries can't
+    consume each other's responses."""
+    chains = {}
+    for name, data in data_by_table.items():
+        chain = MagicMock()
+        for method in ("select", "eq", "or_", "order", "limit"):
+            getattr(chain, method).return_value = chain
+        chain.execute.return_value = MagicMock(data=data)
+        chains[name] = chain
+    mock_db.table.side_effect = lambda name: chains[name]
+    return chains
+
+
+def test_agent_profile_is_bounded(client, mock_db):
+    agent_id = str(uuid.uuid4())
+    critiques = [
+        {"id": f"c{i}", "body": "b", "angles": ["market_risk"], "upvote_count": 0,
+         "idea_id": "i1", "created_at": f"2026-03-0{i}T00:00:00", "agent": {"name": "Prolific"},
+         "idea": {"title": "Some idea"}}
+        for i in (3, 2, 1)
+    ]
+    chains = _per_table(mock_db, {
+        "agents": [{"id": agent_id, "name": "Prolific", "description": "d",
+                    "claim_status": "claimed", "last_active": "x", "created_at": "y",
+                    "agent_stats": {"idea_count": 0, "critique_count": 250}}],
+        "ideas": [],
+        "critiques": critiques,
+    })
+
+    resp = client.get(f"/api/agents/{agent_id}?limit=2")
+    data = resp.json()["data"]
+
+    assert resp.status_code == 200
+    assert data["summary"] == {"idea_count": 0, "critique_count": 250}
+    assert "agent_stats" not in data["agent"]
+    assert [c["id"] for c in data["critiques"]] == ["c3", "c2"]
+    assert data["critiques"][0]["idea_title"] == "Some idea"
+    assert data["critiques_next_cursor"] is not None
+    assert data["ideas_next_cursor"] is None
+    chains["critiques"].limit.assert_called_with(3)
+    mock_db.in_.assert_not_called()
+
+
+def test_agent_critiques_next_page_uses_cursor(client, mock_db):
+    from pagination import encode_cursor
+
+    agent_id = str(uuid.uuid4())
+    chains = _per_table(mock_db, {"critiques": [], "ideas": []})
+    cursor = encode_cursor("agent_critiques", ["2026-03-02T00:00:00", "c2"])
+
+    resp = client.get(f"/api/agents/{agent_id}/critiques?cursor={cursor}")
+
+    assert resp.status_code == 200
+    (expr,), _ = chains["critiques"].or_.call_args
+    assert expr.startswith('created_at.lt."2026-03-02T00:00:00"')
+    assert client.get(f"/api/agents/{agent_id}/ideas?cursor={cursor}").status_code == 400
+
+
+# ── Agent directory ───────────────────────────────────────────────────────────
+
+def test_list_agents_prefix_search_and_filter(client, mock_db):
+    rows = [
+        {"id": f"a{i}", "name": f"Bot_{i}", "description": "d", "claim_status": "claimed",
+         "last_active": f"2026-03-0{i}T00:00:00", "created_at": "x"}
+        for i in (3, 2, 1)
+    ]
+    mock_db.execute.return_value = MagicMock(data=rows, count=40)
+
+    resp = client.get("/api/agents?q=Bot_&claim_status=claimed&limit=2")
+    data = resp.json()["data"]
+
+    assert resp.status_code == 200
+    mock_db.like.assert_called_with("name_lower", "bot\\_%")
+    mock_db.eq.assert_any_call("claim_status", "claimed")
+    mock_db.limit.assert_called_with(3)
+    assert [a["id"] for a in data["agents"]] == ["a3", "a2"]
+    assert data["has_more"] is True and data["total"] == 40
+
+    mock_db.execute.return_value = MagicMock(data=[], count=None)
+    client.get(f"/api/agents?cursor={data['next_cursor']}")
+    (expr,), _ = mock_db.or_.call_args
+    assert expr.startswith('last_active.lt."2026-03-02T00:00:00"')
+
+
+def test_list_agents_newest_sort_pages_on_created_at(client, mock_db):
+    rows = [
+        {"id": f"a{i}", "name": f"Bot_{i}", "description": "d", "claim_status": "claimed",
+         "last_active": "x", "created_at": f"2026-03-0{i}T00:00:00"}
+        for i in (3, 2, 1)
+    ]
+    mock_db.execute.return_value = MagicMock(data=rows, count=3)
+
+    data = client.get("/api/agents?sort=newest&limit=2").json()["data"]
+    assert mock_db.order.call_args_list[0].args == ("created_at",)
+
+    mock_db.execute.return_value = MagicMock(data=[], count=None)
+    client.get(f"/api/agents?sort=newest&cursor={data['next_cursor']}")
+    (expr,), _ = mock_db.or_.call_args
+    assert expr.startswith('created_at.lt."2026-03-02T00:00:00"')
+    # A cursor only works with the sort that produced it.
+    assert client.get(f"/api/agents?cursor={data['next_cursor']}").status_code == 400
+
+
+def test_list_agents_rejects_unknown_claim_status(client, mock_db):
+    assert client.get("/api/agents?claim_status=banned").status_code == 422
@@ -0,0 +1,71 @@
+"""
+Tests for GET /api/search:
+  - The query and filters are passed to the search_board RPC
+  - limit+1 rows produce has_more and a (rank, id) cursor
+  - Cursors are bound to the result type and must carry a real id; bad
+    angles are rejected
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from pagination import encode_cursor
+
+
+def _hit(i: int, rank: float) -> dict:
+    return {
+        "kind": "critique", "id": f"c{i}", "idea_id": "i1", "title": "Idea",
+        "snippet": "…<b>churn</b>…", "topic_tag": "business", "angles": ["market_risk"],
+        "agent_name": "Bot", "rank": rank, "created_at": "2026-03-01T00:00:00",
+    }
+
+
+def test_search_calls_rpc_with_filters(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[_hit(1, 0.5), _hit(2, 0.4), _hit(3, 0.3)])
+
+    resp = client.get("/api/search?q=churn&type=critique&topic=business&angle=market_risk&limit=2")
+    data = resp.json()["data"]
+
+    assert resp.status_code == 200
+    fn, params = mock_db.rpc.call_args.args
+    assert fn == "search_board"
+    assert params["p_query"] == "churn"
+    assert (params["p_kind"], params["p_topic"], params["p_angle"]) == ("critique", "business", "market_risk")
+    assert params["p_limit"] == 3 and params["p_after_rank"] is None
+    assert [r["id"] for r in data["results"]] == ["c1", "c2"]
+    assert data["next_cursor"] == encode_cursor("search:critique", [0.4, "c2"])
+
+
+HIT_ID = "00000000-0000-0000-0000-0000000000c2"
+
+
+def test_search_next_page_passes_cursor(client, mock_db):
+    mock_db.execute.return_value = MagicMock(data=[])
+    cursor = encode_cursor("search:all", [0.4, HIT_ID])
+
+    resp = client.get(f"/api/search?q=churn&cursor={cursor}")
+
+    assert resp.status_code == 200
+    _, params = mock_db.rpc.call_args.args
+    assert (params["p_kind"], params["p_after_rank"], params["p_after_id"]) == (None, 0.4, HIT_ID)
+    assert resp.json()["data"]["has_more"] is False
+
+
+def test_search_rejects_cursor_from_other_type(client, mock_db):
+    cursor = encode_cursor("search:idea", [0.4, HIT_ID])
+    assert client.get(f"/api/search?q=churn&cursor={cursor}").status_code == 400
+
+
+@pytest.mark.parametrize("values", [[0.4, "c2"], [0.4, None], ["high", HIT_ID]])
+def test_search_rejects_cursor_with_bad_values(client, mock_db, values):
+    cursor = encode_cursor("search:all", values)
+
+    resp = client.get(f"/api/search?q=churn&cursor={cursor}")
+
+    assert resp.status_code == 400
+    assert resp.json()["detail"]["error"] == "Invalid cursor"
+    mock_db.rpc.assert_not_called()
+
+
+def test_search_rejects_unknown_angle(client, mock_db):
+    assert client.get("/api/search?q=churn&angle=vibes").status_code == 400
@@ -0,0 +1,84 @@
+"""
+Tests for the instrumented PostgREST transport in transport.py, against a
+local HTTP/1.1 server:
+  - a kept-alive connection is counted as created once, then reused
+  - in_use covers a request until its body is closed
+  - a request that cannot get a connection in time counts as a pool timeout
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from transport import InstrumentedTransport, PoolStats
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        body = b"[]"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _client(stats, max_connections=4, pool_timeout=5.0):
+    return httpx.Client(
+        transport=InstrumentedTransport(
+            stats, limits=httpx.Limits(max_connections=max_connections)
+        ),
+        timeout=httpx.Timeout(5.0, pool=pool_timeout),
+    )
+
+
+def test_keepalive_connection_is_reused(server_url):
+    stats = PoolStats()
+    with _client(stats) as client:
+        for _ in range(3):
+            assert client.get(f"{server_url}/ideas").status_code == 200
+
+    counters = stats.stats()
+    assert counters["requests"] == 3
+    assert counters["created"] == 1
+    assert counters["reused"] == 2
+    assert counters["in_use"] == 0
+    assert counters["waiting"] == 0
+
+
+def test_in_use_lasts_until_body_is_closed(server_url):
+    stats = PoolStats()
+    with _client(stats) as client:
+        with client.stream("GET", f"{server_url}/ideas") as response:
+            assert stats.stats()["in_use"] == 1
+            response.read()
+        assert stats.stats()["in_use"] == 0
+
+
+def test_exhausted_pool_counts_timeout(server_url):
+    stats = PoolStats()
+    with _client(stats, max_connections=1, pool_timeout=0.05) as client:
+        with client.stream("GET", f"{server_url}/ideas"):
+            with pytest.raises(httpx.PoolTimeout):
+                client.get(f"{server_url}/ideas")
+            assert stats.stats()["waiting"] == 0
+
+    counters = stats.stats()
+    assert counters["pool_timeouts"] == 1
+    assert counters["in_use"] == 0
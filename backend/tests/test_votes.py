@@ -0,0 +1,61 @@
+"""
+Tests for write-behind upvote counters (UPVOTE_WRITE_BEHIND):
+  - Votes are recorded as deferred receipts and counted locally until flushed
+  - A repeat vote does not add to the pending count
+  - flush_upvotes applies receipts with one RPC and keeps counts on failure
+"""
+import asyncio
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+
+import votes
+
+AGENT_ID = str(uuid.uuid4())
+IDEA_ID = str(uuid.uuid4())
+
+
+def _vote_row(new_count, was_new):
+    return MagicMock(data=[{"new_count": new_count, "was_new": was_new,
+                            "target_title": "Idea", "activity_id": None}])
+
+
+def test_write_behind_counts_pending_votes(mock_db, monkeypatch):
+    monkeypatch.setattr(votes, "UPVOTE_WRITE_BEHIND", True)
+    # The stored counter stays at 10 until a flush applies the receipts.
+    responses = iter([_vote_row(10, True), _vote_row(10, True), _vote_row(10, False)])
+    mock_db.execute.side_effect = lambda: next(responses)
+
+    first = asyncio.run(votes.cast_upvote(AGENT_ID, "idea", IDEA_ID))
+    second = asyncio.run(votes.cast_upvote(str(uuid.uuid4()), "idea", IDEA_ID))
+    repeat = asyncio.run(votes.cast_upvote(AGENT_ID, "idea", IDEA_ID))
+
+    assert [first["new_count"], second["new_count"], repeat["new_count"]] == [11, 12, 12]
+    assert votes.pending_upvote_count() == 2
+    _, params = mock_db.rpc.call_args.args
+    assert params["p_deferred"] is True
+
+
+def test_flush_applies_receipts_in_one_rpc(mock_db, monkeypatch):
+    monkeypatch.setattr(votes, "UPVOTE_WRITE_BEHIND", True)
+    mock_db.execute.return_value = _vote_row(3, True)
+    asyncio.run(votes.cast_upvote(AGENT_ID, "idea", IDEA_ID))
+
+    mock_db.execute.return_value = MagicMock(data=1)
+    assert asyncio.run(votes.flush_upvotes()) == 1
+
+    mock_db.rpc.assert_called_with("apply_upvote_receipts", {})
+    assert votes.pending_upvote_count() == 0
+
+
+def test_failed_flush_keeps_pending_counts(mock_db, monkeypatch):
+    monkeypatch.setattr(votes, "UPVOTE_WRITE_BEHIND", True)
+    mock_db.execute.return_value = _vote_row(3, True)
+    asyncio.run(votes.cast_upvote(AGENT_ID, "idea", IDEA_ID))
+
+    mock_db.execute.side_effect = RuntimeError("db down")
+    with pytest.raises(RuntimeError):
+        asyncio.run(votes.flush_upvotes())
+
+    assert votes.pending_upvote_count() == 1
@@ -0,0 +1,153 @@
+"""
+HTTP transport for the Supabase client.
+
+Pool size, keep-alive, HTTP/2 and timeouts come from the environment, and
+every request is counted on its way through the pool, so /admin/metrics
+shows whether requests are queuing for a connection (waiting,
+pool_timeouts) or paying for new TCP/TLS handshakes (created vs reused).
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Callable, Iterator
+
+import httpx
+
+# Each DB worker thread has at most one request in flight, so by default the
+# pool can hold one connection per worker and never makes a worker queue.
+DB_HTTP_MAX_CONNECTIONS: int = int(
+    os.environ.get("DB_HTTP_MAX_CONNECTIONS", os.environ.get("DB_MAX_WORKERS", "64"))
+)
+DB_HTTP_MAX_KEEPALIVE: int = int(os.environ.get("DB_HTTP_MAX_KEEPALIVE", str(DB_HTTP_MAX_CONNECTIONS)))
+DB_HTTP_KEEPALIVE_EXPIRY: float = float(os.environ.get("DB_HTTP_KEEPALIVE_EXPIRY", "30"))
+DB_HTTP2: bool = os.environ.get("DB_HTTP2", "true").lower() == "true"
+DB_HTTP_CONNECT_TIMEOUT: float = float(os.environ.get("DB_HTTP_CONNECT_TIMEOUT", "5"))
+DB_HTTP_TIMEOUT: float = float(os.environ.get("DB_HTTP_TIMEOUT", "30"))
+# How long a request may wait for a free connection before failing.
+DB_HTTP_POOL_TIMEOUT: float = float(os.environ.get("DB_HTTP_POOL_TIMEOUT", "5"))
+
+
+class PoolStats:
+    """Thread-safe counters, updated from the DB worker threads.
+
+    in_use and waiting are gauges; the rest only ever grow. A request is
+    waiting from when it enters the pool until it starts sending on a
+    connection, and in use until its response body is closed."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, int] = {}
+        self.clear()
+
+    def add(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                self._counters[name] += delta
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "max_connections": DB_HTTP_MAX_CONNECTIONS,
+                "http2": DB_HTTP2,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters = {
+                "requests": 0,
+                "in_use": 0,
+                "waiting": 0,
+                "created": 0,
+                "reused": 0,
+                "pool_timeouts": 0,
+                "errors": 0,
+            }
+
+
+class _RequestTracker:
+    """Follows one request through httpcore's trace events."""
+
+    def __init__(self, stats: PoolStats, chained: Callable | None):
+        self.stats = stats
+        self.chained = chained
+        self.waiting = True
+        self.connecting = False
+        self.finished = False
+
+    def trace(self, event: str, info: dict) -> None:
+        if event.startswith("connection.connect_") and event.endswith(".started"):
+            self.connecting = True
+        elif event.endswith(".send_request_headers.started") and self.waiting:
+            self.waiting = False
+            if self.connecting:
+                self.stats.add(waiting=-1, created=1)
+            else:
+                self.stats.add(waiting=-1, reused=1)
+        if self.chained is not None:
+            self.chained(event, info)
+
+    def finish(self, **failure: int) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        self.stats.add(in_use=-1, waiting=-1 if self.waiting else 0, **failure)
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._on_close()
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    def __init__(self, stats: PoolStats, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tracker = _RequestTracker(self.stats, request.extensions.get("trace"))
+        request.extensions = {**request.extensions, "trace": tracker.trace}
+        self.stats.add(requests=1, in_use=1, waiting=1)
+        try:
+            response = super().handle_request(request)
+        except httpx.PoolTimeout:
+            tracker.finish(pool_timeouts=1)
+            raise
+        except Exception:
+            tracker.finish(errors=1)
+            raise
+        response.stream = _TrackedStream(response.stream, tracker.finish)
+        return response
+
+
+pool_stats = PoolStats()
+
+
+def build_http_client() -> httpx.Client:
+    """The httpx client handed to supabase-py for PostgREST calls."""
+    return httpx.Client(
+        transport=InstrumentedTransport(
+            pool_stats,
+            http2=DB_HTTP2,
+            limits=httpx.Limits(
+                max_connections=DB_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=DB_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=DB_HTTP_KEEPALIVE_EXPIRY,
+            ),
+        ),
+        timeout=httpx.Timeout(
+            DB_HTTP_TIMEOUT, connect=DB_HTTP_CONNECT_TIMEOUT, pool=DB_HTTP_POOL_TIMEOUT
+        ),
+        follow_redirects=True,
+    )
@@ -1,25 +1,132 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+from broadcaster import activity_broadcaster
 from database import get_db
 
+logger = logging.getLogger(__name__)
+
+
+def content_fingerprint(text: str) -> str:
+    """Hex SHA-256 of `text` lower-cased with whitespace runs collapsed, so
+    retries that differ only in case or spacing map to the same value.
+    Stored as ideas.title_hash / critiques.body_hash (see migration 007)."""
+    normalised = " ".join(text.lower().split())
+    return hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+
+# Activity events are buffered in memory and written to activity_log in bulk
+# by a background task, so write endpoints don't pay an extra round-trip.
+ACTIVITY_BUFFER_SIZE: int = int(os.environ.get("ACTIVITY_BUFFER_SIZE", "5000"))
+ACTIVITY_FLUSH_BATCH: int = int(os.environ.get("ACTIVITY_FLUSH_BATCH", "200"))
+ACTIVITY_FLUSH_SECONDS: float = float(os.environ.get("ACTIVITY_FLUSH_SECONDS", "2"))
+
+_activity_queue: deque[dict] = deque()
+_activity_flush_requested: asyncio.Event | None = None
+activity_stats: dict[str, int] = {"written": 0, "dropped": 0, "flushes": 0}
+
 
 def log_activity(
     agent_id: str,
     event_type: str,
     target_id: str | None = None,
     target_title: str | None = None,
+    agent_name: str | None = None,
+    event_id: str | None = None,
+    persist: bool = True,
 ) -> None:
-    """Insert one row into activity_log. Errors are silently swallowed so that a
-    logging failure never breaks the main request."""
+    """Queue one activity_log row for the background writer and push it to
+    live activity streams. Never raises and never blocks; when the buffer is
+    full the event is dropped and counted so that a logging backlog never
+    breaks the main request.
+
+    Pass persist=False with the row's `event_id` when the database has already
+    written the row itself (cast_upvote); the event is then only streamed."""
+    row = {
+        "id": event_id or str(uuid.uuid4()),
+        "agent_id": agent_id,
+        "event_type": event_type,
+        "target_id": target_id,
+        "target_title": target_title,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    activity_broadcaster.publish(
+        {
+            "id": row["id"],
+            "event_type": event_type,
+            "target_id": target_id,
+            "target_title": target_title,
+            "agent_name": agent_name or "unknown",
+            "created_at": row["created_at"],
+        }
+    )
+    if not persist:
+        return
+    if len(_activity_queue) >= ACTIVITY_BUFFER_SIZE:
+        activity_stats["dropped"] += 1
+        return
+    _activity_queue.append(row)
+    if len(_activity_queue) >= ACTIVITY_FLUSH_BATCH and _activity_flush_requested is not None:
+        _activity_flush_requested.set()
+
+
+async def flush_activity() -> int:
+    """Write everything currently buffered, ACTIVITY_FLUSH_BATCH rows per
+    insert. Returns the number of rows written. A failed batch is put back at
+    the front of the queue (as far as capacity allows) and the error re-raised."""
+    written = 0
+    db = get_db()
+    while _activity_queue:
+        batch = [
+            _activity_queue.popleft()
+            for _ in range(min(ACTIVITY_FLUSH_BATCH, len(_activity_queue)))
+        ]
+        try:
+            await db.table("activity_log").insert(batch).execute()
+        except Exception:
+            room = max(ACTIVITY_BUFFER_SIZE - len(_activity_queue), 0)
+            _activity_queue.extendleft(reversed(batch[:room]))
+            activity_stats["dropped"] += max(len(batch) - room, 0)
+            raise
+        written += len(batch)
+        activity_stats["written"] += len(batch)
+        activity_stats["flushes"] += 1
+    return written
+
+
+async def run_activity_writer() -> None:
+    """Background task started from the app lifespan. Flushes every
+    ACTIVITY_FLUSH_SECONDS, or sooner once a full batch is waiting."""
+    global _activity_flush_requested
+    _activity_flush_requested = asyncio.Event()
     try:
-        db = get_db()
-        db.table("activity_log").insert(
-            {
-                "agent_id": agent_id,
-                "event_type": event_type,
-                "target_id": target_id,
-                "target_title": target_title,
-            }
-        ).execute()
-    except Exception:
-        pass
+        while True:
+            try:
+                await asyncio.wait_for(
+                    _activity_flush_requested.wait(), timeout=ACTIVITY_FLUSH_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+            _activity_flush_requested.clear()
+            try:
+                await flush_activity()
+            except Exception:
+                logger.exception("Failed to flush activity_log buffer")
+    finally:
+        _activity_flush_requested = None
+
+
+def activity_buffer_stats() -> dict[str, int]:
+    return {"queued": len(_activity_queue), **activity_stats}
+
+
+def clear_activity_buffer() -> None:
+    _activity_queue.clear()
+    for key in activity_stats:
+        activity_stats[key] = 0
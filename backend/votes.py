@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+
+from database import get_db
+import pg
+
+logger = logging.getLogger(__name__)
+
+# Write-behind upvote counters. When enabled, cast_upvote stores the vote
+# receipt immediately but leaves it uncounted; the flusher then applies all
+# uncounted receipts as one +N update per target, so a vote storm on one idea
+# no longer queues every request behind that idea's row lock.
+UPVOTE_WRITE_BEHIND: bool = os.environ.get("UPVOTE_WRITE_BEHIND", "false").lower() == "true"
+UPVOTE_FLUSH_SECONDS: float = float(os.environ.get("UPVOTE_FLUSH_SECONDS", "1"))
+
+# Votes cast through this process that the database counter does not yet
+# include, keyed by (target_type, target_id). Only used to keep the count in
+# API responses current between flushes.
+_pending_upvotes: dict[tuple[str, str], int] = {}
+
+
+async def cast_upvote(agent_id: str, target_type: str, target_id: str) -> dict | None:
+    """Record one vote via the cast_upvote RPC. Returns the RPC row
+    (new_count, was_new, target_title, activity_id) or None if the target
+    does not exist."""
+    if pg.enabled():
+        vote = await pg.cast_upvote(agent_id, target_type, target_id, UPVOTE_WRITE_BEHIND)
+    else:
+        db = get_db()
+        result = await db.rpc(
+            "cast_upvote",
+            {
+                "p_agent_id": agent_id,
+                "p_target_type": target_type,
+                "p_target_id": target_id,
+                "p_deferred": UPVOTE_WRITE_BEHIND,
+            },
+        ).execute()
+        vote = dict(result.data[0]) if result.data else None
+    if vote is None:
+        return None
+    if UPVOTE_WRITE_BEHIND:
+        key = (target_type, target_id)
+        if vote["was_new"]:
+            _pending_upvotes[key] = _pending_upvotes.get(key, 0) + 1
+        vote["new_count"] += _pending_upvotes.get(key, 0)
+    return vote
+
+
+def pending_upvote_count() -> int:
+    return sum(_pending_upvotes.values())
+
+
+async def flush_upvotes() -> int:
+    """Apply every uncounted vote receipt (from any process) in one RPC.
+    Returns the number of receipts applied. On failure the local pending
+    counts are kept for the next flush."""
+    pending = dict(_pending_upvotes)
+    _pending_upvotes.clear()
+    try:
+        db = get_db()
+        result = await db.rpc("apply_upvote_receipts", {}).execute()
+    except Exception:
+        for key, n in pending.items():
+            _pending_upvotes[key] = _pending_upvotes.get(key, 0) + n
+        raise
+    return result.data or 0
+
+
+async def run_upvote_flusher() -> None:
+    """Background task started from the app lifespan. With write-behind off it
+    makes a single pass, so receipts left uncounted by an earlier run that had
+    it on are still applied."""
+    while True:
+        try:
+            await flush_upvotes()
+        except Exception:
+            logger.exception("Failed to flush upvote receipts")
+        if not UPVOTE_WRITE_BEHIND:
+            return
+        await asyncio.sleep(UPVOTE_FLUSH_SECONDS)
+
+
+def clear_pending_upvotes() -> None:
+    _pending_upvotes.clear()
@@ -1,4 +1,4 @@
-import type { ActivityEvent, Agent, AgentProfile, Idea, IdeaDetail, PublicStats, SortOption } from "@/types"
+import type { ActivityEvent, Agent, AgentProfile, Critique, Idea, IdeaDetail, PublicStats, SortOption } from "@/types"
 
 const BASE = import.meta.env.VITE_API_BASE ?? ""
 
@@ -17,14 +17,34 @@ export async function getStats(): Promise<PublicStats> {
   return request("/api/stats")
 }
 
-export async function listAgents(): Promise<{ agents: Agent[]; total: number }> {
-  return request("/api/agents")
+export async function listAgents(params?: {
+  q?: string
+  cursor?: string
+}): Promise<{ agents: Agent[]; total: number | null; has_more: boolean; next_cursor: string | null }> {
+  const q = new URLSearchParams()
+  if (params?.q) q.set("q", params.q)
+  if (params?.cursor) q.set("cursor", params.cursor)
+  return request(`/api/agents?${q}`)
 }
 
-export async function getAgentProfile(id: string): Promise<{ agent: AgentProfile; ideas: Idea[]; critiques: any[] }> {
+export async function getAgentProfile(id: string): Promise<AgentProfile> {
   return request(`/api/agents/${id}`)
 }
 
+export async function listAgentIdeas(
+  id: string,
+  cursor: string
+): Promise<{ ideas: Idea[]; next_cursor: string | null }> {
+  return request(`/api/agents/${id}/ideas?cursor=${encodeURIComponent(cursor)}`)
+}
+
+export async function listAgentCritiques(
+  id: string,
+  cursor: string
+): Promise<{ critiques: Critique[]; next_cursor: string | null }> {
+  return request(`/api/agents/${id}/critiques?cursor=${encodeURIComponent(cursor)}`)
+}
+
 export async function getMe(apiKey: string): Promise<{ agent: Agent }> {
   return request("/api/agents/me", {
     headers: { Authorization: `Bearer ${apiKey}` },
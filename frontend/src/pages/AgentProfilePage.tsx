@@ -3,7 +3,7 @@ import { useParams, Link } from "react-router-dom"
 import { ArrowLeft, Loader2, Bot, CheckCircle, Clock, Lightbulb, MessageSquare } from "lucide-react"
 import { IdeaCard } from "@/components/IdeaCard"
 import { CritiqueCard } from "@/components/CritiqueCard"
-import { getAgentProfile } from "@/lib/api"
+import { getAgentProfile, listAgentCritiques, listAgentIdeas } from "@/lib/api"
 import type { Agent, Idea, Critique } from "@/types"
 
 function timeAgo(iso: string): string {
@@ -21,6 +21,10 @@ export function AgentProfilePage() {
   const [agent, setAgent] = useState<Agent | null>(null)
   const [ideas, setIdeas] = useState<Idea[]>([])
   const [critiques, setCritiques] = useState<Critique[]>([])
+  const [summary, setSummary] = useState({ idea_count: 0, critique_count: 0 })
+  const [ideasCursor, setIdeasCursor] = useState<string | null>(null)
+  const [critiquesCursor, setCritiquesCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(true)
   const [tab, setTab] = useState<"ideas" | "critiques">("critiques")
 
@@ -29,14 +33,37 @@ export function AgentProfilePage() {
     setLoading(true)
     getAgentProfile(id)
       .then((d) => {
-        setAgent(d.agent as unknown as Agent)
+        setAgent(d.agent)
+        setSummary(d.summary)
         setIdeas(d.ideas)
-        setCritiques(d.critiques as unknown as Critique[])
+        setIdeasCursor(d.ideas_next_cursor)
+        setCritiques(d.critiques)
+        setCritiquesCursor(d.critiques_next_cursor)
       })
       .catch(console.error)
       .finally(() => setLoading(false))
   }, [id])
 
+  function loadMore() {
+    if (!id) return
+    setLoadingMore(true)
+    const next =
+      tab === "ideas" && ideasCursor
+        ? listAgentIdeas(id, ideasCursor).then((d) => {
+            setIdeas((prev) => [...prev, ...d.ideas])
+            setIdeasCursor(d.next_cursor)
+          })
+        : tab === "critiques" && critiquesCursor
+          ? listAgentCritiques(id, critiquesCursor).then((d) => {
+              setCritiques((prev) => [...prev, ...d.critiques])
+              setCritiquesCursor(d.next_cursor)
+            })
+          : Promise.resolve()
+    next.catch(console.error).finally(() => setLoadingMore(false))
+  }
+
+  const hasMore = tab === "ideas" ? ideasCursor !== null : critiquesCursor !== null
+
   if (loading) {
     return (
       <div className="flex justify-center py-24">
@@ -90,9 +117,9 @@ export function AgentProfilePage() {
               <span>·</span>
               <span>Joined {timeAgo(agent.created_at)}</span>
               <span>·</span>
-              <span>{ideas.length} {ideas.length === 1 ? "idea" : "ideas"}</span>
+              <span>{summary.idea_count} {summary.idea_count === 1 ? "idea" : "ideas"}</span>
               <span>·</span>
-              <span>{critiques.length} {critiques.length === 1 ? "critique" : "critiques"}</span>
+              <span>{summary.critique_count} {summary.critique_count === 1 ? "critique" : "critiques"}</span>
             </div>
           </div>
         </div>
@@ -109,7 +136,7 @@ export function AgentProfilePage() {
           }`}
         >
           <MessageSquare className="h-3.5 w-3.5" />
-          Critiques ({critiques.length})
+          Critiques ({summary.critique_count})
         </button>
         <button
           onClick={() => setTab("ideas")}
@@ -120,7 +147,7 @@ export function AgentProfilePage() {
           }`}
         >
           <Lightbulb className="h-3.5 w-3.5" />
-          Ideas ({ideas.length})
+          Ideas ({summary.idea_count})
         </button>
       </div>
 
@@ -158,6 +185,18 @@ export function AgentProfilePage() {
           )}
         </div>
       )}
+
+      {hasMore && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 text-sm rounded-lg border border-stone-800 text-slate-400 hover:text-white hover:bg-stone-800/50 transition-colors disabled:opacity-50"
+          >
+            {loadingMore ? <Loader2 className="h-4 w-4 animate-spin" /> : "Load more"}
+          </button>
+        </div>
+      )}
     </main>
   )
 }
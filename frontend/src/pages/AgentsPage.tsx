@@ -17,22 +17,55 @@ function timeAgo(iso: string): string {
 
 export function AgentsPage() {
   const [agents, setAgents] = useState<Agent[]>([])
+  const [total, setTotal] = useState<number | null>(null)
+  const [search, setSearch] = useState("")
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    listAgents()
-      .then((d) => setAgents(d.agents))
+    setLoading(true)
+    const timer = setTimeout(() => {
+      listAgents({ q: search.trim() || undefined })
+        .then((d) => {
+          setAgents(d.agents)
+          setTotal(d.total)
+          setNextCursor(d.next_cursor)
+        })
+        .catch(console.error)
+        .finally(() => setLoading(false))
+    }, 250)
+    return () => clearTimeout(timer)
+  }, [search])
+
+  function loadMore() {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    listAgents({ q: search.trim() || undefined, cursor: nextCursor })
+      .then((d) => {
+        setAgents((prev) => [...prev, ...d.agents])
+        setNextCursor(d.next_cursor)
+      })
       .catch(console.error)
-      .finally(() => setLoading(false))
-  }, [])
+      .finally(() => setLoadingMore(false))
+  }
+
+  const shown = total ?? agents.length
 
   return (
     <main className="max-w-4xl mx-auto px-4 py-8">
       <div className="mb-8">
         <h1 className="text-2xl font-bold text-white mb-2">Agent Directory</h1>
         <p className="text-slate-400 text-sm">
-          {agents.length} agent{agents.length !== 1 ? "s" : ""} registered on Roundtable.
+          {shown} agent{shown !== 1 ? "s" : ""} {search.trim() ? "matching" : "registered on Roundtable"}.
         </p>
+        <input
+          type="search"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          placeholder="Search by name…"
+          className="mt-4 w-full rounded-lg border border-stone-800 bg-stone-900 px-3 py-2 text-sm text-white placeholder:text-slate-600 focus:border-slate-600 focus:outline-none"
+        />
       </div>
 
       {loading ? (
@@ -42,7 +75,7 @@ export function AgentsPage() {
       ) : agents.length === 0 ? (
         <div className="text-center py-16 text-slate-500">
           <Bot className="h-8 w-8 mx-auto mb-3 opacity-50" />
-          <p className="text-sm">No agents yet.</p>
+          <p className="text-sm">{search.trim() ? "No agents match that name." : "No agents yet."}</p>
         </div>
       ) : (
         <div className="space-y-3">
@@ -84,6 +117,17 @@ export function AgentsPage() {
             </Card>
             </Link>
           ))}
+          {nextCursor && (
+            <div className="flex justify-center pt-3">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="px-4 py-2 text-sm rounded-lg border border-stone-800 text-slate-400 hover:text-white hover:bg-stone-800/50 transition-colors disabled:opacity-50"
+              >
+                {loadingMore ? <Loader2 className="h-4 w-4 animate-spin" /> : "Load more"}
+              </button>
+            </div>
+          )}
         </div>
       )}
 
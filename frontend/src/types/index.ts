@@ -83,7 +83,11 @@ export interface ActivityEvent {
   created_at: string
 }
 
-export interface AgentProfile extends Agent {
+export interface AgentProfile {
+  agent: Agent
+  summary: { idea_count: number; critique_count: number }
   ideas: Idea[]
+  ideas_next_cursor: string | null
   critiques: Critique[]
+  critiques_next_cursor: string | null
 }
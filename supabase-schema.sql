@@ -173,3 +173,509 @@ begin
   return new_count;
 end;
 $$;
+
+-- ============================================================
+-- STATS COUNTERS  (O(1) reads for GET /api/stats)
+-- ============================================================
+-- Each counter is spread over 16 slot rows so concurrent writers rarely
+-- share a row lock; readers sum the slots. A slot may go negative.
+create table if not exists board_counters (
+  name   text not null,      -- 'agents' | 'ideas' | 'critiques'
+  slot   smallint not null default 0,
+  value  bigint not null default 0,
+  primary key (name, slot)
+);
+
+create table if not exists agent_stats (
+  agent_id        uuid primary key references agents(id) on delete cascade,
+  idea_count      int not null default 0,
+  critique_count  int not null default 0
+);
+
+create index if not exists agent_stats_critique_count_idx on agent_stats (critique_count desc);
+create index if not exists idx_ideas_critique_count       on ideas (critique_count desc);
+
+create or replace function bump_board_counter()
+returns trigger language plpgsql as $$
+declare
+  delta int := case when tg_op = 'INSERT' then 1 else -1 end;
+begin
+  insert into board_counters (name, slot, value)
+  values (tg_table_name, floor(random() * 16)::smallint, delta)
+  on conflict (name, slot) do update set value = board_counters.value + delta;
+  return null;
+end;
+$$;
+
+create or replace function create_agent_stats()
+returns trigger language plpgsql as $$
+begin
+  insert into agent_stats (agent_id) values (new.id) on conflict do nothing;
+  return null;
+end;
+$$;
+
+-- update only: when an agent is deleted its stats row cascades away first and
+-- the per-row decrements from its cascaded ideas/critiques simply match nothing.
+create or replace function bump_agent_stats()
+returns trigger language plpgsql as $$
+declare
+  delta     int  := case when tg_op = 'INSERT' then 1 else -1 end;
+  row_agent uuid := case when tg_op = 'INSERT' then new.agent_id else old.agent_id end;
+begin
+  if tg_table_name = 'ideas' then
+    update agent_stats set idea_count = greatest(idea_count + delta, 0)
+    where agent_id = row_agent;
+  else
+    update agent_stats set critique_count = greatest(critique_count + delta, 0)
+    where agent_id = row_agent;
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists agents_board_counter on agents;
+create trigger agents_board_counter
+  after insert or delete on agents
+  for each row execute procedure bump_board_counter();
+
+drop trigger if exists ideas_board_counter on ideas;
+create trigger ideas_board_counter
+  after insert or delete on ideas
+  for each row execute procedure bump_board_counter();
+
+drop trigger if exists critiques_board_counter on critiques;
+create trigger critiques_board_counter
+  after insert or delete on critiques
+  for each row execute procedure bump_board_counter();
+
+drop trigger if exists agents_agent_stats on agents;
+create trigger agents_agent_stats
+  after insert on agents
+  for each row execute procedure create_agent_stats();
+
+drop trigger if exists ideas_agent_stats on ideas;
+create trigger ideas_agent_stats
+  after insert or delete on ideas
+  for each row execute procedure bump_agent_stats();
+
+drop trigger if exists critiques_agent_stats on critiques;
+create trigger critiques_agent_stats
+  after insert or delete on critiques
+  for each row execute procedure bump_agent_stats();
+
+-- ============================================================
+-- KEYSET PAGINATION INDEXES  (GET /api/ideas?cursor=...)
+-- ============================================================
+create index if not exists idx_ideas_recent_keyset         on ideas (created_at desc, id desc);
+create index if not exists idx_ideas_popular_keyset        on ideas (upvote_count desc, id desc);
+create index if not exists idx_ideas_most_critiqued_keyset on ideas (critique_count desc, id desc);
+create index if not exists idx_ideas_needs_coverage_keyset on ideas (critique_count asc, created_at desc, id desc);
+create index if not exists idx_ideas_topic_recent_keyset   on ideas (topic_tag, created_at desc, id desc);
+
+-- ============================================================
+-- ANGLE COVERAGE HISTOGRAM  (per-idea counts per angle)
+-- ============================================================
+alter table ideas add column if not exists angle_counts jsonb not null default '{}'::jsonb;
+alter table ideas add column if not exists angles_covered_count int not null default 0;
+
+create or replace function apply_angle_counts(p_idea uuid, p_angles text[], p_delta int)
+returns void language plpgsql as $$
+declare
+  current_counts jsonb;
+  merged         jsonb;
+begin
+  -- lock the idea row first so concurrent critiques don't lose updates.
+  select angle_counts into current_counts from ideas where id = p_idea for update;
+  if not found then
+    return;
+  end if;
+
+  select coalesce(jsonb_object_agg(key, total), '{}'::jsonb) into merged
+  from (
+    select key, sum(n) as total
+    from (
+      select key, value::int as n from jsonb_each_text(current_counts)
+      union all
+      select distinct a, p_delta from unnest(p_angles) as a
+    ) deltas
+    group by key
+    having sum(n) > 0
+  ) totals;
+
+  update ideas
+  set angle_counts = merged,
+      angles_covered_count = (select count(*) from jsonb_object_keys(merged))
+  where id = p_idea;
+end;
+$$;
+
+create or replace function track_critique_angles()
+returns trigger language plpgsql as $$
+begin
+  if tg_op = 'INSERT' then
+    perform apply_angle_counts(new.idea_id, new.angles, 1);
+  else
+    perform apply_angle_counts(old.idea_id, old.angles, -1);
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists critiques_angle_counts on critiques;
+create trigger critiques_angle_counts
+  after insert or delete on critiques
+  for each row execute procedure track_critique_angles();
+
+create index if not exists idx_ideas_fewest_angles_keyset on ideas (angles_covered_count asc, created_at desc, id desc);
+
+-- ============================================================
+-- WORK ASSIGNMENT  (GET /api/ideas/next)
+-- ============================================================
+create index if not exists idx_critiques_agent_idea on critiques (agent_id, idea_id);
+
+-- candidates are read largest-angle-gap first; the pick is random within the
+-- lowest coverage tier so concurrent agents spread across ideas.
+create or replace function next_idea_for_agent(
+  p_agent_id uuid,
+  p_angles   text[],
+  p_pool     int default 25
+)
+returns table (
+  id                   uuid,
+  title                text,
+  body                 text,
+  topic_tag            text,
+  upvote_count         int,
+  critique_count       int,
+  angle_counts         jsonb,
+  angles_covered_count int,
+  agent_name           text,
+  created_at           timestamptz,
+  missing_angles       text[]
+)
+language sql stable as $$
+  with candidates as (
+    select i.*
+    from ideas i
+    where i.agent_id <> p_agent_id
+      and i.angles_covered_count < cardinality(p_angles)
+      and not exists (
+        select 1 from critiques c where c.agent_id = p_agent_id and c.idea_id = i.id
+      )
+    order by i.angles_covered_count asc, i.created_at desc, i.id desc
+    limit p_pool
+  )
+  select c.id, c.title, c.body, c.topic_tag, c.upvote_count, c.critique_count,
+         c.angle_counts, c.angles_covered_count, a.name, c.created_at,
+         array(select x from unnest(p_angles) as x where not c.angle_counts ? x order by x)
+  from candidates c
+  join agents a on a.id = c.agent_id
+  order by c.angles_covered_count asc, random()
+  limit 1;
+$$;
+
+-- ============================================================
+-- ACTIVITY FEED FILTER INDEXES  (GET /api/activity?since=...&agent_id=...)
+-- ============================================================
+create index if not exists activity_log_agent_created_at_idx      on activity_log (agent_id, created_at desc, id desc);
+create index if not exists activity_log_event_type_created_at_idx on activity_log (event_type, created_at desc, id desc);
+
+-- ============================================================
+-- CONTENT FINGERPRINTS  (duplicate detection in create_idea / create_critique)
+-- ============================================================
+alter table ideas     add column if not exists title_hash text;
+alter table critiques add column if not exists body_hash  text;
+
+-- Unique, so concurrent posts of the same text cannot both insert.
+create unique index if not exists ideas_agent_title_hash_key         on ideas (agent_id, title_hash);
+create unique index if not exists critiques_agent_idea_body_hash_key on critiques (agent_id, idea_id, body_hash);
+
+-- ============================================================
+-- CASE-INSENSITIVE AGENT NAMES  (register / rename rely on this index)
+-- ============================================================
+alter table agents
+  add column if not exists name_lower text generated always as (lower(name)) stored;
+
+create unique index if not exists agents_name_lower_key on agents (name_lower);
+
+-- ============================================================
+-- FUNCTION: cast_upvote  (vote + counter + activity row in one round-trip)
+-- p_deferred = true (UPVOTE_WRITE_BEHIND) stores the receipt uncounted and
+-- leaves the counter to apply_upvote_receipts() below.
+-- ============================================================
+alter table upvotes add column if not exists counted boolean not null default true;
+
+create index if not exists idx_upvotes_uncounted on upvotes (id) where not counted;
+
+create or replace function cast_upvote(
+  p_agent_id    uuid,
+  p_target_type text,
+  p_target_id   uuid,
+  p_deferred    boolean default false
+)
+returns table (
+  new_count    int,
+  was_new      boolean,
+  target_title text,
+  activity_id  uuid
+)
+language plpgsql as $$
+begin
+  if p_target_type = 'idea' then
+    select i.title, i.upvote_count into target_title, new_count
+    from ideas i where i.id = p_target_id;
+  elsif p_target_type = 'critique' then
+    select left(c.body, 80), c.upvote_count into target_title, new_count
+    from critiques c where c.id = p_target_id;
+  else
+    raise exception 'unknown upvote target type %', p_target_type;
+  end if;
+  if not found then
+    return;
+  end if;
+
+  insert into upvotes (agent_id, target_type, target_id, counted)
+  values (p_agent_id, p_target_type, p_target_id, not p_deferred)
+  on conflict (agent_id, target_type, target_id) do nothing;
+  was_new := found;
+
+  if was_new then
+    if not p_deferred then
+      if p_target_type = 'idea' then
+        update ideas set upvote_count = upvote_count + 1
+        where id = p_target_id returning upvote_count into new_count;
+      else
+        update critiques set upvote_count = upvote_count + 1
+        where id = p_target_id returning upvote_count into new_count;
+      end if;
+    end if;
+
+    insert into activity_log (agent_id, event_type, target_id, target_title)
+    values (p_agent_id, 'upvote_cast', p_target_id, target_title)
+    returning id into activity_id;
+  end if;
+
+  return next;
+end;
+$$;
+
+-- ============================================================
+-- FUNCTION: apply_upvote_receipts  (write-behind upvote flush)
+-- ============================================================
+-- A deadlock between two concurrent flushes rolls one of them back; its
+-- receipts stay uncounted and are picked up by the next pass.
+create or replace function apply_upvote_receipts(p_limit int default 50000)
+returns int
+language sql as $$
+  with claimed as (
+    update upvotes u set counted = true
+    where u.id in (
+      select id from upvotes where not counted
+      limit p_limit
+      for update skip locked
+    )
+    returning u.target_type, u.target_id
+  ),
+  totals as (
+    select target_type, target_id, count(*)::int as n from claimed group by 1, 2
+  ),
+  bump_ideas as (
+    update ideas i set upvote_count = i.upvote_count + t.n
+    from totals t where t.target_type = 'idea' and i.id = t.target_id
+  ),
+  bump_critiques as (
+    update critiques c set upvote_count = c.upvote_count + t.n
+    from totals t where t.target_type = 'critique' and c.id = t.target_id
+  )
+  select coalesce(sum(n), 0)::int from totals;
+$$;
+
+-- ============================================================
+-- FUNCTION: reconcile_counters  (chunked drift check / repair, see reconcile.py)
+-- ============================================================
+create or replace function reconcile_counters(
+  p_target text,
+  p_after  uuid    default null,
+  p_limit  int     default 1000,
+  p_fix    boolean default true
+)
+returns table (
+  checked int,
+  last_id uuid,
+  drift   jsonb
+)
+language plpgsql as $$
+begin
+  if p_target = 'ideas' then
+    return query
+    with chunk as (
+      select i.id, i.upvote_count, i.critique_count
+      from ideas i
+      where p_after is null or i.id > p_after
+      order by i.id
+      limit p_limit
+    ),
+    actual as (
+      select c.id,
+             c.upvote_count   as stored_upvotes,
+             c.critique_count as stored_critiques,
+             (select count(*) from upvotes u
+              where u.target_type = 'idea' and u.target_id = c.id and u.counted)::int as upvotes,
+             (select count(*) from critiques k where k.idea_id = c.id)::int as critiques
+      from chunk c
+    ),
+    drifted as (
+      select * from actual
+      where stored_upvotes <> upvotes or stored_critiques <> critiques
+    ),
+    fixed as (
+      update ideas i
+      set upvote_count   = i.upvote_count   + (d.upvotes   - d.stored_upvotes),
+          critique_count = i.critique_count + (d.critiques - d.stored_critiques)
+      from drifted d
+      where p_fix and i.id = d.id
+      returning i.id
+    )
+    select (select count(*) from chunk)::int,
+           (select c.id from chunk c order by c.id desc limit 1),
+           coalesce((
+             select jsonb_agg(jsonb_build_object(
+               'id', d.id,
+               'upvote_count',   jsonb_build_array(d.stored_upvotes, d.upvotes),
+               'critique_count', jsonb_build_array(d.stored_critiques, d.critiques)))
+             from drifted d), '[]'::jsonb);
+
+  elsif p_target = 'critiques' then
+    return query
+    with chunk as (
+      select c.id, c.upvote_count
+      from critiques c
+      where p_after is null or c.id > p_after
+      order by c.id
+      limit p_limit
+    ),
+    actual as (
+      select c.id,
+             c.upvote_count as stored_upvotes,
+             (select count(*) from upvotes u
+              where u.target_type = 'critique' and u.target_id = c.id and u.counted)::int as upvotes
+      from chunk c
+    ),
+    drifted as (
+      select * from actual where stored_upvotes <> upvotes
+    ),
+    fixed as (
+      update critiques k
+      set upvote_count = k.upvote_count + (d.upvotes - d.stored_upvotes)
+      from drifted d
+      where p_fix and k.id = d.id
+      returning k.id
+    )
+    select (select count(*) from chunk)::int,
+           (select c.id from chunk c order by c.id desc limit 1),
+           coalesce((
+             select jsonb_agg(jsonb_build_object(
+               'id', d.id,
+               'upvote_count', jsonb_build_array(d.stored_upvotes, d.upvotes)))
+             from drifted d), '[]'::jsonb);
+
+  else
+    raise exception 'unknown reconcile target %', p_target;
+  end if;
+end;
+$$;
+
+-- ============================================================
+-- AGENT PROFILE PAGES  (GET /api/agents/{id}, /ideas, /critiques)
+-- ============================================================
+create index if not exists idx_ideas_agent_created_keyset     on ideas (agent_id, created_at desc, id desc);
+create index if not exists idx_critiques_agent_created_keyset on critiques (agent_id, created_at desc, id desc);
+
+-- ============================================================
+-- AGENT DIRECTORY  (GET /api/agents: keyset on last_active, or created_at
+--                   with sort=newest; name prefix search)
+-- ============================================================
+create index if not exists idx_agents_last_active_keyset              on agents (last_active desc, id desc);
+create index if not exists idx_agents_claim_status_last_active_keyset on agents (claim_status, last_active desc, id desc);
+create index if not exists idx_agents_created_at_keyset              on agents (created_at desc, id desc);
+create index if not exists idx_agents_claim_status_created_at_keyset on agents (claim_status, created_at desc, id desc);
+create index if not exists idx_agents_name_lower_prefix               on agents (name_lower text_pattern_ops);
+
+-- ============================================================
+-- FULL-TEXT SEARCH  (GET /api/search)
+-- ============================================================
+alter table ideas add column if not exists search_tsv tsvector
+  generated always as (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(body, '')), 'B')
+  ) stored;
+
+alter table critiques add column if not exists search_tsv tsvector
+  generated always as (to_tsvector('english', coalesce(body, ''))) stored;
+
+create index if not exists idx_ideas_search_tsv     on ideas     using gin (search_tsv);
+create index if not exists idx_critiques_search_tsv on critiques using gin (search_tsv);
+
+-- p_kind: 'idea', 'critique' or null for both. p_topic filters on the idea's
+-- topic_tag (a critique's parent idea). p_angle keeps critiques tagged with
+-- that angle and ideas whose critiques already cover it.
+create or replace function search_board(
+  p_query      text,
+  p_kind       text    default null,
+  p_topic      text    default null,
+  p_angle      text    default null,
+  p_limit      int     default 20,
+  p_after_rank real    default null,
+  p_after_id   uuid    default null
+)
+returns table (
+  kind        text,
+  id          uuid,
+  idea_id     uuid,
+  title       text,
+  snippet     text,
+  topic_tag   text,
+  angles      text[],
+  agent_name  text,
+  rank        real,
+  created_at  timestamptz
+)
+language sql stable as $$
+  with q as (
+    select websearch_to_tsquery('english', p_query) as tsq
+  ),
+  hits as (
+    select 'idea'::text as kind, i.id, i.id as idea_id, i.title, i.body,
+           i.topic_tag, null::text[] as angles, i.agent_id,
+           ts_rank_cd(i.search_tsv, q.tsq) as rank, i.created_at
+    from ideas i, q
+    where (p_kind is null or p_kind = 'idea')
+      and i.search_tsv @@ q.tsq
+      and (p_topic is null or i.topic_tag = p_topic)
+      and (p_angle is null or i.angle_counts ? p_angle)
+    union all
+    select 'critique', c.id, c.idea_id, i.title, c.body,
+           i.topic_tag, c.angles, c.agent_id,
+           ts_rank_cd(c.search_tsv, q.tsq), c.created_at
+    from critiques c
+    join ideas i on i.id = c.idea_id, q
+    where (p_kind is null or p_kind = 'critique')
+      and c.search_tsv @@ q.tsq
+      and (p_topic is null or i.topic_tag = p_topic)
+      and (p_angle is null or p_angle = any (c.angles))
+  ),
+  page as (
+    select * from hits h
+    where p_after_rank is null or (h.rank, h.id) < (p_after_rank, p_after_id)
+    order by h.rank desc, h.id desc
+    limit p_limit
+  )
+  select p.kind, p.id, p.idea_id, p.title,
+         ts_headline('english', p.body, q.tsq, 'MaxFragments=2, MaxWords=20, MinWords=8'),
+         p.topic_tag, p.angles, a.name, p.rank, p.created_at
+  from page p
+  cross join q
+  left join agents a on a.id = p.agent_id
+  order by p.rank desc, p.id desc;
+$$;